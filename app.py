@@ -1,10 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-from storage import StorageManager
+from storage import StorageManager, StorageOffline, env_flag
+from config import UI_PROFILER_CONFIG
+from validation import validate_student, room_full_error
 import os
 from datetime import datetime
 
+# How often the current screen checks whether its data changed elsewhere
+DATA_WATCH_MS = 3000
+
+# Rows per page of the student and room lists
+LIST_PAGE_SIZE = 100
+
+# List headings and the storage columns they sort by
+STUDENT_LIST_COLUMNS = (('ID', 'id'), ('Name', 'name'), ('Email', 'email'), ('Phone', 'phone'),
+                        ('Room', 'room_number'), ('Status', 'status'))
+ROOM_LIST_COLUMNS = (('ID', 'id'), ('Room Number', 'room_number'), ('Capacity', 'capacity'),
+                     ('Type', 'room_type'), ('Occupied', 'occupied'))
+
 class HostelManagementApp:
     def __init__(self, root):
         self.root = root
@@ -16,13 +29,28 @@ class HostelManagementApp:
         # Configure modern style
         self.setup_styles()
         
-        # Initialize storage
-        self.storage = StorageManager()
+        # Initialize storage; MySQL is detected in the background
+        self.storage = StorageManager(background_probe=True)
+        # Reads that need MySQL while it is down raise StorageOffline
+        self.root.report_callback_exception = self.report_callback_exception
+        self.backend_labels = []
+        self.screen_refreshers = {}
+        self.view_versions = {}  # view -> data versions it was last drawn from
+        self.list_views = {}  # 'students' / 'rooms' -> tree, order and page of the list
         
         self.logged_in = False
         self.role = None
         self.username = None
         
+        # Screens are built once, cached by name and raised on navigation
+        self.screens = {}
+        self.history = []
+        self.current_page = None
+        self.screen_container = tk.Frame(self.root, bg='#2c3e50')
+        self.screen_container.pack(fill='both', expand=True)
+        self.screen_container.grid_rowconfigure(0, weight=1)
+        self.screen_container.grid_columnconfigure(0, weight=1)
+        
         # Color scheme
         self.colors = {
             'primary': '#3498db',
@@ -36,7 +64,16 @@ class HostelManagementApp:
             'success': '#27ae60'
         }
         
+        self.welcome_var = tk.StringVar()
+        
+        # Optional mainloop profiler
+        self.profiler = None
+        if UI_PROFILER_CONFIG.get('enabled') or env_flag('HOSTEL_UI_PROFILE'):
+            self.setup_profiler()
+        
         self.show_login()
+        self.poll_storage_backend()
+        self.root.after(DATA_WATCH_MS, self.watch_data)
         
         # Setup global keyboard shortcuts
         self.setup_keyboard_shortcuts()
@@ -46,13 +83,28 @@ class HostelManagementApp:
         # Global shortcuts
         self.root.bind('<Control-q>', lambda e: self.root.quit())
         self.root.bind('<F1>', lambda e: self.show_help())
-        self.root.bind('<Alt-Left>', lambda e: self.go_back() if hasattr(self, 'go_back') else None)
+        self.root.bind('<Alt-Left>', lambda e: self.go_back())
         
         # Admin shortcuts
         if hasattr(self, 'role') and self.role == 'admin':
             self.root.bind('<Control-d>', lambda e: self.show_admin_dashboard())
             self.root.bind('<Control-s>', lambda e: self.show_manage_students())
             self.root.bind('<Control-r>', lambda e: self.show_manage_rooms())
+        else:
+            # Cached admin screens must not be reachable after logout
+            for sequence in ('<Control-d>', '<Control-s>', '<Control-r>'):
+                self.root.unbind(sequence)
+    
+    def setup_profiler(self):
+        """Time screen builds and callbacks and watch for mainloop stalls"""
+        from ui_profiler import UIProfiler
+        self.profiler = UIProfiler(self.root, stall_ms=UI_PROFILER_CONFIG['stall_ms'],
+                                   heartbeat_ms=UI_PROFILER_CONFIG['heartbeat_ms'],
+                                   log_path=UI_PROFILER_CONFIG['log'])
+        # Timers that re-arm themselves every few seconds would flood the log
+        self.profiler.instrument(self, skip=('poll_storage_backend', 'watch_data', 'update_clock'))
+        self.profiler.start()
+        self.root.bind(UI_PROFILER_CONFIG['overlay_key'], self.profiler.toggle_overlay)
     
     def show_help(self):
         """Show keyboard shortcuts help"""
@@ -63,6 +115,7 @@ Keyboard Shortcuts:
 • F1: Show this help
 • Alt+←: Go back
 • Escape: Close dialogs
+• F12: UI profiler overlay (when profiling is enabled)
 
 Admin Shortcuts:
 • Ctrl+D: Dashboard
@@ -90,13 +143,48 @@ Login:
         style.configure('Treeview.Heading', font=('Arial', 10, 'bold'), 
                        background='#3498db', foreground='white')
 
+    def show_screen(self, name, builder, refresher=None, remember=True):
+        """Raise a cached screen, building it on first use, then refresh its data"""
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = tk.Frame(self.screen_container, bg=self.colors['light'])
+            screen.grid(row=0, column=0, sticky='nsew')
+            builder(screen)
+            self.screens[name] = screen
+        
+        self.screen_refreshers[name] = refresher
+        if remember and self.current_page and self.current_page != name:
+            self.history.append(self.current_page)
+        self.current_page = name
+        
+        # Login-only bindings must not fire on other screens
+        self.root.unbind('<Return>')
+        self.root.unbind('<Escape>')
+        self.setup_keyboard_shortcuts()
+        
+        if refresher:
+            refresher()
+        screen.tkraise()
+        return screen
+    
     def show_login(self):
-        # Clear the window
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
+        self.history.clear()
+        self.show_screen('login', self.build_login, self.refresh_login, remember=False)
+    
+    def refresh_login(self):
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+        
+        # Bind keyboard shortcuts for login
+        self.root.bind('<Return>', lambda e: self.login())
+        self.root.bind('<Escape>', lambda e: self.root.quit())
+        
+        # Focus on username entry
+        self.username_entry.focus()
+    
+    def build_login(self, parent):
         # Main container with gradient effect
-        main_container = tk.Frame(self.root, bg=self.colors['dark'])
+        main_container = tk.Frame(parent, bg=self.colors['dark'])
         main_container.pack(fill='both', expand=True)
         
         # Left side - Welcome panel
@@ -197,13 +285,17 @@ Login:
         tk.Label(info_frame, text="Student: student1 / student123", font=('Arial', 9), 
                 bg=self.colors['light'], fg=self.colors['gray']).pack(pady=(0, 10))
         
-        # Bind keyboard shortcuts for login
-        self.root.bind('<Return>', lambda e: self.login())
-        self.root.bind('<Escape>', lambda e: self.root.quit())
-        
-        # Focus on username entry
-        self.username_entry.focus()
+        backend_label = tk.Label(info_frame, font=('Arial', 9), bg=self.colors['light'])
+        backend_label.pack(pady=(0, 10))
+        self.backend_labels.append(backend_label)
+        self.update_backend_label(backend_label)
         
+    def report_callback_exception(self, exc_type, exc, tb):
+        if isinstance(exc, StorageOffline):
+            messagebox.showwarning("Offline", str(exc))
+        else:
+            tk.Tk.report_callback_exception(self.root, exc_type, exc, tb)
+    
     def login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
@@ -211,12 +303,18 @@ Login:
         if not username or not password:
             messagebox.showerror("Error", "Please enter both username and password")
             return
+        if self.storage.backend_status == 'probing':
+            # Log in once storage is settled on MySQL or CSV; the attempt is bounded by its timeout
+            self.root.after(200, self.login)
+            return
             
         role = self.storage.authenticate_user(username, password)
         if role:
             self.logged_in = True
             self.role = role
             self.username = username
+            self.storage.actor = username
+            self.welcome_var.set(f"Welcome back, {username}!" if role == 'admin' else f"Welcome, {username}!")
             messagebox.showinfo("Success", "Login successful!")
             if role == 'admin':
                 self.show_admin_dashboard()
@@ -229,10 +327,14 @@ Login:
         self.logged_in = False
         self.role = None
         self.username = None
+        self.storage.actor = 'system'
         self.show_login()
 
-    def create_header(self, parent, title, subtitle):
-        """Create a modern header with title and user info"""
+    def create_header(self, parent, title, subtitle, show_back=False):
+        """Create a modern header with title and user info
+
+        subtitle may be a StringVar for text that changes between visits.
+        """
         header_frame = tk.Frame(parent, bg=self.colors['white'], height=80)
         header_frame.pack(fill='x', padx=20, pady=20)
         header_frame.pack_propagate(False)
@@ -244,7 +346,10 @@ Login:
         tk.Label(left_frame, text=title, font=('Arial', 22, 'bold'), 
                 bg=self.colors['white'], fg=self.colors['dark']).pack(anchor='w')
         
-        if subtitle:
+        if isinstance(subtitle, tk.StringVar):
+            tk.Label(left_frame, textvariable=subtitle, font=('Arial', 11), 
+                    bg=self.colors['white'], fg=self.colors['gray']).pack(anchor='w')
+        elif subtitle:
             tk.Label(left_frame, text=subtitle, font=('Arial', 11), 
                     bg=self.colors['white'], fg=self.colors['gray']).pack(anchor='w')
         
@@ -253,16 +358,23 @@ Login:
         right_frame.pack(side='right', fill='y', padx=20)
         
         # Current time
-        current_time = datetime.now().strftime("%B %d, %Y - %I:%M %p")
-        tk.Label(right_frame, text=f"🕒 {current_time}", font=('Arial', 9), 
-                bg=self.colors['white'], fg=self.colors['gray']).pack(anchor='e')
+        time_label = tk.Label(right_frame, font=('Arial', 9), 
+                             bg=self.colors['white'], fg=self.colors['gray'])
+        time_label.pack(anchor='e')
+        self.update_clock(time_label)
+        
+        # Storage backend indicator
+        backend_label = tk.Label(right_frame, font=('Arial', 9), bg=self.colors['white'])
+        backend_label.pack(anchor='e')
+        self.backend_labels.append(backend_label)
+        self.update_backend_label(backend_label)
         
         # Navigation buttons
         nav_frame = tk.Frame(right_frame, bg=self.colors['white'])
         nav_frame.pack(anchor='e', pady=(5, 0))
         
-        # Back button (only show if not on dashboard)
-        if hasattr(self, 'current_page') and self.current_page != 'dashboard':
+        # Back button (only on sub-pages)
+        if show_back:
             back_btn = tk.Button(nav_frame, text="⬅️ Back", font=('Arial', 10, 'bold'), 
                                 bg=self.colors['gray'], fg='white', bd=0, relief='flat',
                                 cursor='hand2', command=self.go_back, padx=15, pady=8)
@@ -279,6 +391,53 @@ Login:
                               bg=self.colors['danger'], fg='white', bd=0, relief='flat',
                               cursor='hand2', command=self.logout, padx=20, pady=8)
         logout_btn.pack(side='left')
+    
+    def update_backend_label(self, label):
+        status = {
+            'mysql': ("🟢 MySQL", self.colors['success']),
+            'probing': ("🟡 Connecting to MySQL...", self.colors['warning']),
+            'offline': (f"🟠 MySQL offline, {self.storage.pending_writes()} changes queued", self.colors['warning']),
+            'csv': ("⚪ CSV storage", self.colors['gray'])
+        }
+        text, color = status.get(self.storage.backend_status, status['csv'])
+        label.configure(text=text, fg=color)
+    
+    def poll_storage_backend(self):
+        """Pick up the background MySQL probe result on the Tk thread"""
+        if self.storage.poll_backend():
+            refresher = self.screen_refreshers.get(self.current_page)
+            if refresher and self.logged_in:
+                refresher()
+        for label in self.backend_labels:
+            self.update_backend_label(label)
+        if self.storage.backend_status in ('probing', 'offline'):
+            self.root.after(500, self.poll_storage_backend)
+        elif self.storage.use_mysql:
+            # Notice a dropped connection (and queued writes) promptly
+            self.root.after(2000, self.poll_storage_backend)
+    
+    def data_changed(self, view, *tables):
+        """True when tables changed since view was last drawn; remembers the versions seen"""
+        versions = self.storage.data_versions(*tables)
+        if self.view_versions.get(view) == versions:
+            return False
+        self.view_versions[view] = versions
+        return True
+    
+    def watch_data(self):
+        """Redraw the current screen when its data was changed elsewhere (a no-op otherwise)"""
+        refresher = self.screen_refreshers.get(self.current_page)
+        if refresher and self.logged_in:
+            refresher()
+        self.root.after(DATA_WATCH_MS, self.watch_data)
+    
+    def update_clock(self, label):
+        """Keep a header clock current while its screen is cached"""
+        if not label.winfo_exists():
+            return
+        current_time = datetime.now().strftime("%B %d, %Y - %I:%M %p")
+        label.configure(text=f"🕒 {current_time}")
+        label.after(30000, self.update_clock, label)
 
     def create_modern_button(self, parent, text, color, command):
         """Create a modern styled button"""
@@ -310,22 +469,25 @@ Login:
         return color_map.get(color, color)
 
     def show_admin_dashboard(self):
-        # Clear the window
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Set current page for navigation
-        self.current_page = 'dashboard'
-        
-        # Update keyboard shortcuts for admin
-        self.setup_keyboard_shortcuts()
-        
+        # The dashboard is the root of admin navigation
+        self.history.clear()
+        self.show_screen('dashboard', self.build_admin_dashboard, self.refresh_dashboard, remember=False)
+    
+    def refresh_dashboard(self):
+        data = self.storage.get_gate_summary()
+        if self.data_changed('dashboard', 'students', 'rooms'):
+            data.update(self.storage.get_dashboard_data())
+        for key, label in self.metric_labels.items():
+            if key in data:
+                label.configure(text=str(data[key]))
+    
+    def build_admin_dashboard(self, parent):
         # Main container
-        main_container = tk.Frame(self.root, bg=self.colors['light'])
+        main_container = tk.Frame(parent, bg=self.colors['light'])
         main_container.pack(fill='both', expand=True)
         
         # Header
-        self.create_header(main_container, "👨💼 Admin Dashboard", f"Welcome back, {self.username}!")
+        self.create_header(main_container, "👨💼 Admin Dashboard", self.welcome_var)
         
         # Content area
         content_frame = tk.Frame(main_container, bg=self.colors['light'])
@@ -335,16 +497,24 @@ Login:
         metrics_container = tk.Frame(content_frame, bg=self.colors['light'])
         metrics_container.pack(fill='x', pady=(0, 30))
         
-        data = self.storage.get_dashboard_data()
         metrics = [
-            ("👥 Total Students", data.get('total_students', 0), self.colors['primary']),
-            ("🏠 Total Rooms", data.get('total_rooms', 0), self.colors['secondary']),
-            ("🔒 Occupied Rooms", data.get('occupied_rooms', 0), self.colors['warning']),
-            ("🛏️ Available Beds", data.get('available_beds', 0), self.colors['success'])
+            ("👥 Total Students", 'total_students', self.colors['primary']),
+            ("🏠 Total Rooms", 'total_rooms', self.colors['secondary']),
+            ("🔒 Occupied Rooms", 'occupied_rooms', self.colors['warning']),
+            ("🛏️ Available Beds", 'available_beds', self.colors['success'])
+        ]
+        gate_metrics = [
+            ("🚪 Entries Today", 'gate_entries_today', self.colors['primary']),
+            ("🚶 Exits Today", 'gate_exits_today', self.colors['secondary']),
+            ("🌙 Out Now", 'gate_out_now', self.colors['warning'])
         ]
         
-        for i, (label, value, color) in enumerate(metrics):
-            self.create_metric_card(metrics_container, label, value, color, i)
+        # Values are filled in by refresh_dashboard
+        self.metric_labels = {}
+        for i, (label, key, color) in enumerate(metrics):
+            self.metric_labels[key] = self.create_metric_card(metrics_container, label, 0, color, i)
+        for i, (label, key, color) in enumerate(gate_metrics):
+            self.metric_labels[key] = self.create_metric_card(metrics_container, label, 0, color, i, row=1)
         
         # Quick actions
         actions_frame = tk.Frame(content_frame, bg=self.colors['light'])
@@ -367,10 +537,10 @@ Login:
         for i, (title, desc, color, command) in enumerate(actions):
             self.create_action_card(buttons_frame, title, desc, color, command, i)
     
-    def create_metric_card(self, parent, label, value, color, index):
+    def create_metric_card(self, parent, label, value, color, index, row=0):
         """Create a metric card with modern styling"""
         card_frame = tk.Frame(parent, bg=self.colors['white'], relief='flat', bd=0)
-        card_frame.grid(row=0, column=index, padx=15, pady=10, sticky='ew')
+        card_frame.grid(row=row, column=index, padx=15, pady=10, sticky='ew')
         
         # Configure grid weights
         parent.grid_columnconfigure(index, weight=1)
@@ -380,8 +550,9 @@ Login:
         content_frame.pack(fill='both', expand=True, padx=25, pady=20)
         
         # Value
-        tk.Label(content_frame, text=str(value), font=('Arial', 32, 'bold'), 
-                bg=self.colors['white'], fg=color).pack()
+        value_label = tk.Label(content_frame, text=str(value), font=('Arial', 32, 'bold'), 
+                              bg=self.colors['white'], fg=color)
+        value_label.pack()
         
         # Label
         tk.Label(content_frame, text=label, font=('Arial', 11), 
@@ -389,6 +560,7 @@ Login:
         
         # Add shadow effect
         card_frame.configure(relief='solid', bd=1, highlightbackground=self.colors['light'])
+        return value_label
     
     def create_action_card(self, parent, title, description, color, command, index):
         """Create an action card button"""
@@ -444,38 +616,34 @@ Login:
     
     def go_back(self):
         """Navigate back to previous page"""
-        if hasattr(self, 'previous_page'):
-            if self.previous_page == 'dashboard':
-                self.show_admin_dashboard()
-            elif self.previous_page == 'students':
-                self.show_manage_students()
-            elif self.previous_page == 'rooms':
-                self.show_manage_rooms()
-        else:
+        if not self.logged_in:
+            return
+        pages = {
+            'dashboard': self.show_admin_dashboard,
+            'students': self.show_manage_students,
+            'rooms': self.show_manage_rooms,
+            'student_portal': self.show_student_view
+        }
+        if self.history:
+            previous = self.history.pop()
+            self.current_page = None  # Don't push the page we are leaving
+            pages[previous]()
+        elif self.role == 'admin':
             # Default back to dashboard for admin, or stay on student portal
-            if self.role == 'admin':
-                self.show_admin_dashboard()
-            else:
-                self.show_student_view()
+            self.show_admin_dashboard()
+        else:
+            self.show_student_view()
 
     def show_manage_students(self):
-        # Clear the window
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Set current page for navigation
-        self.current_page = 'students'
-        self.previous_page = 'dashboard'
-        
-        # Update keyboard shortcuts
-        self.setup_keyboard_shortcuts()
-            
+        self.show_screen('students', self.build_manage_students, self.refresh_students)
+    
+    def build_manage_students(self, parent):
         # Main frame
-        main_frame = tk.Frame(self.root, bg=self.colors['light'])
+        main_frame = tk.Frame(parent, bg=self.colors['light'])
         main_frame.pack(fill='both', expand=True)
         
         # Header with back navigation
-        self.create_header(main_frame, "👥 Student Management", "Manage student records and information")
+        self.create_header(main_frame, "👥 Student Management", "Manage student records and information", show_back=True)
         
         # Content area
         content_frame = tk.Frame(main_frame, bg=self.colors['light'])
@@ -489,17 +657,34 @@ Login:
         view_frame = tk.Frame(notebook, bg=self.colors['white'])
         notebook.add(view_frame, text='📋 View Students')
         
+        # Filters, applied by storage together with the sort order
+        filter_frame = tk.Frame(view_frame, bg=self.colors['white'])
+        filter_frame.pack(fill='x', padx=20, pady=(20, 0))
+        
+        tk.Label(filter_frame, text="🔍 Search", font=('Arial', 11, 'bold'), 
+                bg=self.colors['white'], fg=self.colors['dark']).pack(side='left')
+        self.student_search_entry = tk.Entry(filter_frame, font=('Arial', 11), width=30, 
+                                            bg=self.colors['light'], relief='flat', bd=5)
+        self.student_search_entry.pack(side='left', padx=10)
+        self.student_search_entry.bind('<Return>', lambda e: self.filter_students())
+        
+        self.student_status_var = tk.StringVar(value="All")
+        status_filter = ttk.Combobox(filter_frame, textvariable=self.student_status_var, 
+                                     values=["All", "active", "inactive"], state='readonly', width=10)
+        status_filter.pack(side='left', padx=10)
+        status_filter.bind('<<ComboboxSelected>>', lambda e: self.filter_students())
+        
         # Students list
         list_frame = tk.Frame(view_frame, bg=self.colors['white'])
         list_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
-        # Treeview for students
-        columns = ('ID', 'Name', 'Email', 'Phone', 'Room', 'Status')
+        # Treeview for students; headings sort the whole list, a page at a time
+        columns = tuple(heading for heading, _ in STUDENT_LIST_COLUMNS)
         self.students_tree = ttk.Treeview(list_frame, columns=columns, show='headings')
         
         for col in columns:
-            self.students_tree.heading(col, text=col)
             self.students_tree.column(col, width=120)
+        self.create_list_view('students', self.students_tree, STUDENT_LIST_COLUMNS, self.load_students_page)
         
         scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.students_tree.yview)
         self.students_tree.configure(yscrollcommand=scrollbar.set)
@@ -516,7 +701,10 @@ Login:
         self.create_modern_button(export_frame, "📑 Export PDF", self.colors['danger'], 
                                  self.export_students_pdf).pack(side='left', padx=5)
         self.create_modern_button(export_frame, "🔄 Refresh", self.colors['primary'], 
-                                 self.refresh_students).pack(side='left', padx=5)
+                                 lambda: self.refresh_students(force=True)).pack(side='left', padx=5)
+        self.create_modern_button(export_frame, "🤝 Match Roommates", self.colors['success'], 
+                                 self.match_roommates).pack(side='left', padx=5)
+        self.create_pager(export_frame, 'students').pack(side='right')
         
         # Add Student Tab
         add_frame = tk.Frame(notebook, bg=self.colors['white'])
@@ -536,10 +724,29 @@ Login:
         for i, (label, attr) in enumerate(fields):
             self.create_form_field(add_form, label, attr, i)
         
+        # Free-room picker: best-fit rooms from the availability index
+        tk.Label(add_form, text="🔎 Free Rooms", font=('Arial', 12, 'bold'), 
+                bg=self.colors['white'], fg=self.colors['dark']).grid(row=len(fields), column=0, padx=10, pady=10, sticky='nw')
+        
+        picker_frame = tk.Frame(add_form, bg=self.colors['white'])
+        picker_frame.grid(row=len(fields), column=1, padx=10, pady=10, sticky='ew')
+        
+        self.room_type_var = tk.StringVar(value="Any type")
+        self.room_type_picker = ttk.Combobox(picker_frame, textvariable=self.room_type_var, 
+                                             state='readonly', width=20)
+        self.room_type_picker.pack(anchor='w')
+        self.room_type_picker.bind('<<ComboboxSelected>>', lambda e: self.refresh_free_rooms())
+        
+        self.free_rooms_list = tk.Listbox(picker_frame, height=5, font=('Arial', 11), 
+                                          bg=self.colors['light'], relief='flat', bd=5)
+        self.free_rooms_list.pack(fill='x', pady=(5, 0))
+        self.free_rooms_list.bind('<<ListboxSelect>>', self.pick_free_room)
+        self.free_room_numbers = []
+        
         # Submit button
         submit_btn = self.create_modern_button(add_form, "➕ Add Student", self.colors['secondary'], 
                                               self.add_student_action)
-        submit_btn.grid(row=len(fields), column=0, columnspan=2, pady=30, sticky='ew')
+        submit_btn.grid(row=len(fields) + 1, column=0, columnspan=2, pady=30, sticky='ew')
         
         # Update/Delete Student Tab
         edit_frame = tk.Frame(notebook, bg=self.colors['white'])
@@ -593,8 +800,6 @@ Login:
         delete_btn = self.create_modern_button(button_frame, "🗑️ Delete Student", self.colors['danger'], 
                                               self.delete_student_action)
         delete_btn.pack(side='left', padx=10)
-        
-        self.refresh_students()
     
     def create_form_field(self, parent, label, attr_name, row):
         """Create a modern form field"""
@@ -607,25 +812,75 @@ Login:
         
         setattr(self, attr_name, entry)
         parent.grid_columnconfigure(1, weight=1)
+    
+    # Sorted, paged lists
+    def create_list_view(self, view, tree, columns, loader):
+        """Make the headings of tree sort the list through storage; loader redraws the current page"""
+        self.list_views[view] = {'tree': tree, 'columns': columns, 'loader': loader, 'label': None,
+                                 'order_by': 'id', 'descending': False, 'offset': 0, 'total': 0}
+        for heading, column in columns:
+            tree.heading(heading, text=heading, command=lambda column=column: self.sort_list(view, column))
+    
+    def create_pager(self, parent, view):
+        """Previous/next buttons and a 'rows x–y of n' label for a list"""
+        pager = tk.Frame(parent, bg=self.colors['white'])
+        self.create_modern_button(pager, "◀ Previous", self.colors['primary'], 
+                                 lambda: self.turn_page(view, -1)).pack(side='left', padx=5)
+        label = tk.Label(pager, font=('Arial', 11), bg=self.colors['white'], fg=self.colors['dark'])
+        label.pack(side='left', padx=10)
+        self.create_modern_button(pager, "Next ▶", self.colors['primary'], 
+                                 lambda: self.turn_page(view, 1)).pack(side='left', padx=5)
+        self.list_views[view]['label'] = label
+        return pager
+    
+    def sort_list(self, view, column):
+        """Heading click: sort by column, or flip the direction if it is already the sort column"""
+        state = self.list_views[view]
+        state['descending'] = not state['descending'] if state['order_by'] == column else False
+        state['order_by'] = column
+        state['offset'] = 0
+        for heading, heading_column in state['columns']:
+            arrow = (" ▼" if state['descending'] else " ▲") if heading_column == column else ""
+            state['tree'].heading(heading, text=heading + arrow)
+        state['loader']()
+    
+    def turn_page(self, view, step):
+        state = self.list_views[view]
+        offset = state['offset'] + step * LIST_PAGE_SIZE
+        if offset < 0 or offset >= state['total']:
+            return
+        state['offset'] = offset
+        state['loader']()
+    
+    def load_list_page(self, view, fetch):
+        """Show the current page; fetch(order_by, descending, offset, limit) returns (rows, total)"""
+        state = self.list_views[view]
+        rows, total = fetch(state['order_by'], state['descending'], state['offset'], LIST_PAGE_SIZE)
+        if not rows and state['offset']:
+            # The list shrank below the current page: show its last page
+            state['offset'] = max(0, (total - 1) // LIST_PAGE_SIZE * LIST_PAGE_SIZE)
+            rows, total = fetch(state['order_by'], state['descending'], state['offset'], LIST_PAGE_SIZE)
+        state['total'] = total
+        
+        tree = state['tree']
+        for item in tree.get_children():
+            tree.delete(item)
+        for values in rows:
+            tree.insert('', 'end', values=values)
+        if state['label'] is not None:
+            first = state['offset'] + 1 if rows else 0
+            state['label'].configure(text=f"{first}–{state['offset'] + len(rows)} of {total:,}")
 
     def show_manage_rooms(self):
-        # Clear the window
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Set current page for navigation
-        self.current_page = 'rooms'
-        self.previous_page = 'dashboard'
-        
-        # Update keyboard shortcuts
-        self.setup_keyboard_shortcuts()
-            
+        self.show_screen('rooms', self.build_manage_rooms, self.refresh_rooms)
+    
+    def build_manage_rooms(self, parent):
         # Main frame
-        main_frame = tk.Frame(self.root, bg=self.colors['light'])
+        main_frame = tk.Frame(parent, bg=self.colors['light'])
         main_frame.pack(fill='both', expand=True)
         
         # Header with back navigation
-        self.create_header(main_frame, "🏠 Room Management", "Manage room information and capacity")
+        self.create_header(main_frame, "🏠 Room Management", "Manage room information and capacity", show_back=True)
         
         # Content area
         content_frame = tk.Frame(main_frame, bg=self.colors['light'])
@@ -643,13 +898,13 @@ Login:
         list_frame = tk.Frame(view_frame, bg=self.colors['white'])
         list_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
-        # Treeview for rooms
-        columns = ('ID', 'Room Number', 'Capacity', 'Type', 'Occupied')
+        # Treeview for rooms; headings sort the whole list, a page at a time
+        columns = tuple(heading for heading, _ in ROOM_LIST_COLUMNS)
         self.rooms_tree = ttk.Treeview(list_frame, columns=columns, show='headings')
         
         for col in columns:
-            self.rooms_tree.heading(col, text=col)
             self.rooms_tree.column(col, width=150)
+        self.create_list_view('rooms', self.rooms_tree, ROOM_LIST_COLUMNS, self.load_rooms_page)
         
         scrollbar2 = ttk.Scrollbar(list_frame, orient='vertical', command=self.rooms_tree.yview)
         self.rooms_tree.configure(yscrollcommand=scrollbar2.set)
@@ -666,7 +921,8 @@ Login:
         self.create_modern_button(export_frame2, "📑 Export PDF", self.colors['danger'], 
                                  self.export_rooms_pdf).pack(side='left', padx=5)
         self.create_modern_button(export_frame2, "🔄 Refresh", self.colors['primary'], 
-                                 self.refresh_rooms).pack(side='left', padx=5)
+                                 lambda: self.refresh_rooms(force=True)).pack(side='left', padx=5)
+        self.create_pager(export_frame2, 'rooms').pack(side='right')
         
         # Add Room Tab
         add_room_frame = tk.Frame(notebook, bg=self.colors['white'])
@@ -689,26 +945,18 @@ Login:
         submit_btn = self.create_modern_button(add_room_form, "➕ Add Room", self.colors['secondary'], 
                                               self.add_room_action)
         submit_btn.grid(row=len(room_fields), column=0, columnspan=2, pady=30, sticky='ew')
-        
-        self.refresh_rooms()
 
     def show_student_view(self):
-        # Clear the window
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        # Set current page for navigation
-        self.current_page = 'student_portal'
-        
-        # Update keyboard shortcuts
-        self.setup_keyboard_shortcuts()
-            
+        self.history.clear()
+        self.show_screen('student_portal', self.build_student_view, self.refresh_student_view, remember=False)
+    
+    def build_student_view(self, parent):
         # Main frame
-        main_frame = tk.Frame(self.root, bg=self.colors['light'])
+        main_frame = tk.Frame(parent, bg=self.colors['light'])
         main_frame.pack(fill='both', expand=True)
         
         # Header
-        self.create_header(main_frame, "👨🎓 Student Portal", f"Welcome, {self.username}!")
+        self.create_header(main_frame, "👨🎓 Student Portal", self.welcome_var)
         
         # Content area
         content_frame = tk.Frame(main_frame, bg=self.colors['light'])
@@ -725,54 +973,96 @@ Login:
         tk.Label(header_frame, text="📋 My Information", font=('Arial', 18, 'bold'), 
                 bg=self.colors['primary'], fg='white').pack(pady=20)
         
-        # Fetch student details
-        students = self.storage.get_students()
-        student = next((s for s in students if s['email'] == self.username or str(s['id']) == self.username), None)
+        # Details content, filled in by refresh_student_view
+        self.student_details_area = tk.Frame(details_frame, bg=self.colors['white'])
+        
+        self.student_detail_labels = {}
+        for label in ("Name:", "Email:", "Phone:", "Room Number:", "Room Type:", "Roommates:",
+                      "Check-in Date:", "Status:"):
+            detail_frame = tk.Frame(self.student_details_area, bg=self.colors['white'])
+            detail_frame.pack(fill='x', pady=15)
+            
+            tk.Label(detail_frame, text=label, font=('Arial', 12, 'bold'), 
+                    bg=self.colors['white'], fg=self.colors['dark']).pack(side='left')
+            
+            value_frame = tk.Frame(detail_frame, bg=self.colors['light'], relief='flat')
+            value_frame.pack(side='right', padx=20)
+            
+            value_label = tk.Label(value_frame, font=('Arial', 12), 
+                                  bg=self.colors['light'], fg=self.colors['dark'])
+            value_label.pack(padx=15, pady=8)
+            self.student_detail_labels[label] = value_label
+        
+        self.student_not_found = tk.Frame(details_frame, bg=self.colors['white'])
+        tk.Label(self.student_not_found, text="❌ Student details not found", 
+                font=('Arial', 16), bg=self.colors['white'], fg=self.colors['danger']).pack(pady=50)
+    
+    def refresh_student_view(self):
+        # Indexed lookup of the logged-in student, their room and roommates
+        record = self.storage.get_student_for_user(self.username)
         
-        if student:
+        if record:
+            student, room = record['student'], record['room']
+            roommates = ', '.join(roommate['name'] for roommate in record['roommates'])
             details = [
                 ("Name:", student['name']),
                 ("Email:", student['email']),
-                ("Phone:", student.get('phone', 'N/A')),
-                ("Room Number:", student.get('room_number', 'N/A')),
-                ("Check-in Date:", str(student.get('check_in_date', 'N/A'))),
+                ("Phone:", student.get('phone') or 'N/A'),
+                ("Room Number:", student.get('room_number') or 'N/A'),
+                ("Room Type:", (room and room.get('room_type')) or 'N/A'),
+                ("Roommates:", roommates or 'None'),
+                ("Check-in Date:", str(student.get('check_in_date') or 'N/A')),
                 ("Status:", student['status'])
             ]
+            for label, value in details:
+                self.student_detail_labels[label].configure(text=str(value))
             
-            # Details content
-            content_area = tk.Frame(details_frame, bg=self.colors['white'])
-            content_area.pack(fill='both', expand=True, padx=40, pady=30)
-            
-            for i, (label, value) in enumerate(details):
-                detail_frame = tk.Frame(content_area, bg=self.colors['white'])
-                detail_frame.pack(fill='x', pady=15)
-                
-                tk.Label(detail_frame, text=label, font=('Arial', 12, 'bold'), 
-                        bg=self.colors['white'], fg=self.colors['dark']).pack(side='left')
-                
-                value_frame = tk.Frame(detail_frame, bg=self.colors['light'], relief='flat')
-                value_frame.pack(side='right', padx=20)
-                
-                tk.Label(value_frame, text=str(value), font=('Arial', 12), 
-                        bg=self.colors['light'], fg=self.colors['dark']).pack(padx=15, pady=8)
+            self.student_not_found.pack_forget()
+            self.student_details_area.pack(fill='both', expand=True, padx=40, pady=30)
         else:
-            content_area = tk.Frame(details_frame, bg=self.colors['white'])
-            content_area.pack(fill='both', expand=True, padx=40, pady=30)
-            
-            tk.Label(content_area, text="❌ Student details not found", 
-                    font=('Arial', 16), bg=self.colors['white'], fg=self.colors['danger']).pack(pady=50)
+            self.student_details_area.pack_forget()
+            self.student_not_found.pack(fill='both', expand=True, padx=40, pady=30)
 
     # Helper methods for student management
-    def refresh_students(self):
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        students = self.storage.get_students()
-        for student in students:
-            self.students_tree.insert('', 'end', values=(
-                student['id'], student['name'], student['email'], 
-                student.get('phone', ''), student.get('room_number', ''), student['status']
-            ))
+    def refresh_students(self, force=False):
+        """Reload the lists whose data changed; force (the Refresh button) reloads them anyway"""
+        if force:
+            self.storage.drop_caches()
+        if self.data_changed('students', 'students') or force:
+            self.load_students_page()
+        if self.data_changed('free_rooms', 'rooms') or force:
+            self.refresh_free_rooms()
+    
+    def load_students_page(self):
+        search = self.student_search_entry.get().strip() or None
+        status = self.student_status_var.get()
+        status = None if status == "All" else status
+        
+        def fetch(*page):
+            rows, total = self.storage.get_students_page(*page, status=status, search=search)
+            return [(s.id, s.name, s.email, s.phone or '', s.room_number or '', s.status) for s in rows], total
+        self.load_list_page('students', fetch)
+    
+    def filter_students(self):
+        self.list_views['students']['offset'] = 0
+        self.load_students_page()
+    
+    def refresh_free_rooms(self):
+        room_type = self.room_type_var.get()
+        self.room_type_picker.configure(values=["Any type"] + self.storage.get_room_types())
+        rooms = self.storage.find_free_rooms(None if room_type == "Any type" else room_type, limit=20)
+        
+        self.free_rooms_list.delete(0, tk.END)
+        self.free_room_numbers = [room_number for room_number, _, _ in rooms]
+        for room_number, kind, free in rooms:
+            beds = "bed" if free == 1 else "beds"
+            self.free_rooms_list.insert(tk.END, f"Room {room_number}  ·  {kind or 'other'}  ·  {free} free {beds}")
+    
+    def pick_free_room(self, event=None):
+        selection = self.free_rooms_list.curselection()
+        if selection:
+            self.add_room_entry.delete(0, tk.END)
+            self.add_room_entry.insert(0, self.free_room_numbers[selection[0]])
     
     def add_student_action(self):
         name = self.add_name_entry.get().strip()
@@ -780,35 +1070,16 @@ Login:
         phone = self.add_phone_entry.get().strip()
         room_number = self.add_room_entry.get().strip()
         
-        # Validate required fields
-        if not all([name, email]):
-            messagebox.showerror("Error", "Name and Email are required")
+        # Same rules as bulk imports, see validation.py
+        error = validate_student(name, email, phone, room_number)
+        if error:
+            messagebox.showerror("Error", error)
             return
-        
-        # Validate email format
-        if '@' not in email:
-            messagebox.showerror("Error", "Email must contain @ symbol")
+        full = room_full_error(self.storage, room_number)
+        if full:
+            self.offer_waitlist(name, email, phone, room_number, full)
             return
         
-        # Validate phone number
-        if phone:
-            if not phone.isdigit() or len(phone) != 10:
-                messagebox.showerror("Error", "Phone number must be exactly 10 digits")
-                return
-        
-        # Validate room number
-        if room_number:
-            if not room_number.isdigit() or len(room_number) > 3:
-                messagebox.showerror("Error", "Room number must be maximum 3 digits")
-                return
-            
-            # Check room occupancy limit
-            students = self.storage.get_students()
-            room_count = sum(1 for s in students if s.get('room_number') == room_number and s['status'] == 'active')
-            if room_count >= 2:
-                messagebox.showerror("Error", f"Room {room_number} is full (maximum 2 students per room)")
-                return
-        
         if self.storage.add_student(name, email, phone, room_number):
             messagebox.showinfo("Success", "Student added successfully!")
             # Clear entries
@@ -829,9 +1100,9 @@ Login:
                 self.edit_email_entry.delete(0, tk.END)
                 self.edit_email_entry.insert(0, student['email'])
                 self.edit_phone_entry.delete(0, tk.END)
-                self.edit_phone_entry.insert(0, student.get('phone', ''))
+                self.edit_phone_entry.insert(0, student.get('phone') or '')
                 self.edit_room_entry.delete(0, tk.END)
-                self.edit_room_entry.insert(0, student.get('room_number', ''))
+                self.edit_room_entry.insert(0, student.get('room_number') or '')
                 self.edit_status_var.set(student['status'])
             else:
                 messagebox.showerror("Error", "Student not found")
@@ -847,37 +1118,17 @@ Login:
             room_number = self.edit_room_entry.get().strip()
             status = self.edit_status_var.get()
             
-            # Validate required fields
-            if not all([name, email]):
-                messagebox.showerror("Error", "Name and Email are required")
+            # Same rules as bulk imports; the student's own bed doesn't count
+            error = validate_student(name, email, phone, room_number)
+            if not error and status == 'active':
+                error = room_full_error(self.storage, room_number, exclude_id=student_id)
+            if error:
+                messagebox.showerror("Error", error)
                 return
             
-            # Validate email format
-            if '@' not in email:
-                messagebox.showerror("Error", "Email must contain @ symbol")
-                return
-            
-            # Validate phone number
-            if phone:
-                if not phone.isdigit() or len(phone) != 10:
-                    messagebox.showerror("Error", "Phone number must be exactly 10 digits")
-                    return
-            
-            # Validate room number
-            if room_number:
-                if not room_number.isdigit() or len(room_number) > 3:
-                    messagebox.showerror("Error", "Room number must be maximum 3 digits")
-                    return
-                
-                # Check room occupancy limit (exclude current student)
-                students = self.storage.get_students()
-                room_count = sum(1 for s in students if s.get('room_number') == room_number and s['status'] == 'active' and s['id'] != student_id)
-                if room_count >= 2:
-                    messagebox.showerror("Error", f"Room {room_number} is full (maximum 2 students per room)")
-                    return
-            
             if self.storage.update_student(student_id, name, email, phone, room_number, status):
                 messagebox.showinfo("Success", "Student updated successfully!")
+                self.announce_waitlist_allocations()
                 self.refresh_students()
             else:
                 messagebox.showerror("Error", "Error updating student")
@@ -894,23 +1145,72 @@ Login:
                     for entry in [self.edit_id_entry, self.edit_name_entry, self.edit_email_entry, 
                                  self.edit_phone_entry, self.edit_room_entry]:
                         entry.delete(0, tk.END)
+                    self.announce_waitlist_allocations()
                     self.refresh_students()
                 else:
                     messagebox.showerror("Error", "Error deleting student")
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid Student ID")
     
-    # Helper methods for room management
-    def refresh_rooms(self):
-        for item in self.rooms_tree.get_children():
-            self.rooms_tree.delete(item)
+    def offer_waitlist(self, name, email, phone, room_number, message):
+        """The room is full: offer a place on the waitlist for the same room type"""
+        room_type = self.storage.get_room_type(room_number)
+        if not messagebox.askyesno("Room Full", f"{message}.\n\nAdd {name} to the waitlist for the next "
+                                                f"free {room_type or 'room'}?"):
+            return
+        try:
+            waitlist = self.storage.get_waitlist()
+            waitlist.add(name, email, phone, room_type)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Waitlist", f"{name} is on the waitlist; {len(waitlist)} waiting in total.")
+        for entry in [self.add_name_entry, self.add_email_entry, self.add_phone_entry, self.add_room_entry]:
+            entry.delete(0, tk.END)
+    
+    def announce_waitlist_allocations(self):
+        allocations = self.storage.take_waitlist_allocations()
+        if allocations:
+            lines = [f"{entry['name']} → Room {room_number}" for entry, room_number in allocations]
+            messagebox.showinfo("Waitlist", "Freed beds went to waitlisted students:\n\n" + "\n".join(lines))
+    
+    def match_roommates(self):
+        """Plan rooms for every active student without one and assign them after confirmation"""
+        import matching
         
-        rooms = self.storage.get_rooms()
-        for room in rooms:
-            self.rooms_tree.insert('', 'end', values=(
-                room['id'], room['room_number'], room['capacity'], 
-                room.get('room_type', ''), room.get('occupied', 0)
-            ))
+        groups, unplaced = matching.plan_intake(self.storage)
+        if not groups:
+            messagebox.showinfo("Match Roommates", "No students are waiting for a room, or no beds are free.")
+            return
+        placed = sum(len(members) for _, members, _ in groups)
+        scores = [score for _, _, score in groups if score is not None]
+        summary = f"Place {placed} students in {len(groups)} rooms"
+        if scores:
+            summary += f" (mean compatibility {sum(scores) / len(scores):.2f})"
+        if unplaced:
+            summary += f".\n{len(unplaced)} students will still have no bed"
+        if not messagebox.askyesno("Match Roommates", summary + ".\n\nAssign these rooms now?"):
+            return
+        assigned = self.storage.assign_rooms((student_id, room_number)
+                                             for room_number, members, _ in groups for student_id in members)
+        if assigned is None:
+            messagebox.showerror("Error", "Error assigning rooms")
+        else:
+            messagebox.showinfo("Success", f"Assigned rooms to {assigned} students!")
+        self.refresh_students()
+    
+    # Helper methods for room management
+    def refresh_rooms(self, force=False):
+        if force:
+            self.storage.drop_caches()
+        if self.data_changed('rooms', 'rooms') or force:
+            self.load_rooms_page()
+    
+    def load_rooms_page(self):
+        def fetch(*page):
+            rows, total = self.storage.get_rooms_page(*page)
+            return [(r.id, r.room_number, r.capacity, r.room_type or '', r.occupied) for r in rows], total
+        self.load_list_page('rooms', fetch)
     
     def add_room_action(self):
         room_number = self.room_number_entry.get().strip()
@@ -975,7 +1275,10 @@ Login:
         except Exception as e:
             messagebox.showerror("Error", f"Export failed: {str(e)}")
 
-if __name__ == "__main__":
+def main():
     root = tk.Tk()
     app = HostelManagementApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Audit trail of every change made through StorageManager.
+
+record() only puts an entry on an in-memory queue; a background thread
+drains the queue and inserts the entries into a SQLite file in batches, one
+transaction per batch. Entries are indexed by student, actor and time for
+query(), which waits for the queue to drain so it sees every recorded entry.
+"""
+
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+BATCH_SIZE = 500
+COLUMNS = ('id', 'at', 'actor', 'operation', 'student_id', 'room_number', 'before', 'after')
+
+_STOP = object()
+
+
+def _plain(value):
+    if hasattr(value, 'item'):  # NumPy scalars from pandas rows
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _to_json(values):
+    if values is None:
+        return None
+    return json.dumps({key: _plain(value) for key, value in values.items()}, default=str)
+
+
+class AuditLog:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                at TEXT NOT NULL,
+                actor TEXT,
+                operation TEXT NOT NULL,
+                student_id INTEGER,
+                room_number TEXT,
+                before TEXT,
+                after TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_audit_student ON audit (student_id, at);
+            CREATE INDEX IF NOT EXISTS idx_audit_actor ON audit (actor, at);
+            CREATE INDEX IF NOT EXISTS idx_audit_at ON audit (at);
+        """)
+        self._db.commit()
+        self._db_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        # Entries still queued when the program exits are written first
+        atexit.register(self.flush)
+
+    def record(self, actor, operation, student_id=None, room_number=None, before=None, after=None):
+        """Queue one entry; before/after are dicts of the changed record (None if absent)
+
+        The dicts are serialised later by the writer thread and must not be
+        changed after the call.
+        """
+        self._queue.put((datetime.now().isoformat(timespec='microseconds'), actor, operation,
+                         student_id, room_number, before, after))
+
+    def _write_loop(self):
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < BATCH_SIZE:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in entries
+            # Serialising here keeps record() down to a queue put
+            rows = [entry[:5] + (_to_json(entry[5]), _to_json(entry[6])) for entry in entries if entry is not _STOP]
+            try:
+                with self._db_lock:
+                    self._db.executemany("""
+                        INSERT INTO audit (at, actor, operation, student_id, room_number, before, after)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, rows)
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing audit log: {e}")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Wait until every queued entry is written"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._db_lock:
+            self._db.close()
+
+    def query(self, student_id=None, actor=None, start=None, end=None, limit=None):
+        """Entries matching every given filter, newest first, as dicts with COLUMNS keys
+
+        start/end bound the time as ISO strings, dates or datetimes (end exclusive).
+        """
+        self.flush()
+        clauses, params = [], []
+        for clause, value in (("student_id = ?", student_id), ("actor = ?", actor),
+                              ("at >= ?", start), ("at < ?", end)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM audit"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY at DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._db_lock:
+            rows = self._db.execute(sql, params).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(zip(COLUMNS, row))
+            for key in ('before', 'after'):
+                entry[key] = json.loads(entry[key]) if entry[key] else None
+            entries.append(entry)
+        return entries
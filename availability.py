@@ -0,0 +1,98 @@
+"""
+Index of rooms with free beds, bucketed by room type and free-bed count.
+
+Each (room_type, free_beds) bucket keeps its rooms sorted, so a best-fit
+query walks the buckets from the smallest sufficient free-bed count upward
+and stops after limit rooms, no matter how many rooms there are.
+"""
+
+import bisect
+import heapq
+
+
+def _sort_key(room_number):
+    # Numeric room numbers sort by value: '99' before '101'
+    return (len(room_number), room_number)
+
+
+def _tagged(keys, room_type):
+    for key in keys:
+        yield key, room_type
+
+
+class RoomAvailabilityIndex:
+    def __init__(self, rooms=()):
+        """rooms: (id, room_number, capacity, room_type, occupied) tuples, as from iter_rooms"""
+        self._rooms = {}  # room_number -> [room_type, capacity, occupied]
+        self._buckets = {}  # room_type -> {free_beds: sorted [sort keys]}
+        for _, room_number, capacity, room_type, occupied in rooms:
+            self.add_room(room_number, capacity, room_type, occupied)
+
+    def _bucket(self, room_type, free):
+        return self._buckets.setdefault(room_type, {}).setdefault(free, [])
+
+    def _unlink(self, room_number):
+        room_type, capacity, occupied = self._rooms[room_number]
+        free = capacity - occupied
+        if free > 0:
+            bucket = self._buckets[room_type][free]
+            del bucket[bisect.bisect_left(bucket, _sort_key(room_number))]
+            if not bucket:
+                del self._buckets[room_type][free]
+
+    def _link(self, room_number):
+        room_type, capacity, occupied = self._rooms[room_number]
+        free = capacity - occupied
+        if free > 0:
+            bisect.insort(self._bucket(room_type, free), _sort_key(room_number))
+
+    def add_room(self, room_number, capacity, room_type, occupied=0):
+        if room_number in self._rooms:
+            self._unlink(room_number)
+        self._rooms[room_number] = [room_type or None, int(capacity), int(occupied)]
+        self._link(room_number)
+
+    def change(self, room_number, delta):
+        """Apply an occupancy change; rooms the index does not know are ignored"""
+        if room_number not in self._rooms:
+            return
+        self._unlink(room_number)
+        self._rooms[room_number][2] += delta
+        self._link(room_number)
+
+    def __contains__(self, room_number):
+        return room_number in self._rooms
+
+    def room_type(self, room_number):
+        return self._rooms[room_number][0]
+
+    def free_beds(self, room_number):
+        room_type, capacity, occupied = self._rooms[room_number]
+        return max(capacity - occupied, 0)
+
+    def room_types(self):
+        return sorted(room_type for room_type in {room[0] for room in self._rooms.values()} if room_type)
+
+    def find(self, room_type=None, beds=1, limit=10):
+        """Best-fit rooms with at least beds free, as [(room_number, room_type, free_beds)]
+
+        Rooms with the fewest sufficient free beds come first, so larger gaps
+        stay available for groups; ties go by room number. room_type None
+        searches every type.
+        """
+        types = [room_type] if room_type is not None else list(self._buckets)
+        counts = sorted({free for kind in types for free in self._buckets.get(kind, {}) if free >= beds})
+        found = []
+        for free in counts:
+            buckets = [_tagged(self._buckets[kind][free], kind)
+                       for kind in types if free in self._buckets.get(kind, {})]
+            for (_, room_number), kind in heapq.merge(*buckets):
+                found.append((room_number, kind, free))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def summary(self):
+        """Rooms per free-bed count for each type: {room_type: {free_beds: rooms}}"""
+        return {room_type: {free: len(rooms) for free, rooms in sorted(buckets.items())}
+                for room_type, buckets in self._buckets.items() if buckets}
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Hostel Management System - Storage Benchmarks
+Times every StorageManager operation per backend and records the results as JSON.
+
+    python benchmark.py run --scale 1k --backend csv
+    python benchmark.py compare bench_results/old.json bench_results/new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import datagen
+
+RESULTS_DIR = 'bench_results'
+
+
+def _operations(storage, sample_id):
+    """Benchmark cases as (name, callable[, untimed follow-up]) tuples
+
+    The add/update/delete cases run in that order so the data set ends unchanged.
+    """
+    state = {'email': f"bench{time.time_ns()}@example.edu"}
+
+    def remember_added():
+        # Untimed: find the id of the student created by add_student
+        state['added'] = next(s['id'] for s in storage.get_students() if s['email'] == state['email'])
+
+    return [
+        ('authenticate_user', lambda: storage.authenticate_user('admin', 'admin123')),
+        ('get_students', storage.get_students),
+        ('get_rooms', storage.get_rooms),
+        ('get_students_page', lambda: storage.get_students_page('name', descending=True, offset=1000)),
+        ('get_dashboard_data', storage.get_dashboard_data),
+        ('get_stays', lambda: storage.get_stays(sample_id)),
+        ('get_occupancy_on', lambda: storage.get_occupancy_on(date.today())),
+        ('get_room_occupants_on', lambda: storage.get_room_occupants_on('101', date.today())),
+        ('add_student', lambda: storage.add_student('Bench Student', state['email'], '9876543210', '101'),
+         remember_added),
+        ('update_student', lambda: storage.update_student(state['added'], 'Bench Student', 'bench-updated@example.edu',
+                                                          '9876543210', '102', 'active')),
+        ('delete_student', lambda: storage.delete_student(state['added'])),
+        ('add_room', lambda: storage.add_room(f"B{time.perf_counter_ns() % 10**8}", 2, 'double')),
+        ('export_students_to_csv', storage.export_students_to_csv),
+        ('export_rooms_to_csv', storage.export_rooms_to_csv),
+        ('export_students_to_pdf', storage.export_students_to_pdf),
+        ('export_rooms_to_pdf', storage.export_rooms_to_pdf),
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(backend, num_students, repeat=5, seed=42, database='hostel_management_bench'):
+    """Generate a data set, time each operation and return the result document"""
+    from storage import StorageManager, module_available
+
+    workdir = tempfile.mkdtemp(prefix='hostel_bench_')
+    data_dir = os.path.join(workdir, 'data')
+    previous_cwd = os.getcwd()
+    try:
+        counts = datagen.generate(data_dir, num_students, seed=seed)
+        if backend == 'mysql':
+            datagen.load_into_mysql(data_dir, database)
+        # Exports are written to the working directory
+        os.chdir(workdir)
+        storage = StorageManager(data_dir=data_dir, backend=backend, database=database)
+
+        results = {}
+        has_reportlab = module_available('reportlab')
+        for name, operation, *after in _operations(storage, sample_id=max(1, num_students // 2)):
+            if name.endswith('_to_pdf') and not has_reportlab:
+                # The export would only print a warning and return None
+                results[name] = {'skipped': 'reportlab not installed'}
+                print(f"  {name:<26} {'skipped (no reportlab)':>15}")
+                continue
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                operation()
+                timings.append((time.perf_counter() - start) * 1000)
+                # The mutating cases are a single add/update/delete cycle
+                if name in ('add_student', 'update_student', 'delete_student'):
+                    break
+            for hook in after:
+                hook()
+            results[name] = {
+                'runs': len(timings),
+                'min_ms': round(min(timings), 3),
+                'median_ms': round(statistics.median(timings), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+            }
+            print(f"  {name:<26} {results[name]['median_ms']:>12.3f} ms")
+
+        if storage.connection:
+            storage.connection.close()
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': backend,
+        'students': num_students,
+        'rows': counts,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def save_results(document, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = os.path.join(results_dir, f"{stamp}_{document['commit'] or 'nogit'}_"
+                                         f"{document['backend']}_{document['students']}.json")
+    with open(filename, 'w') as file:
+        json.dump(document, file, indent=2)
+    return filename
+
+
+def compare(baseline, candidate, threshold=1.2):
+    """Return the operations whose median got slower than threshold times the baseline"""
+    regressions = []
+    for name, result in candidate['results'].items():
+        before = baseline['results'].get(name)
+        if 'skipped' in result or not before or 'skipped' in before or before['median_ms'] <= 0:
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        if ratio > threshold:
+            regressions.append((name, before['median_ms'], result['median_ms'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StorageManager operations")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="run the benchmark suite")
+    run_parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k')
+    run_parser.add_argument('--students', type=int, help="exact student count (overrides --scale)")
+    run_parser.add_argument('--backend', choices=['csv', 'mysql', 'all'], default='csv')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--results-dir', default=RESULTS_DIR)
+
+    compare_parser = subparsers.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=1.2,
+                                help="slowdown ratio that counts as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        num_students = args.students or datagen.SCALES[args.scale]
+        backends = ['csv', 'mysql'] if args.backend == 'all' else [args.backend]
+        for backend in backends:
+            print(f"Benchmarking {backend} backend with {num_students} students...")
+            try:
+                document = run_benchmarks(backend, num_students, repeat=args.repeat)
+            except RuntimeError as e:
+                print(f"Skipping {backend}: {e}")
+                continue
+            print(f"Results saved to {save_results(document, args.results_dir)}")
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.candidate) as file:
+            candidate = json.load(file)
+        regressions = compare(baseline, candidate, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if not regressions:
+            print("No regressions found.")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
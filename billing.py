@@ -0,0 +1,154 @@
+"""
+Monthly billing from stay records.
+
+Every stay overlapping the billing month is charged its room type's monthly
+rate (BILLING_CONFIG['rates']), prorated by the days stayed in that month.
+Stays are half-open [check_in, check_out): the check-out day is not charged.
+Charges are computed with pandas/NumPy array arithmetic over all stays at
+once and posted to the ledger in one batch; invoices (one per student and
+month, one line per stay) are exported by streaming the ledger.
+"""
+
+import calendar
+import csv
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from config import BILLING_CONFIG
+from storage import LEDGER_COLUMNS
+
+INVOICE_COLUMNS = ('period', 'student_id', 'name', 'email') + LEDGER_COLUMNS[3:10]
+
+
+def month_bounds(period):
+    """First day of the month 'YYYY-MM' and first day of the next month"""
+    start = datetime.strptime(period, '%Y-%m').date()
+    days = calendar.monthrange(start.year, start.month)[1]
+    return start, date.fromordinal(start.toordinal() + days)
+
+
+def compute_charges(stays, room_types, period, rates=None, default_rate=None):
+    """Prorated charges for the month as a DataFrame with LEDGER_COLUMNS[2:10]
+
+    stays: (id, student_id, room_number, check_in, check_out) rows.
+    room_types: {room_number: room_type}. A stay in a room type without a
+    rate (and no default_rate) raises ValueError.
+    """
+    rates = BILLING_CONFIG['rates'] if rates is None else rates
+    default_rate = BILLING_CONFIG['default_rate'] if default_rate is None else default_rate
+    start, stop = month_bounds(period)
+    month_days = (stop - start).days
+    frame = pd.DataFrame.from_records(list(stays), columns=['id', 'student_id', 'room_number', 'check_in', 'check_out'])
+
+    check_in = pd.to_datetime(frame['check_in']).to_numpy().astype('datetime64[D]')
+    check_out = pd.to_datetime(frame['check_out']).to_numpy().astype('datetime64[D]')
+    stop_day = np.datetime64(stop, 'D')
+    # Open stays run to the end of the month
+    check_out = np.where(np.isnat(check_out), stop_day, check_out)
+    first = np.maximum(check_in, np.datetime64(start, 'D'))
+    last = np.minimum(check_out, stop_day)
+    days = (last - first).astype(np.int64)
+    billed = days > 0
+
+    charges = pd.DataFrame({
+        'student_id': frame['student_id'].to_numpy()[billed].astype(np.int64),
+        'room_number': frame['room_number'].astype(str).to_numpy()[billed],
+        'start_date': first[billed],
+        'end_date': last[billed] - np.timedelta64(1, 'D'),
+        'days': days[billed],
+    })
+    charges.insert(2, 'room_type', charges['room_number'].map(room_types))
+    # Room types are free text, so ' Double' and 'double' share a rate
+    rates = {str(kind).strip().lower(): rate for kind, rate in rates.items()}
+    monthly_rate = charges['room_type'].astype('string').str.strip().str.lower().map(rates).astype(float)
+    if default_rate is not None:
+        monthly_rate = monthly_rate.fillna(float(default_rate))
+    if monthly_rate.isna().any():
+        missing = sorted({str(kind) for kind in charges.loc[monthly_rate.isna(), 'room_type']})
+        raise ValueError(f"No monthly rate for room type(s): {', '.join(missing)}")
+    charges['monthly_rate'] = monthly_rate.round(2)
+    charges['amount'] = (monthly_rate * charges['days'] / month_days).round(2)
+    charges['start_date'] = charges['start_date'].dt.strftime('%Y-%m-%d')
+    charges['end_date'] = charges['end_date'].dt.strftime('%Y-%m-%d')
+    return charges.sort_values(['student_id', 'start_date'], kind='stable').reset_index(drop=True)
+
+
+def run_month(storage, period, replace=False):
+    """Compute the month's charges from the stays and post them to the ledger
+
+    Returns (lines posted, total amount), or None if the ledger write failed.
+    A month already in the ledger raises ValueError unless replace is set.
+    """
+    start, stop = month_bounds(period)
+    room_types = {room_number: room_type for _, room_number, _, room_type, _ in storage.iter_rooms()}
+    charges = compute_charges(storage.iter_stays(start, stop), room_types, period)
+    posted = storage.post_ledger(period, charges.itertuples(index=False, name=None), replace=replace)
+    if posted is None:
+        return None
+    return posted, round(float(charges['amount'].sum()), 2)
+
+
+def _invoice_lines(storage, period):
+    """Ledger lines of the month with the student's name and email, by student"""
+    names = {row[0]: (row[1], row[2]) for row in storage.iter_students()}
+    for row in storage.iter_ledger(period):
+        name, email = names.get(row[2], ('', ''))
+        yield (row[1], row[2], name, email) + tuple(row[3:10])
+
+
+def export_invoices_csv(storage, period, filename=None):
+    """Stream the month's invoice lines to a CSV file; returns (filename, lines)"""
+    filename = filename or f"invoices_{period}.csv"
+    count = 0
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(INVOICE_COLUMNS)
+        for line in _invoice_lines(storage, period):
+            writer.writerow(line)
+            count += 1
+    return filename, count
+
+
+def export_invoices_pdf(storage, period, filename=None):
+    """One invoice per student, written page by page; returns (filename, invoices) or None without ReportLab"""
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        print("ReportLab not available. Cannot export to PDF.")
+        return None
+
+    filename = filename or f"invoices_{period}.pdf"
+    c = canvas.Canvas(filename, pagesize=letter)
+    width, height = letter
+    currency = BILLING_CONFIG['currency']
+    invoices = 0
+    current, total, y = None, 0.0, height - 50
+
+    def close_invoice():
+        c.drawString(350, y - 10, f"Total: {total:.2f} {currency}")
+        c.showPage()
+
+    for _, student_id, name, email, room_number, room_type, start_date, end_date, days, rate, amount in \
+            _invoice_lines(storage, period):
+        if student_id != current:
+            if current is not None:
+                close_invoice()
+            current, total, y = student_id, 0.0, height - 50
+            invoices += 1
+            c.drawString(50, y, f"Invoice {period}-{student_id}")
+            c.drawString(50, y - 20, f"{name} <{email}>")
+            y -= 60
+        c.drawString(50, y, f"Room {room_number} ({room_type or 'n/a'}), {start_date} to {end_date}: "
+                            f"{days} days at {float(rate):.2f}/month = {float(amount):.2f} {currency}")
+        total += float(amount)
+        y -= 20
+        if y < 80:
+            c.showPage()
+            y = height - 50
+    if current is not None:
+        close_invoice()
+    c.save()
+    return filename, invoices
@@ -1,7 +1,57 @@
-# MySQL Database Configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'root',  # Change this to your MySQL password
-    'database': 'hostel_management'
-}
+# MySQL Database Configuration
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': 'root',  # Change this to your MySQL password
+    'database': 'hostel_management'
+}
+
+# Storage instrumentation (opt-in, or set HOSTEL_METRICS=1)
+METRICS_CONFIG = {
+    'enabled': False,
+    'slow_op_ms': 250,  # Operations slower than this go to the slow-op log
+    'slow_log': 'logs/slow_ops.log',
+    'textfile': 'metrics/hostel_storage.prom',  # Prometheus textfile, None to disable
+    'textfile_interval': 15,  # Seconds between textfile rewrites
+    'http_port': None,  # e.g. 9464 to serve /metrics on localhost
+}
+
+# Tk event-loop profiler (opt-in, or set HOSTEL_UI_PROFILE=1)
+UI_PROFILER_CONFIG = {
+    'enabled': False,
+    'stall_ms': 100,  # Mainloop blocks longer than this are logged with their stack
+    'heartbeat_ms': 50,
+    'log': 'logs/ui_profile.log',
+    'overlay_key': '<F12>',  # Toggles the debug overlay
+}
+
+# MySQL detection: connect timeout and background retry schedule
+MYSQL_PROBE_CONFIG = {
+    'connect_timeout': 2,  # Seconds before a connect attempt gives up
+    'initial_delay': 1,  # Seconds before the first retry
+    'backoff': 2.0,  # Delay multiplier after each failed attempt
+    'max_delay': 60,
+    'retries': None,  # Reconnect attempts while offline; None keeps retrying
+}
+
+# Hostel blocks kept as separate storage shards (empty keeps the single data/ store)
+SHARD_CONFIG = {
+    'blocks': [],  # e.g. ['A', 'B', 'C']
+    'data_root': 'data/blocks',  # CSV shard of block X lives in data/blocks/X
+    'workers': None,  # Processes for cross-block queries, None for one per block
+}
+
+# Monthly rate per room type, prorated by the days stayed (see billing.py)
+BILLING_CONFIG = {
+    'rates': {'single': 500.00, 'double': 350.00, 'triple': 280.00, 'dormitory': 200.00},
+    'default_rate': None,  # Rate for room types missing above; None makes billing fail instead
+    'currency': 'USD',
+}
+
+# Gate swipe log, one append-only CSV per day under <data dir>/gate_log
+GATE_LOG_CONFIG = {
+    'dir': 'gate_log',
+    'batch_size': 5000,  # Buffered swipes that trigger an early flush
+    'flush_interval': 1.0,  # Seconds between background flushes
+    'cached_days': 31,  # Parsed past days kept in memory for queries
+}
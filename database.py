@@ -1,6 +1,7 @@
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
+import migrations
 import pandas as pd
 from datetime import datetime
 
@@ -15,44 +16,10 @@ def create_connection():
     return connection
 
 def create_tables():
-    """Create tables if they don't exist"""
+    """Apply any pending schema migrations"""
     connection = create_connection()
     if connection:
-        cursor = connection.cursor()
-        # Users table for authentication
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role ENUM('admin', 'student') NOT NULL
-            )
-        """)
-        # Students table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                phone VARCHAR(20),
-                room_number VARCHAR(10),
-                check_in_date DATE,
-                check_out_date DATE,
-                status ENUM('active', 'inactive') DEFAULT 'active'
-            )
-        """)
-        # Rooms table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                room_number VARCHAR(10) UNIQUE NOT NULL,
-                capacity INT NOT NULL,
-                room_type VARCHAR(50),
-                occupied INT DEFAULT 0
-            )
-        """)
-        connection.commit()
-        cursor.close()
+        migrations.migrate(connection)
         connection.close()
 
 def authenticate_user(username, password):
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Hostel Management System - Synthetic Data Generator
+Writes realistic users, students, rooms and stays CSV files for benchmarking.
+"""
+
+import argparse
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+# Number of students generated for each named scale
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+ROOM_TYPES = [
+    # (room_type, capacity, share of rooms)
+    ('single', 1, 0.15),
+    ('double', 2, 0.55),
+    ('triple', 3, 0.20),
+    ('dormitory', 6, 0.10),
+]
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Diya', 'Ishaan', 'Kavya',
+    'Meera', 'Neha', 'Nikhil', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Sanya',
+    'Siddharth', 'Sneha', 'Tanvi', 'Varun', 'Vikram', 'Yash', 'Zara', 'Kabir',
+]
+
+LAST_NAMES = [
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Gupta', 'Iyer', 'Joshi', 'Kapoor',
+    'Khan', 'Kumar', 'Mehta', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah',
+    'Sharma', 'Singh', 'Verma', 'Yadav',
+]
+
+HEADERS = {
+    'users.csv': ['id', 'username', 'password', 'role'],
+    'students.csv': ['id', 'name', 'email', 'phone', 'room_number', 'check_in_date', 'check_out_date', 'status'],
+    'rooms.csv': ['id', 'room_number', 'capacity', 'room_type', 'occupied'],
+    'stays.csv': ['id', 'student_id', 'room_number', 'check_in', 'check_out'],
+}
+
+
+def plan_rooms(num_students, rng, headroom=1.1):
+    """Build enough rooms for num_students with some spare beds"""
+    rooms = []
+    beds = 0
+    weights = [share for _, _, share in ROOM_TYPES]
+    while beds < num_students * headroom:
+        room_type, capacity, _ = rng.choices(ROOM_TYPES, weights)[0]
+        rooms.append([len(rooms) + 1, str(len(rooms) + 101), capacity, room_type, 0])
+        beds += capacity
+    return rooms
+
+
+def generate(data_dir, num_students, seed=42, inactive_share=0.05, today=None):
+    """Write a full synthetic data set into data_dir and return the row counts"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    os.makedirs(data_dir, exist_ok=True)
+
+    rooms = plan_rooms(num_students, rng)
+    free_beds = [room for room in rooms for _ in range(room[2])]
+    rng.shuffle(free_beds)
+
+    paths = {name: os.path.join(data_dir, name) for name in HEADERS}
+    files = {name: open(path, 'w', newline='') for name, path in paths.items()}
+    try:
+        writers = {name: csv.writer(file) for name, file in files.items()}
+        for name, headers in HEADERS.items():
+            writers[name].writerow(headers)
+
+        writers['users.csv'].writerow([1, 'admin', 'admin123', 'admin'])
+        stay_id = 0
+        for student_id in range(1, num_students + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            email = f"{first.lower()}.{last.lower()}{student_id}@example.edu"
+            phone = str(rng.randint(6000000000, 9999999999))
+            check_in = today - timedelta(days=rng.randint(0, 3 * 365))
+            room = free_beds.pop() if free_beds else None
+            room_number = room[1] if room else ''
+
+            if rng.random() < inactive_share:
+                status = 'inactive'
+                check_out = check_in + timedelta(days=rng.randint(30, 365))
+                check_out = min(check_out, today)
+            else:
+                status = 'active'
+                check_out = ''
+                if room:
+                    room[4] += 1
+
+            writers['students.csv'].writerow([student_id, f"{first} {last}", email, phone,
+                                              room_number, check_in, check_out, status])
+            writers['users.csv'].writerow([student_id + 1, email, 'student123', 'student'])
+            if room:
+                stay_id += 1
+                writers['stays.csv'].writerow([stay_id, student_id, room_number, check_in, check_out])
+
+        writers['rooms.csv'].writerows(rooms)
+    finally:
+        for file in files.values():
+            file.close()
+
+    return {'users': num_students + 1, 'students': num_students, 'rooms': len(rooms), 'stays': stay_id}
+
+
+def load_into_mysql(data_dir, database, batch_size=5000):
+    """Copy a generated data set into a MySQL database, replacing its rows"""
+    from storage import StorageManager
+
+    storage = StorageManager(data_dir=data_dir, backend='mysql', database=database)
+    cursor = storage.connection.cursor()
+    for name in ('stays', 'students', 'rooms', 'users'):
+        cursor.execute(f"DELETE FROM {name}")
+    for name, headers in HEADERS.items():
+        table = name[:-len('.csv')]
+        placeholders = ', '.join(['%s'] * len(headers))
+        sql = f"INSERT INTO {table} ({', '.join(headers)}) VALUES ({placeholders})"
+        with open(os.path.join(data_dir, name), newline='') as file:
+            reader = csv.reader(file)
+            next(reader)
+            batch = []
+            for row in reader:
+                batch.append([value if value != '' else None for value in row])
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+    storage.connection.commit()
+    cursor.close()
+    storage.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic hostel data")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--students', type=int, help="exact student count (overrides --scale)")
+    parser.add_argument('--data-dir', default=os.path.join('bench_data', 'data'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mysql-database', help="also load the data into this MySQL database")
+    args = parser.parse_args()
+
+    num_students = args.students or SCALES[args.scale]
+    counts = generate(args.data_dir, num_students, seed=args.seed)
+    print(f"Generated {counts} in {args.data_dir}")
+    if args.mysql_database:
+        load_into_mysql(args.data_dir, args.mysql_database)
+        print(f"Loaded into MySQL database {args.mysql_database}")
+
+
+if __name__ == "__main__":
+    main()
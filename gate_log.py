@@ -0,0 +1,198 @@
+"""
+Gate entry/exit log: append-only CSV files, one per day.
+
+Swipes are buffered in memory and appended by a background flusher in
+batches, one write per day file, so recording a swipe never waits on disk.
+Days before today never change once written; they are parsed once into
+NumPy arrays and kept in a small LRU cache. Range queries only open the
+files of the days asked for, and today's roll-up counters are updated as
+swipes are recorded instead of being recounted.
+"""
+
+import atexit
+import csv
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from config import GATE_LOG_CONFIG
+
+DIRECTIONS = ('in', 'out')
+COLUMNS = ('time', 'student_id', 'direction', 'gate')
+
+
+def _day_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+class GateLog:
+    def __init__(self, root, batch_size=None, flush_interval=None, cached_days=None):
+        self.root = root
+        self.batch_size = batch_size or GATE_LOG_CONFIG['batch_size']
+        self.flush_interval = flush_interval or GATE_LOG_CONFIG['flush_interval']
+        self.cached_days = cached_days or GATE_LOG_CONFIG['cached_days']
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()  # guards the buffer, cache and roll-up
+        self._write_lock = threading.Lock()  # keeps batches in order on disk
+        self._buffer = []
+        self._days = OrderedDict()  # past day -> parsed arrays
+        self._rollup = None  # [day, entries, exits, {student_id: direction code}] for today
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        # Swipes still buffered when the process exits are written, not lost
+        atexit.register(self.close)
+
+    def path(self, day):
+        return os.path.join(self.root, f"{day.isoformat()}.csv")
+
+    # Writing
+    def record(self, student_id, direction, gate='', at=None):
+        """Buffer one swipe; it reaches the day file with the next batch"""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Gate direction must be 'in' or 'out', not {direction!r}")
+        code = DIRECTIONS.index(direction)
+        at = at or datetime.now()
+        event = (at.isoformat(timespec='seconds'), int(student_id), direction, gate or '')
+        with self._lock:
+            if self._closed:
+                raise ValueError("Gate log is closed")
+            self._buffer.append(event)
+            rollup = self._rollup
+            if rollup is not None and rollup[0] == at.date():
+                rollup[1 + code] += 1
+                rollup[3][event[1]] = code
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error writing gate log: {e}")
+
+    def flush(self):
+        """Append buffered swipes to their day files, one write per day"""
+        with self._write_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            self._write(events)
+
+    def _write(self, events):
+        # Called with _write_lock held; record() keeps buffering meanwhile
+        by_day = {}
+        for event in events:
+            by_day.setdefault(event[0][:10], []).append(event)
+        for day, rows in by_day.items():
+            path = os.path.join(self.root, f"{day}.csv")
+            is_new = not os.path.exists(path)
+            with open(path, 'a', newline='') as file:
+                # Quotes gate names with commas or quotes in them
+                writer = csv.writer(file, lineterminator='\n')
+                if is_new:
+                    writer.writerow(COLUMNS)
+                writer.writerows(rows)
+        with self._lock:
+            for day in by_day:
+                # A late swipe for a cached day invalidates its arrays
+                self._days.pop(date.fromisoformat(day), None)
+
+    def close(self):
+        atexit.unregister(self.close)
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+
+    # Reading
+    def _read_day(self, day):
+        """Swipes of one day as arrays (times, student_ids, direction codes, gates) in time order"""
+        path = self.path(day)
+        if not os.path.exists(path):
+            return None
+        import pandas as pd
+
+        frame = pd.read_csv(path, dtype={'time': str, 'student_id': np.int64, 'direction': str, 'gate': str},
+                            keep_default_na=False)
+        times = frame['time'].to_numpy(dtype='datetime64[s]')
+        order = np.argsort(times, kind='stable')
+        directions = (frame['direction'].to_numpy() == DIRECTIONS[1]).astype(np.int8)
+        return (times[order], frame['student_id'].to_numpy()[order], directions[order],
+                frame['gate'].to_numpy(dtype=object)[order])
+
+    def _load_day(self, day):
+        if day >= date.today():
+            self.flush()
+            return self._read_day(day)
+        with self._lock:
+            if day in self._days:
+                self._days.move_to_end(day)
+                return self._days[day]
+        arrays = self._read_day(day)
+        with self._lock:
+            self._days[day] = arrays
+            while len(self._days) > self.cached_days:
+                self._days.popitem(last=False)
+        return arrays
+
+    def events(self, start, end=None, student_id=None):
+        """Yield (time, student_id, direction, gate) for the days start..end, optionally for one student"""
+        for day in _day_range(start, end or start):
+            arrays = self._load_day(day)
+            if arrays is None:
+                continue
+            times, student_ids, directions, gates = arrays
+            rows = np.flatnonzero(student_ids == student_id) if student_id is not None else range(len(times))
+            for i in rows:
+                yield (str(times[i]), int(student_ids[i]), DIRECTIONS[directions[i]], gates[i])
+
+    def daily_counts(self, start, end=None):
+        """[(day, entries, exits, distinct students)] for each day start..end with swipes"""
+        counts = []
+        for day in _day_range(start, end or start):
+            arrays = self._load_day(day)
+            if arrays is None or not len(arrays[0]):
+                continue
+            _, student_ids, directions, _ = arrays
+            exits = int(directions.sum())
+            counts.append((day, len(directions) - exits, exits, len(np.unique(student_ids))))
+        return counts
+
+    def summary(self):
+        """Today's roll-up: entries, exits and students whose last swipe today was an exit"""
+        today = date.today()
+        with self._lock:
+            rollup = self._rollup if self._rollup is not None and self._rollup[0] == today else None
+        if rollup is None:
+            # Counted from the file once a day; record() keeps it up to date after that
+            with self._write_lock:
+                with self._lock:
+                    events, self._buffer = self._buffer, []
+                    rollup = self._rollup = [today, 0, 0, {}]
+                self._write(events)
+                arrays = self._read_day(today)
+            if arrays is not None:
+                _, student_ids, directions, _ = arrays
+                exits = int(directions.sum())
+                with self._lock:
+                    rollup[1] += len(directions) - exits
+                    rollup[2] += exits
+                    # Latest swipe per student wins; ones recorded since the file was read are newer
+                    for student_id, code in zip(reversed(student_ids.tolist()), reversed(directions.tolist())):
+                        rollup[3].setdefault(student_id, code)
+        with self._lock:
+            return {
+                'gate_entries_today': rollup[1],
+                'gate_exits_today': rollup[2],
+                'gate_out_now': sum(rollup[3].values()),
+            }
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Hostel Management System - Command Line Interface
+Bulk operations over StorageManager without the Tk GUI, for scripts and cron.
+
+    python -m hostel import students.csv --errors rejected.csv
+    python -m hostel export students --output -
+    python -m hostel report --date 2025-01-31
+    python -m hostel reconcile --repair
+    python -m hostel free-rooms --type double --beds 2
+    python -m hostel preferences import preferences.csv
+    python -m hostel match --apply
+    python -m hostel bill run 2025-01
+    python -m hostel gate ingest swipes.csv
+    python -m hostel audit --student 42
+    python -m hostel snapshot create
+    python -m hostel --block A import block_a.csv
+    python -m hostel blocks report
+    python -m hostel bench --scale 1k
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from storage import PREFERENCE_COLUMNS, ROOM_COLUMNS, STUDENT_COLUMNS, StorageManager
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2  # argparse uses 2 for bad arguments
+EXIT_PARTIAL = 3  # Finished, but some records were rejected or found inconsistent
+
+def _open_storage(args):
+    if args.block:
+        storage = _open_router(args, [args.block]).shard(args.block)
+    else:
+        storage = StorageManager(data_dir=args.data_dir, backend=args.backend)
+    storage.actor = args.actor
+    return storage
+
+
+def _open_router(args, blocks=None):
+    from sharding import ShardRouter
+    return ShardRouter(blocks=blocks, data_root=os.path.join(args.data_dir, 'blocks'), backend=args.backend)
+
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+
+def cmd_import(args):
+    """Validate a students CSV/Excel file chunk by chunk and insert the valid rows in batches"""
+    import validation
+
+    storage = _open_storage(args)
+    added = rejected = 0
+    report = open(args.errors, 'w', newline='') if args.errors else None
+    try:
+        if report:
+            csv.writer(report).writerow(validation.ERROR_COLUMNS)
+        for valid, errors in validation.validate_file(args.file, storage, chunksize=args.batch_size):
+            rejected += errors['row'].nunique()
+            if report:
+                errors.to_csv(report, header=False, index=False)
+            else:
+                for row, error in zip(errors['row'], errors['error']):
+                    _log(f"row {row}: {error}")
+            if valid.empty:
+                continue
+            count = storage.add_students_batch(valid.itertuples(index=False, name=None))
+            if count == 0:
+                _log(f"Batch of {len(valid)} students failed after {added} were added")
+                return EXIT_FAILURE
+            added += count
+    finally:
+        if report:
+            report.close()
+
+    _log(f"Imported {added} students, rejected {rejected}")
+    return EXIT_PARTIAL if rejected else EXIT_OK
+
+
+def cmd_export(args):
+    storage = _open_storage(args)
+    if args.format == 'pdf':
+        if args.output == '-':
+            _log("PDF export needs an --output file")
+            return EXIT_USAGE
+        export = storage.export_students_to_pdf if args.table == 'students' else storage.export_rooms_to_pdf
+        filename = export(args.output)
+        if not filename:
+            return EXIT_FAILURE
+        _log(f"Exported {args.table} to {filename}")
+        return EXIT_OK
+
+    columns, rows = ((STUDENT_COLUMNS, storage.iter_students()) if args.table == 'students'
+                     else (ROOM_COLUMNS, storage.iter_rooms()))
+    if args.output == '-':
+        writer = csv.writer(args.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        with open(args.output, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        _log(f"Exported {args.table} to {args.output}")
+    return EXIT_OK
+
+
+def cmd_report(args):
+    storage = _open_storage(args)
+    on_date = date.fromisoformat(args.date) if args.date else date.today()
+    report = dict(storage.get_dashboard_data())
+    report['date'] = on_date.isoformat()
+    report['occupancy_on_date'] = storage.get_occupancy_on(on_date)
+    report['backend'] = 'mysql' if storage.use_mysql else 'csv'
+    json.dump(report, args.stdout, indent=2, default=lambda v: v.item() if hasattr(v, 'item') else str(v))
+    args.stdout.write('\n')
+    return EXIT_OK
+
+
+def cmd_free_rooms(args):
+    storage = _open_storage(args)
+    writer = csv.writer(args.stdout)
+    writer.writerow(['room_number', 'room_type', 'free_beds'])
+    writer.writerows(storage.find_free_rooms(args.type, beds=args.beds, limit=args.limit))
+    return EXIT_OK
+
+
+def cmd_waitlist(args):
+    storage = _open_storage(args)
+    waitlist = storage.get_waitlist()
+    if args.action == 'add':
+        if not (args.name and args.email):
+            _log("add needs --name and --email")
+            return EXIT_USAGE
+        entry = waitlist.add(args.name, args.email, args.phone, args.type, args.seniority)
+        _log(f"Added {entry['email']} to the waitlist as entry {entry['id']}")
+    elif args.action == 'cancel':
+        if args.id is None or not waitlist.cancel(args.id):
+            _log("cancel needs the id of a waiting entry")
+            return EXIT_USAGE
+    else:
+        writer = csv.writer(args.stdout)
+        writer.writerow(['id', 'name', 'email', 'room_type', 'seniority', 'requested_at'])
+        for entry in waitlist.entries():
+            writer.writerow([entry['id'], entry['name'], entry['email'], entry['room_type'] or '',
+                             entry['seniority'], entry['requested_at']])
+    return EXIT_OK
+
+
+def cmd_preferences(args):
+    """Roommate preferences: import a CSV with PREFERENCE_COLUMNS, or list the saved ones"""
+    storage = _open_storage(args)
+    if args.action == 'import':
+        if not args.file:
+            _log("import needs a CSV file")
+            return EXIT_USAGE
+        with open(args.file, newline='') as file:
+            rows = [[row.get(column) for column in PREFERENCE_COLUMNS] for row in csv.DictReader(file)]
+        saved = storage.save_preferences(rows)
+        _log(f"Saved preferences of {saved} students")
+        return EXIT_OK if saved == len(rows) else EXIT_FAILURE
+    writer = csv.writer(args.stdout)
+    writer.writerow(PREFERENCE_COLUMNS)
+    writer.writerows((student_id,) + values for student_id, values in sorted(storage.get_preferences().items()))
+    return EXIT_OK
+
+
+def cmd_match(args):
+    """Pair the students without a room into free rooms by preference, and optionally assign them"""
+    import matching
+
+    storage = _open_storage(args)
+    groups, unplaced = matching.plan_intake(storage, room_type=args.type)
+    writer = csv.writer(args.stdout)
+    writer.writerow(['room_number', 'student_id', 'score'])
+    for room_number, members, score in groups:
+        writer.writerows((room_number, student_id, '' if score is None else f"{score:.3f}") for student_id in members)
+    placed = sum(len(members) for _, members, _ in groups)
+    _log(f"Planned {placed} students into {len(groups)} rooms; {len(unplaced)} left without a bed")
+    if args.apply:
+        assigned = storage.assign_rooms((student_id, room_number)
+                                        for room_number, members, _ in groups for student_id in members)
+        if assigned is None:
+            return EXIT_FAILURE
+        _log(f"Assigned rooms to {assigned} students")
+    return EXIT_PARTIAL if unplaced else EXIT_OK
+
+
+def cmd_bill(args):
+    """Post a month's prorated room charges to the ledger, or export its invoices"""
+    import billing
+
+    storage = _open_storage(args)
+    if args.action == 'run':
+        result = billing.run_month(storage, args.period, replace=args.replace)
+        if result is None:
+            return EXIT_FAILURE
+        lines, total = result
+        _log(f"Posted {lines} ledger lines for {args.period}, total {total:.2f}")
+        return EXIT_OK
+    if args.format == 'pdf':
+        result = billing.export_invoices_pdf(storage, args.period, args.output)
+        if result is None:
+            return EXIT_FAILURE
+        _log(f"Exported {result[1]} invoices to {result[0]}")
+    else:
+        filename, lines = billing.export_invoices_csv(storage, args.period, args.output)
+        _log(f"Exported {lines} invoice lines to {filename}")
+    return EXIT_OK
+
+
+def cmd_gate(args):
+    """Ingest gate swipes, or query them by day range and student"""
+    from gate_log import COLUMNS
+
+    storage = _open_storage(args)
+    gate_log = storage.get_gate_log()
+    try:
+        if args.action == 'ingest':
+            # Columns student_id,direction[,gate[,time]]; a header row is skipped
+            source = sys.stdin if args.file in (None, '-') else open(args.file, newline='')
+            count = 0
+            try:
+                for row in csv.reader(source):
+                    if not row or row[0] == 'student_id':
+                        continue
+                    at = datetime.fromisoformat(row[3]) if len(row) > 3 and row[3] else None
+                    gate_log.record(int(row[0]), row[1], row[2] if len(row) > 2 else '', at)
+                    count += 1
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            _log(f"Logged {count} gate swipes")
+            return EXIT_OK
+        start = date.fromisoformat(args.start) if args.start else date.today()
+        end = date.fromisoformat(args.end) if args.end else start
+        writer = csv.writer(args.stdout)
+        if args.action == 'events':
+            writer.writerow(COLUMNS)
+            writer.writerows(gate_log.events(start, end, student_id=args.student))
+        else:
+            writer.writerow(['day', 'entries', 'exits', 'students'])
+            writer.writerows(gate_log.daily_counts(start, end))
+        return EXIT_OK
+    finally:
+        storage.close()
+
+
+def cmd_audit(args):
+    """Audit entries by student, actor and time range, newest first"""
+    from audit import COLUMNS
+
+    storage = _open_storage(args)
+    writer = csv.writer(args.stdout)
+    writer.writerow(COLUMNS)
+    for entry in storage.get_audit_entries(args.student, args.by, args.start, args.end, args.limit):
+        writer.writerow(json.dumps(entry[column]) if column in ('before', 'after') and entry[column] else entry[column]
+                        for column in COLUMNS)
+    return EXIT_OK
+
+
+def cmd_reconcile(args):
+    """Compare rooms.occupied with the active students and optionally repair it"""
+    storage = _open_storage(args)
+    discrepancies = storage.reconcile_occupancy(repair=args.repair)
+    if discrepancies is None:
+        return EXIT_FAILURE
+    writer = csv.writer(args.stdout)
+    if discrepancies:
+        writer.writerow(['room_number', 'recorded', 'actual'])
+        writer.writerows(discrepancies)
+    action = "repaired" if args.repair else "found"
+    _log(f"{len(discrepancies)} room occupancy discrepancies {action}")
+    return EXIT_PARTIAL if discrepancies and not args.repair else EXIT_OK
+
+
+def cmd_blocks(args):
+    """Queries across every hostel block, run in parallel"""
+    router = _open_router(args, args.blocks.split(',') if args.blocks else None)
+    try:
+        if args.action == 'report':
+            json.dump(router.get_dashboard_data(), args.stdout, indent=2)
+            args.stdout.write('\n')
+        elif args.action == 'search':
+            if not args.text:
+                _log("search needs some text to look for")
+                return EXIT_USAGE
+            writer = csv.writer(args.stdout)
+            writer.writerow(('block',) + STUDENT_COLUMNS)
+            writer.writerows(router.search_students(args.text, limit=args.limit))
+        else:
+            filename, count = router.export_to_csv(args.table, args.output)
+            _log(f"Exported {count} {args.table} from {len(router.blocks)} blocks to {filename}")
+    finally:
+        router.close()
+    return EXIT_OK
+
+
+def cmd_outbox(args):
+    """Writes queued locally while MySQL was unreachable"""
+    from outbox import Outbox
+    from storage import OUTBOX_FILE
+
+    path = os.path.join(args.data_dir, OUTBOX_FILE)
+    if not os.path.exists(path):
+        _log("No outbox; nothing was queued")
+        return EXIT_OK
+    if args.action == 'replay':
+        # Connecting replays the outbox
+        storage = StorageManager(data_dir=args.data_dir, backend='mysql')
+        storage.close()
+    queue = Outbox(path)
+    try:
+        conflicts = queue.conflicts()
+        if args.action == 'conflicts':
+            writer = csv.writer(args.stdout)
+            writer.writerow(['seq', 'operation', 'args', 'queued_on', 'error'])
+            writer.writerows((seq, operation, json.dumps(values), queued_on, error)
+                             for seq, operation, values, queued_on, error in conflicts)
+        _log(f"{queue.pending_count()} writes pending, {len(conflicts)} conflicts")
+    finally:
+        queue.close()
+    return EXIT_PARTIAL if conflicts else EXIT_OK
+
+
+def cmd_bench(args):
+    import benchmark
+    import datagen
+
+    num_students = args.students or datagen.SCALES[args.scale]
+    backend = args.backend or 'csv'
+    try:
+        document = benchmark.run_benchmarks(backend, num_students, repeat=args.repeat)
+    except RuntimeError as e:
+        _log(str(e))
+        return EXIT_FAILURE
+    _log(f"Results saved to {benchmark.save_results(document, args.results_dir)}")
+    return EXIT_OK
+
+
+def cmd_snapshot(args):
+    from snapshots import SnapshotStore
+
+    store = SnapshotStore(args.data_dir, args.snapshot_dir)
+    if args.action == 'create':
+        manifest = store.create()
+        _log(f"Snapshot {manifest['id']} taken, {manifest['bytes_stored']} new bytes stored")
+        args.stdout.write(manifest['id'] + '\n')
+    elif args.action == 'list':
+        for snapshot_id in store.list_snapshots():
+            args.stdout.write(snapshot_id + '\n')
+    elif args.action == 'restore':
+        if not args.id:
+            _log("restore needs a snapshot id")
+            return EXIT_USAGE
+        store.restore(args.id)
+        _log(f"Restored snapshot {args.id} into {args.data_dir}")
+    else:
+        removed = store.prune(args.keep)
+        _log(f"Pruned snapshots, removed {removed} unreferenced chunks")
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='hostel', description="Hostel Management System command line")
+    parser.add_argument('--data-dir', default='data', help="CSV data directory")
+    parser.add_argument('--backend', choices=['mysql', 'csv'], help="force a storage backend")
+    parser.add_argument('--block', help="work on one hostel block (stored under <data-dir>/blocks/<block>)")
+    parser.add_argument('--actor', default='cli', help="name recorded in the audit log for changes")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="bulk import students from CSV")
+    import_parser.add_argument('file', help="CSV or Excel file with name,email,phone,room_number columns")
+    import_parser.add_argument('--batch-size', type=int, default=50000, help="rows validated and inserted per chunk")
+    import_parser.add_argument('--errors', help="write the per-row error report to this CSV file")
+    import_parser.set_defaults(handler=cmd_import)
+
+    export_parser = subparsers.add_parser('export', help="export students or rooms")
+    export_parser.add_argument('table', choices=['students', 'rooms'])
+    export_parser.add_argument('--output', '-o', default='-', help="output file ('-' for stdout)")
+    export_parser.add_argument('--format', choices=['csv', 'pdf'], default='csv')
+    export_parser.set_defaults(handler=cmd_export)
+
+    report_parser = subparsers.add_parser('report', help="print dashboard figures as JSON")
+    report_parser.add_argument('--date', help="occupancy date (YYYY-MM-DD, default today)")
+    report_parser.set_defaults(handler=cmd_report)
+
+    free_parser = subparsers.add_parser('free-rooms', help="best-fit rooms with free beds")
+    free_parser.add_argument('--type', help="room type (default any)")
+    free_parser.add_argument('--beds', type=int, default=1, help="free beds needed")
+    free_parser.add_argument('--limit', type=int, default=20)
+    free_parser.set_defaults(handler=cmd_free_rooms)
+
+    waitlist_parser = subparsers.add_parser('waitlist', help="students waiting for a free bed")
+    waitlist_parser.add_argument('action', choices=['list', 'add', 'cancel'])
+    waitlist_parser.add_argument('id', nargs='?', type=int, help="entry to cancel")
+    waitlist_parser.add_argument('--name')
+    waitlist_parser.add_argument('--email')
+    waitlist_parser.add_argument('--phone', default='')
+    waitlist_parser.add_argument('--type', help="preferred room type (default any)")
+    waitlist_parser.add_argument('--seniority', type=int, default=0, help="higher is served first")
+    waitlist_parser.set_defaults(handler=cmd_waitlist)
+
+    preferences_parser = subparsers.add_parser('preferences', help="roommate preferences of students")
+    preferences_parser.add_argument('action', choices=['list', 'import'])
+    preferences_parser.add_argument('file', nargs='?', help="CSV with student_id,sleep_schedule,course,year columns")
+    preferences_parser.set_defaults(handler=cmd_preferences)
+
+    match_parser = subparsers.add_parser('match', help="pair students without a room into free rooms by preference")
+    match_parser.add_argument('--type', help="only use rooms of this type")
+    match_parser.add_argument('--apply', action='store_true', help="write the planned assignments")
+    match_parser.set_defaults(handler=cmd_match)
+
+    bill_parser = subparsers.add_parser('bill', help="monthly room charges and invoices")
+    bill_parser.add_argument('action', choices=['run', 'export'])
+    bill_parser.add_argument('period', help="billing month (YYYY-MM)")
+    bill_parser.add_argument('--replace', action='store_true', help="re-run a month that is already billed")
+    bill_parser.add_argument('--format', choices=['csv', 'pdf'], default='csv')
+    bill_parser.add_argument('--output', '-o', help="invoice file (default invoices_<period>.<format>)")
+    bill_parser.set_defaults(handler=cmd_bill)
+
+    gate_parser = subparsers.add_parser('gate', help="gate entry/exit swipes")
+    gate_parser.add_argument('action', choices=['ingest', 'events', 'counts'])
+    gate_parser.add_argument('file', nargs='?', help="swipes CSV to ingest ('-' or none for stdin)")
+    gate_parser.add_argument('--start', help="first day (YYYY-MM-DD, default today)")
+    gate_parser.add_argument('--end', help="last day (default --start)")
+    gate_parser.add_argument('--student', type=int, help="only this student's swipes")
+    gate_parser.set_defaults(handler=cmd_gate)
+
+    audit_parser = subparsers.add_parser('audit', help="who changed what, newest first")
+    audit_parser.add_argument('--student', type=int, help="changes to this student")
+    audit_parser.add_argument('--by', help="changes made by this user")
+    audit_parser.add_argument('--start', help="from this time (ISO date or timestamp)")
+    audit_parser.add_argument('--end', help="before this time")
+    audit_parser.add_argument('--limit', type=int)
+    audit_parser.set_defaults(handler=cmd_audit)
+
+    reconcile_parser = subparsers.add_parser('reconcile', help="recompute room occupancy from the students")
+    reconcile_parser.add_argument('--repair', action='store_true', help="write the corrected counts")
+    reconcile_parser.set_defaults(handler=cmd_reconcile)
+
+    blocks_parser = subparsers.add_parser('blocks', help="dashboard, search or export across all hostel blocks")
+    blocks_parser.add_argument('action', choices=['report', 'search', 'export'])
+    blocks_parser.add_argument('text', nargs='?', help="name or email text to search for")
+    blocks_parser.add_argument('--blocks', help="comma-separated blocks (default SHARD_CONFIG['blocks'])")
+    blocks_parser.add_argument('--limit', type=int, help="maximum search results")
+    blocks_parser.add_argument('--table', choices=['students', 'rooms'], default='students', help="table to export")
+    blocks_parser.add_argument('--output', '-o', help="export file")
+    blocks_parser.set_defaults(handler=cmd_blocks)
+
+    outbox_parser = subparsers.add_parser('outbox', help="writes queued while MySQL was unreachable")
+    outbox_parser.add_argument('action', choices=['status', 'conflicts', 'replay'])
+    outbox_parser.set_defaults(handler=cmd_outbox)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="incremental snapshots of the data directory")
+    snapshot_parser.add_argument('action', choices=['create', 'list', 'restore', 'prune'])
+    snapshot_parser.add_argument('id', nargs='?', help="snapshot to restore")
+    snapshot_parser.add_argument('--snapshot-dir', default='snapshots')
+    snapshot_parser.add_argument('--keep', type=int, default=30, help="snapshots kept by prune")
+    snapshot_parser.set_defaults(handler=cmd_snapshot)
+
+    bench_parser = subparsers.add_parser('bench', help="run the storage benchmarks")
+    bench_parser.add_argument('--scale', default='1k', choices=['1k', '100k', '1m'])
+    bench_parser.add_argument('--students', type=int)
+    bench_parser.add_argument('--repeat', type=int, default=5)
+    bench_parser.add_argument('--results-dir', default='bench_results')
+    bench_parser.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Storage reports problems with print(); keep stdout for data only
+    args.stdout = sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.handler(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        _log(f"Error: {e}")
+        return EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
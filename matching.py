@@ -0,0 +1,166 @@
+"""
+Roommate matching for an intake of students without a room.
+
+Each student's preferences (sleep schedule, course, year) are encoded as
+small NumPy vectors. Students are blocked by sleep schedule, the strongest
+preference, and each block is cut into chunks of at most MAX_BLOCK students
+sorted by course and year, so similar students share a chunk. Within a
+chunk every pair is scored at once by broadcasting, and rooms are filled
+greedily: the best remaining pair seeds a room and further beds go to the
+student with the highest summed score against the room's members. Work is
+O(chunk²) per chunk instead of O(n²) over the whole intake.
+"""
+
+import numpy as np
+
+SLEEP_SCHEDULES = ('early', 'normal', 'late')
+
+# Relative weight of each preference in a pair score (scores lie in 0..1)
+WEIGHTS = {'sleep': 0.5, 'course': 0.3, 'year': 0.2}
+MAX_BLOCK = 1000
+MAX_YEAR_GAP = 3  # years apart at which the year score reaches 0
+
+
+def encode(preferences):
+    """Preference rows (sleep_schedule, course, year) as NumPy arrays
+
+    Unknown values become -1 (sleep, course) or NaN (year); pairs missing a
+    value score 0.5 on it.
+    """
+    sleep_codes = {schedule: code for code, schedule in enumerate(SLEEP_SCHEDULES)}
+    course_codes = {}
+    sleep = np.empty(len(preferences), dtype=np.int8)
+    course = np.empty(len(preferences), dtype=np.int32)
+    year = np.empty(len(preferences), dtype=np.float32)
+    for i, (sleep_schedule, course_name, study_year) in enumerate(preferences):
+        sleep[i] = sleep_codes.get(sleep_schedule, -1)
+        course[i] = course_codes.setdefault(course_name, len(course_codes)) if course_name else -1
+        year[i] = float(study_year) if study_year not in (None, '') else np.nan
+    return sleep, course, year
+
+
+def pair_scores(sleep, course, year, weights=WEIGHTS):
+    """Symmetric matrix of pair scores; the diagonal is -inf"""
+    known = sleep >= 0
+    sleep_gap = np.abs(sleep[:, None].astype(np.float32) - sleep[None, :]) / (len(SLEEP_SCHEDULES) - 1)
+    sleep_score = np.where(known[:, None] & known[None, :], 1 - sleep_gap, 0.5)
+    course_score = np.where((course[:, None] < 0) | (course[None, :] < 0), 0.5,
+                            course[:, None] == course[None, :])
+    year_gap = np.abs(year[:, None] - year[None, :])
+    year_score = np.where(np.isnan(year_gap), 0.5, 1 - np.minimum(year_gap, MAX_YEAR_GAP) / MAX_YEAR_GAP)
+    scores = (weights['sleep'] * sleep_score + weights['course'] * course_score
+              + weights['year'] * year_score).astype(np.float32)
+    np.fill_diagonal(scores, -np.inf)
+    return scores
+
+
+def group_students(scores, sizes):
+    """Split students into groups of the given sizes, greedily by score
+
+    Returns a list of index lists, one per size, until the students run out.
+    """
+    count = len(scores)
+    free = np.ones(count, dtype=bool)
+    left = count
+    rows, cols = np.triu_indices(count, 1)
+    # Pairs best-first; pairs with a taken member are skipped on the way down
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    position = 0
+    groups = []
+    for size in sizes:
+        if not left:
+            break
+        if size == 1 or left == 1:
+            group = [int(np.argmax(free))]
+        else:
+            while not (free[rows[order[position]]] and free[cols[order[position]]]):
+                position += 1
+            pair = order[position]
+            group = [int(rows[pair]), int(cols[pair])]
+        free[group] = False
+        left -= len(group)
+        while len(group) < size and left:
+            affinity = scores[group].sum(axis=0)
+            affinity[~free] = -np.inf
+            best = int(np.argmax(affinity))
+            group.append(best)
+            free[best] = False
+            left -= 1
+        groups.append(group)
+    return groups
+
+
+def group_score(scores, group):
+    """Mean pair score of a group (None for a single student)"""
+    if len(group) < 2:
+        return None
+    block = scores[np.ix_(group, group)]
+    return float(block[np.triu_indices(len(group), 1)].mean())
+
+
+def _blocks(students, max_block):
+    """Chunks of similar students: same sleep schedule, then sorted by course and year"""
+    by_sleep = {}
+    for student in students:
+        by_sleep.setdefault(student[1] if student[1] in SLEEP_SCHEDULES else None, []).append(student)
+    for block in by_sleep.values():
+        block.sort(key=lambda student: (student[2] or '', str(student[3] or '')))
+        for start in range(0, len(block), max_block):
+            yield block[start:start + max_block]
+
+
+def match(students, rooms, weights=WEIGHTS, max_block=MAX_BLOCK):
+    """Plan room assignments for students
+
+    students: (student_id, sleep_schedule, course, year) tuples.
+    rooms: (room_number, free_beds) pairs; rooms with more free beds are
+    filled first. Current occupants of a room are not scored, and beds left
+    over by one chunk go to the next, so a room can hold several plans.
+    Returns (groups, unplaced) where groups is [(room_number, [student_id],
+    score)] and unplaced lists the students left without a bed.
+    """
+    pool = sorted(rooms, key=lambda room: -room[1])
+    next_room = 0
+    groups = []
+    unplaced = []
+    for chunk in _blocks(students, max_block):
+        # Take rooms until the chunk has a bed for everyone
+        chunk_rooms = []
+        seats = 0
+        while seats < len(chunk) and next_room < len(pool):
+            chunk_rooms.append(pool[next_room])
+            seats += pool[next_room][1]
+            next_room += 1
+        # Bigger rooms first, so single beds go to whoever is left over
+        chunk_rooms.sort(key=lambda room: -room[1])
+        scores = pair_scores(*encode([student[1:] for student in chunk]), weights=weights)
+        chunk_groups = group_students(scores, [beds for _, beds in chunk_rooms])
+        placed = set()
+        spare = []
+        for index, (room_number, beds) in enumerate(chunk_rooms):
+            group = chunk_groups[index] if index < len(chunk_groups) else []
+            if group:
+                groups.append((room_number, [chunk[i][0] for i in group], group_score(scores, group)))
+                placed.update(group)
+            if len(group) < beds:
+                spare.append((room_number, beds - len(group)))
+        # Rooms the chunk left empty or part-filled go back to the pool for the next chunk
+        next_room -= len(spare)
+        pool[next_room:next_room + len(spare)] = spare
+        unplaced.extend(student[0] for i, student in enumerate(chunk) if i not in placed)
+    return groups, unplaced
+
+
+def plan_intake(storage, room_type=None, weights=WEIGHTS):
+    """Match the active students without a room to the rooms with free beds
+
+    Students without saved preferences are still placed, scoring 0.5 on
+    every preference.
+    """
+    preferences = storage.get_preferences()
+    students = [(row[0],) + preferences.get(row[0], (None, None, None))
+                for row in storage.iter_students()
+                if row[7] == 'active' and not row[4]]
+    rooms = [(room_number, free) for room_number, _, free
+             in storage.find_free_rooms(room_type, beds=1, limit=float('inf'))]
+    return match(students, rooms, weights=weights)
@@ -0,0 +1,273 @@
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _one_row(result, args, kwargs):
+    return 1 if result else 0
+
+
+def _row_count(result, args, kwargs):
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 1 if result else 0
+
+
+def _repaired_rows(result, args, kwargs):
+    repair = kwargs.get('repair', args[0] if args else False)
+    return len(result) if repair and result else 0
+
+
+# StorageManager methods that write, and the rows a call wrote given (result, args, kwargs)
+WRITE_METHODS = {
+    'add_student': _one_row,
+    'update_student': _one_row,
+    'delete_student': _one_row,
+    'add_room': _one_row,
+    'add_students_batch': _row_count,
+    'save_preferences': _row_count,
+    'assign_rooms': _row_count,
+    'post_ledger': _row_count,
+    'reconcile_occupancy': _repaired_rows,
+}
+
+slow_op_logger = logging.getLogger('hostel.slow_ops')
+
+
+class _OperationStats:
+    __slots__ = ('calls', 'errors', 'total_seconds', 'buckets', 'rows_read', 'rows_written')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.rows_read = 0
+        self.rows_written = 0
+
+
+class StorageMetrics:
+    """Thread-safe call counts, latency histograms, row and cache counters"""
+
+    def __init__(self, slow_op_ms=250):
+        self.slow_op_seconds = slow_op_ms / 1000
+        self.operations = {}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, seconds, rows_read=0, rows_written=0, error=False):
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = _OperationStats()
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.total_seconds += seconds
+            stats.rows_read += rows_read
+            stats.rows_written += rows_written
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+        if seconds >= self.slow_op_seconds:
+            slow_op_logger.warning("slow storage operation %s took %.1f ms (rows read=%d, written=%d)",
+                                   operation, seconds * 1000, rows_read, rows_written)
+
+    def cache_event(self, cache, hit):
+        with self._lock:
+            counts = self.cache.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP hostel_storage_calls_total Storage operation calls.',
+            '# TYPE hostel_storage_calls_total counter',
+        ]
+        with self._lock:
+            operations = sorted(self.operations.items())
+            cache = sorted(self.cache.items())
+            for name, stats in operations:
+                lines.append(f'hostel_storage_calls_total{{operation="{name}"}} {stats.calls}')
+            lines += ['# HELP hostel_storage_errors_total Storage operations that raised.',
+                      '# TYPE hostel_storage_errors_total counter']
+            for name, stats in operations:
+                lines.append(f'hostel_storage_errors_total{{operation="{name}"}} {stats.errors}')
+            lines += ['# HELP hostel_storage_rows_read_total Rows returned by storage operations.',
+                      '# TYPE hostel_storage_rows_read_total counter']
+            for name, stats in operations:
+                lines.append(f'hostel_storage_rows_read_total{{operation="{name}"}} {stats.rows_read}')
+            lines += ['# HELP hostel_storage_rows_written_total Rows written by storage operations.',
+                      '# TYPE hostel_storage_rows_written_total counter']
+            for name, stats in operations:
+                lines.append(f'hostel_storage_rows_written_total{{operation="{name}"}} {stats.rows_written}')
+            lines += ['# HELP hostel_storage_latency_seconds Storage operation latency.',
+                      '# TYPE hostel_storage_latency_seconds histogram']
+            for name, stats in operations:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'hostel_storage_latency_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'hostel_storage_latency_seconds_bucket{{operation="{name}",le="+Inf"}} {stats.calls}')
+                lines.append(f'hostel_storage_latency_seconds_sum{{operation="{name}"}} {stats.total_seconds:.6f}')
+                lines.append(f'hostel_storage_latency_seconds_count{{operation="{name}"}} {stats.calls}')
+            lines += ['# HELP hostel_storage_cache_total Storage cache lookups.',
+                      '# TYPE hostel_storage_cache_total counter']
+            for name, (hits, misses) in cache:
+                lines.append(f'hostel_storage_cache_total{{cache="{name}",result="hit"}} {hits}')
+                lines.append(f'hostel_storage_cache_total{{cache="{name}",result="miss"}} {misses}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write the metrics for the node_exporter textfile collector"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Expose /metrics over HTTP from a daemon thread and return the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _rows_in(name, result):
+    if name.endswith('_page') and result:
+        return len(result[0])  # (rows, total)
+    if isinstance(result, dict) or hasattr(result, 'keys'):
+        return 1
+    if hasattr(result, '__len__'):
+        return len(result)
+    return 0
+
+
+def instrument(storage, metrics, textfile=None, textfile_interval=15):
+    """Wrap every public method of a StorageManager instance with timing
+
+    Public methods call each other (get_students iterates iter_students), so
+    rows read are only counted by the outermost call on each thread.
+    """
+    state = {'last_write': 0.0}
+    nesting = threading.local()
+
+    def after_call(start):
+        if textfile and start - state['last_write'] >= textfile_interval:
+            state['last_write'] = start
+            try:
+                metrics.write_textfile(textfile)
+            except OSError as e:
+                print(f"Error writing metrics file: {e}")
+
+    def wrap(name, method):
+        written_rows = WRITE_METHODS.get(name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            depth = getattr(nesting, 'depth', 0)
+            nesting.depth = depth + 1
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                metrics.observe(name, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                nesting.depth = depth
+            elapsed = time.perf_counter() - start
+            if written_rows:
+                metrics.observe(name, elapsed, rows_written=written_rows(result, args, kwargs))
+            else:
+                metrics.observe(name, elapsed, rows_read=0 if depth else _rows_in(name, result))
+            after_call(start)
+            return result
+
+        return timed
+
+    def wrap_generator(name, method):
+        # Streamed reads run while the caller iterates: time each step and count the rows
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            first = time.perf_counter()
+            outermost = not getattr(nesting, 'depth', 0)
+            iterator = method(*args, **kwargs)
+            elapsed, rows, error = 0.0, 0, False
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        row = next(iterator)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        error = True
+                        raise
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    rows += 1
+                    yield row
+            finally:
+                iterator.close()
+                metrics.observe(name, elapsed, rows_read=rows if outermost else 0, error=error)
+                after_call(first)
+
+        return timed
+
+    for name in dir(type(storage)):
+        if name.startswith('_'):
+            continue
+        method = getattr(storage, name)
+        if inspect.isgeneratorfunction(method):
+            setattr(storage, name, wrap_generator(name, method))
+        elif callable(method):
+            setattr(storage, name, wrap(name, method))
+    storage.metrics = metrics
+    return storage
+
+
+def enable(storage, config):
+    """Instrument storage according to a METRICS_CONFIG style dict"""
+    metrics = StorageMetrics(slow_op_ms=config.get('slow_op_ms', 250))
+    slow_log = config.get('slow_log')
+    if slow_log and not slow_op_logger.handlers:
+        directory = os.path.dirname(slow_log)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.FileHandler(slow_log)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_op_logger.addHandler(handler)
+        slow_op_logger.setLevel(logging.WARNING)
+    instrument(storage, metrics, textfile=config.get('textfile'),
+               textfile_interval=config.get('textfile_interval', 15))
+    if config.get('http_port'):
+        try:
+            metrics.serve(config['http_port'], config.get('http_host', '127.0.0.1'))
+        except OSError as e:
+            print(f"Metrics endpoint not started: {e}")
+    return metrics
@@ -0,0 +1,250 @@
+"""
+Versioned MySQL schema migrations.
+
+Each migration runs once, in order, and is recorded in schema_migrations.
+Steps are SQL strings or callables taking a cursor. Add new migrations to the
+end of MIGRATIONS; never edit one that has already shipped.
+"""
+
+MIGRATIONS_TABLE = 'schema_migrations'
+LOCK_NAME = 'hostel_management_migrations'
+
+
+def _add_index(table, name, columns, unique=False):
+    """Step that creates an index unless it already exists"""
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, name))
+        if cursor.fetchone()[0] == 0:
+            kind = 'UNIQUE INDEX' if unique else 'INDEX'
+            cursor.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+    return step
+
+
+def _add_column(table, column, definition):
+    """Step that adds a column unless it already exists"""
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, column))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+# Counter rows per table in table_versions; a table's version is their sum
+VERSION_SLOTS = 16
+
+
+def _version_triggers(table):
+    """Triggers that count every row written to table in table_versions
+
+    Each connection counts in its own slot row, so concurrent writers do not
+    queue on one hot row; the count commits with the write that made it.
+    """
+    steps = []
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        name = f"trg_{table}_{event.lower()}_version"
+        steps.append(f"DROP TRIGGER IF EXISTS {name}")
+        steps.append(f"""
+            CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW
+            UPDATE table_versions SET version = version + 1
+            WHERE table_name = '{table}' AND slot = CONNECTION_ID() % {VERSION_SLOTS}
+        """)
+    return steps
+
+
+MIGRATIONS = [
+    (1, "Base users, students and rooms tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role ENUM('admin', 'student') NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS students (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            phone VARCHAR(20),
+            room_number VARCHAR(10),
+            check_in_date DATE,
+            check_out_date DATE,
+            status ENUM('active', 'inactive') DEFAULT 'active'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            room_number VARCHAR(10) UNIQUE NOT NULL,
+            capacity INT NOT NULL,
+            room_type VARCHAR(50),
+            occupied INT DEFAULT 0
+        )
+        """,
+        """
+        INSERT IGNORE INTO users (username, password, role)
+        VALUES ('admin', 'admin123', 'admin'), ('student1', 'student123', 'student')
+        """,
+    ]),
+    (2, "Stay history", [
+        """
+        CREATE TABLE IF NOT EXISTS stays (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id INT NOT NULL,
+            room_number VARCHAR(10) NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE,
+            INDEX idx_stays_student (student_id),
+            INDEX idx_stays_room (room_number)
+        )
+        """,
+    ]),
+    (3, "Covering indexes for occupancy checks and the dashboard", [
+        # Room occupancy check: WHERE room_number = ? AND status = 'active'
+        _add_index('students', 'idx_students_room_status', ['room_number', 'status']),
+        # Dashboard: COUNT(*) WHERE status = 'active'
+        _add_index('students', 'idx_students_status', ['status']),
+        # Dashboard: COUNT(*) WHERE occupied > 0 and SUM(capacity - occupied)
+        _add_index('rooms', 'idx_rooms_occupied_capacity', ['occupied', 'capacity']),
+        # Point-in-time stay lookups by room
+        _add_index('stays', 'idx_stays_room_period', ['room_number', 'check_in', 'check_out']),
+    ]),
+    (4, "Link student logins to their student record", [
+        _add_column('users', 'student_id', 'INT NULL'),
+        _add_index('users', 'idx_users_student', ['student_id'], unique=True),
+        # Student logins have used their email address as username
+        """
+        UPDATE users u JOIN students s ON s.email = u.username
+        SET u.student_id = s.id
+        WHERE u.role = 'student' AND u.student_id IS NULL
+        """,
+    ]),
+    (5, "Roommate preferences", [
+        """
+        CREATE TABLE IF NOT EXISTS student_preferences (
+            student_id INT PRIMARY KEY,
+            sleep_schedule VARCHAR(10),
+            course VARCHAR(100),
+            year TINYINT,
+            FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    (6, "Billing ledger and stay lookups by period", [
+        """
+        CREATE TABLE IF NOT EXISTS ledger (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            period CHAR(7) NOT NULL,
+            student_id INT NOT NULL,
+            room_number VARCHAR(10) NOT NULL,
+            room_type VARCHAR(50),
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            days INT NOT NULL,
+            monthly_rate DECIMAL(10, 2) NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            posted_on DATE NOT NULL,
+            INDEX idx_ledger_period_student (period, student_id, start_date)
+        )
+        """,
+        # Billing reads the stays overlapping one month
+        _add_index('stays', 'idx_stays_period', ['check_in', 'check_out']),
+    ]),
+    (7, "Per-table change counters for cache checks", [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name VARCHAR(64) NOT NULL,
+            slot TINYINT NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, slot)
+        )
+        """,
+        "INSERT IGNORE INTO table_versions (table_name, slot) VALUES " + ', '.join(
+            f"('{table}', {slot})" for table in ('users', 'students', 'rooms', 'stays') for slot in range(VERSION_SLOTS)),
+        *_version_triggers('users'),
+        *_version_triggers('students'),
+        *_version_triggers('rooms'),
+        *_version_triggers('stays'),
+    ]),
+    (8, "Indexes for sorted, paged student and room lists", [
+        # email, status, room_number and occupied are already the leading column of an index
+        _add_index('students', 'idx_students_name', ['name']),
+        _add_index('students', 'idx_students_phone', ['phone']),
+        _add_index('students', 'idx_students_check_in', ['check_in_date']),
+        _add_index('rooms', 'idx_rooms_capacity', ['capacity']),
+        _add_index('rooms', 'idx_rooms_type', ['room_type']),
+    ]),
+    (9, "Backfill stay history for students housed before it was recorded", [
+        # Inactive students only get a stay if their check-out date is known
+        """
+        INSERT INTO stays (student_id, room_number, check_in, check_out)
+        SELECT s.id, s.room_number, COALESCE(s.check_in_date, CURDATE()), s.check_out_date
+        FROM students s
+        WHERE s.room_number IS NOT NULL AND s.room_number <> ''
+          AND (s.status = 'active' OR s.check_out_date IS NOT NULL)
+          AND NOT EXISTS (SELECT 1 FROM stays st WHERE st.student_id = s.id)
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(cursor):
+    """Applied schema version, or 0 for a database without the migrations table"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (MIGRATIONS_TABLE,))
+    if cursor.fetchone()[0] == 0:
+        return 0
+    cursor.execute(f"SELECT COALESCE(MAX(version), 0) FROM {MIGRATIONS_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def migrate(connection):
+    """Apply pending migrations and return the list of versions applied"""
+    cursor = connection.cursor()
+    try:
+        if current_version(cursor) >= LATEST_VERSION:
+            return []
+
+        # Serialize concurrent app starts against the same database
+        cursor.execute("SELECT GET_LOCK(%s, 30)", (LOCK_NAME,))
+        cursor.fetchone()
+        try:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            version = current_version(cursor)
+            applied = []
+            for number, description, steps in MIGRATIONS:
+                if number <= version:
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (%s, %s)",
+                               (number, description))
+                connection.commit()
+                applied.append(number)
+                print(f"Applied migration {number}: {description}")
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
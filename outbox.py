@@ -0,0 +1,114 @@
+"""
+Durable local outbox for writes made while MySQL is unreachable.
+
+Writes are appended to a SQLite file in the data directory and replayed in
+order, in batched transactions, once MySQL answers again. A replayed write
+that would break email (or room number) uniqueness, or that targets a
+student deleted in the meantime, is not applied; it is kept in the outbox as
+a conflict for an admin to review.
+
+Replayed writes run the same SQL as live ones (see writes.py). replay() only
+needs a DB-API connection and its placeholder style, so it can be run against
+sqlite3 as a stand-in for MySQL.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import date
+
+from writes import WRITES, Conflict
+
+OPERATIONS = tuple(WRITES)
+
+
+class Outbox:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                operation TEXT NOT NULL,
+                args TEXT NOT NULL,
+                queued_on TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, seq)")
+        self._db.commit()
+
+    def enqueue(self, operation, args, today=None):
+        if operation not in OPERATIONS:
+            raise ValueError(f"Cannot queue {operation}")
+        with self._lock:
+            self._db.execute("INSERT INTO outbox (operation, args, queued_on) VALUES (?, ?, ?)",
+                             (operation, json.dumps(args), str(today or date.today())))
+            self._db.commit()
+
+    def pending(self, limit):
+        """Oldest pending writes as (seq, operation, args, queued_on)"""
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT seq, operation, args, queued_on FROM outbox
+                WHERE status = 'pending' ORDER BY seq LIMIT ?
+            """, (limit,)).fetchall()
+        return [(seq, operation, json.loads(args), queued_on) for seq, operation, args, queued_on in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def conflicts(self):
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT seq, operation, args, queued_on, error FROM outbox
+                WHERE status = 'conflict' ORDER BY seq
+            """).fetchall()
+        return [(seq, operation, json.loads(args), queued_on, error) for seq, operation, args, queued_on, error in rows]
+
+    def finish(self, applied, conflicts):
+        """Drop applied writes and keep conflicting ones with their reason"""
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in applied])
+            self._db.executemany("UPDATE outbox SET status = 'conflict', error = ? WHERE seq = ?",
+                                 [(error, seq) for seq, error in conflicts])
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def replay(outbox, connection, placeholder='%s', batch_size=500):
+    """Apply pending writes to connection in batched transactions
+
+    Returns (changes, conflicts): the writes.Change of each applied write and
+    the number kept as conflicts. A database error rolls back the current
+    batch and is raised; its writes stay pending for the next attempt.
+    """
+    changes_total, conflict_total = [], 0
+    while True:
+        batch = outbox.pending(batch_size)
+        if not batch:
+            return changes_total, conflict_total
+        cursor = connection.cursor()
+        applied, changes, conflicts = [], [], []
+        try:
+            for seq, operation, args, queued_on in batch:
+                try:
+                    changes.append(WRITES[operation](cursor, placeholder, queued_on, *args))
+                    applied.append(seq)
+                except Conflict as e:
+                    conflicts.append((seq, str(e)))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        outbox.finish(applied, conflicts)
+        changes_total.extend(changes)
+        conflict_total += len(conflicts)
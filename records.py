@@ -0,0 +1,197 @@
+"""
+Compact, typed rows for students and rooms.
+
+get_students()/get_rooms() return a StudentTable/RoomTable: a read-only
+sequence that stores the rows column by column instead of one dict per row.
+Text is packed into a single UTF-8 buffer with offsets, dates are day
+ordinals, and categorical columns (status, room_type, room_number) are small
+integer codes into a list of their distinct values. Indexing or iterating
+the table hands out StudentRecord/RoomRecord objects, made on demand with
+__slots__ and the dict-style reads the app already uses (record['name'],
+record.get('phone')).
+
+Every field has one type whatever the backend: ids and counts are ints,
+dates are datetime.date, room numbers are strings, and empty values are None.
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+from storage import ROOM_COLUMNS, STUDENT_COLUMNS, _room_key
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value) or None
+
+
+def _date(value):
+    if value is None or value == '' or isinstance(value, float):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class Record:
+    __slots__ = ()
+    FIELDS = ()
+    TYPES = ()  # converter per field, applied by from_row
+
+    @classmethod
+    def from_row(cls, row):
+        """From a tuple in FIELDS order (as yielded by iter_students/iter_rooms) or a dict"""
+        if isinstance(row, dict):
+            row = tuple(row.get(field) for field in cls.FIELDS)
+        return cls._make(convert(value) for convert, value in zip(cls.TYPES, row))
+
+    @classmethod
+    def _make(cls, values):
+        record = cls.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(record, field, value)
+        return record
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def items(self):
+        return zip(self.FIELDS, self.values())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
+
+
+def _int(value):
+    return int(value or 0)
+
+
+class StudentRecord(Record):
+    __slots__ = FIELDS = STUDENT_COLUMNS
+    TYPES = (int, _text, _text, _text, _room_key, _date, _date, _text)
+
+
+class RoomRecord(Record):
+    __slots__ = FIELDS = ROOM_COLUMNS
+    TYPES = (int, _room_key, int, _text, _int)
+
+
+# Column storage
+class _IntColumn:
+    def __init__(self, values):
+        self._values = np.array(values, dtype=np.int64)
+
+    def __getitem__(self, i):
+        return int(self._values[i])
+
+
+class _TextColumn:
+    """Strings in one UTF-8 buffer; None is stored as an empty string"""
+
+    def __init__(self, values):
+        encoded = [(value or '').encode() for value in values]
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=self._offsets[1:])
+        self._data = b''.join(encoded)
+
+    def __getitem__(self, i):
+        return self._data[self._offsets[i]:self._offsets[i + 1]].decode() or None
+
+
+class _CategoryColumn:
+    """Codes into the list of distinct values"""
+
+    def __init__(self, values):
+        codes = {}
+        self._codes = np.array([codes.setdefault(value, len(codes)) for value in values], dtype=np.int32)
+        self._categories = list(codes)
+
+    def __getitem__(self, i):
+        return self._categories[self._codes[i]]
+
+
+class _DateColumn:
+    """Day ordinals; 0 stands for no date"""
+
+    def __init__(self, values):
+        self._ordinals = np.array([value.toordinal() if value else 0 for value in values], dtype=np.int32)
+
+    def __getitem__(self, i):
+        ordinal = int(self._ordinals[i])
+        return date.fromordinal(ordinal) if ordinal else None
+
+
+class RecordTable:
+    """Read-only sequence of records, stored column by column"""
+    record_class = Record
+    column_kinds = ()
+
+    def __init__(self, rows):
+        """rows: tuples or dicts accepted by record_class.from_row"""
+        record_class = self.record_class
+        values = [[] for _ in record_class.FIELDS]
+        appends = [column.append for column in values]
+        for row in rows:
+            if isinstance(row, dict):
+                row = tuple(row.get(field) for field in record_class.FIELDS)
+            for append, convert, value in zip(appends, record_class.TYPES, row):
+                append(convert(value))
+        self._length = len(values[0])
+        self._columns = [kind(column_values) for kind, column_values in zip(self.column_kinds, values)]
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self.record_class._make(column[index] for column in self._columns)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self.record_class._make(column[i] for column in self._columns)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} of {self._length} rows>"
+
+
+class StudentTable(RecordTable):
+    record_class = StudentRecord
+    column_kinds = (_IntColumn, _TextColumn, _TextColumn, _TextColumn, _CategoryColumn,
+                    _DateColumn, _DateColumn, _CategoryColumn)
+
+
+class RoomTable(RecordTable):
+    record_class = RoomRecord
+    column_kinds = (_IntColumn, _CategoryColumn, _IntColumn, _CategoryColumn, _IntColumn)
@@ -7,6 +7,7 @@ This script automatically detects available dependencies and runs the applicatio
 import sys
 import subprocess
 import os
+import importlib.util
 
 def install_package(package):
     """Install a package using pip"""
@@ -16,6 +17,13 @@ def install_package(package):
     except subprocess.CalledProcessError:
         return False
 
+def is_available(module):
+    """Check whether a module is installed without importing it"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
 def check_and_install_dependencies():
     """Check for required dependencies and install if missing"""
     required_packages = {
@@ -31,12 +39,12 @@ def check_and_install_dependencies():
     
     # Check required packages
     for module, package in required_packages.items():
-        try:
-            __import__(module)
+        if is_available(module):
             print(f"✓ {package} is available")
-        except ImportError:
+        else:
             print(f"✗ {package} not found. Installing...")
             if install_package(package):
+                importlib.invalidate_caches()
                 print(f"✓ {package} installed successfully")
             else:
                 print(f"✗ Failed to install {package}")
@@ -44,13 +52,9 @@ def check_and_install_dependencies():
     
     # Check optional packages
     for module, package in optional_packages.items():
-        try:
-            if module == 'mysql.connector':
-                import mysql.connector
-            else:
-                __import__(module)
+        if is_available(module):
             print(f"✓ {package} is available")
-        except ImportError:
+        else:
             print(f"⚠ {package} not found (optional - will use CSV storage)")
     
     return True
@@ -64,7 +68,9 @@ def run_application():
     print("\nPress Ctrl+C to stop the application.\n")
     
     try:
-        subprocess.run([sys.executable, "app.py"])
+        # Run in this process rather than paying for a second interpreter start
+        import app
+        app.main()
     except KeyboardInterrupt:
         print("\nApplication stopped.")
     except Exception as e:
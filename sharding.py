@@ -0,0 +1,193 @@
+"""
+Storage partitioned by hostel block.
+
+Every block is its own StorageManager shard: a CSV directory under
+data/blocks/<block> and a MySQL database hostel_management_<block>. The
+ShardRouter sends per-record operations to the block's shard and fans
+cross-block queries (dashboard totals, searches, exports) out to a process
+pool, one task per block, then merges the results. Each pool worker opens a
+block's shard once and reuses it for later tasks.
+"""
+
+import csv
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from config import DB_CONFIG, SHARD_CONFIG
+from storage import ROOM_COLUMNS, STUDENT_COLUMNS, StorageManager
+
+DASHBOARD_TOTALS = ('total_students', 'total_rooms', 'occupied_rooms', 'available_beds')
+
+# Block names become directory and database names
+BLOCK_NAME = re.compile(r'^[A-Za-z0-9_]{1,32}$')
+
+
+def _open_shard(spec, migrate=True):
+    block, data_dir, database, backend = spec
+    return StorageManager(data_dir=data_dir, backend=backend, database=database, migrate=migrate)
+
+
+# Pool workers keep their shards open for the life of the process (connections
+# cannot be pickled, and reconnecting per task is most of a small query's cost).
+# The router has already migrated every block, so workers skip it.
+_worker_shards = {}
+
+
+def _init_worker():
+    """Pool initializer: start without any shard inherited from the parent"""
+    global _worker_shards
+    _worker_shards = {}
+
+
+def _in_worker(worker, spec, *args):
+    if spec not in _worker_shards:
+        _worker_shards[spec] = _open_shard(spec, migrate=False)
+    storage = _worker_shards[spec]
+    try:
+        return worker(storage, spec[0], *args)
+    finally:
+        # End the read snapshot, or later tasks would not see newer writes
+        if storage.connection is not None:
+            storage.connection.rollback()
+
+
+def _dashboard_worker(storage, block):
+    data = storage.get_dashboard_data()
+    return {key: int(data.get(key) or 0) for key in DASHBOARD_TOTALS}
+
+
+def _search_worker(storage, block, text, limit):
+    matches = []
+    for row in storage.iter_students():
+        if text in (row[1] or '').lower() or text in (row[2] or '').lower():
+            matches.append((block,) + row)
+            if limit and len(matches) >= limit:
+                break
+    return matches
+
+
+def _export_worker(storage, block, table, path):
+    count = 0
+    rows = storage.iter_students() if table == 'students' else storage.iter_rooms()
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for row in rows:
+            writer.writerow((block,) + row)
+            count += 1
+    return count
+
+
+class ShardRouter:
+    def __init__(self, blocks=None, data_root=None, backend=None, workers=None):
+        blocks = list(SHARD_CONFIG['blocks'] if blocks is None else blocks)
+        if not blocks:
+            raise ValueError("No hostel blocks configured (SHARD_CONFIG['blocks'])")
+        self.blocks = []
+        self.data_root = data_root or SHARD_CONFIG['data_root']
+        self.backend = backend
+        self.workers = workers or SHARD_CONFIG['workers']
+        self._shards = {}
+        self._pool = None
+        for block in blocks:
+            self.add_block(block)
+
+    def add_block(self, block):
+        """Register a block; its storage is created on first use"""
+        if not BLOCK_NAME.match(block):
+            raise ValueError(f"Invalid block name: {block!r}")
+        if block not in self.blocks:
+            self.blocks.append(block)
+            # The pool is sized by the number of blocks
+            self._shutdown_pool()
+
+    def spec(self, block):
+        if block not in self.blocks:
+            raise KeyError(f"Unknown hostel block: {block}")
+        return (block, os.path.join(self.data_root, block), f"{DB_CONFIG['database']}_{block}", self.backend)
+
+    def shard(self, block):
+        """StorageManager of one block, opened on first use"""
+        if block not in self._shards:
+            self._shards[block] = _open_shard(self.spec(block))
+        return self._shards[block]
+
+    def close(self):
+        self._shutdown_pool()
+        for storage in self._shards.values():
+            storage.close()
+        self._shards = {}
+
+    # Per-record operations go to a single shard
+    def add_student(self, block, name, email, phone, room_number):
+        return self.shard(block).add_student(name, email, phone, room_number)
+
+    def add_students_batch(self, block, students):
+        return self.shard(block).add_students_batch(students)
+
+    def update_student(self, block, student_id, name, email, phone, room_number, status):
+        return self.shard(block).update_student(student_id, name, email, phone, room_number, status)
+
+    def delete_student(self, block, student_id):
+        return self.shard(block).delete_student(student_id)
+
+    def add_room(self, block, room_number, capacity, room_type):
+        return self.shard(block).add_room(room_number, capacity, room_type)
+
+    # Cross-block queries fan out to the process pool
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _run(self, worker, calls):
+        """Run worker(storage, block, *args) for each (block, *args) call; results in call order"""
+        if len(calls) == 1:
+            block, *args = calls[0]
+            return [worker(self.shard(block), block, *args)]
+        # Opening the shards here applies migrations once, before the workers connect
+        for block, *_ in calls:
+            self.shard(block)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers or min(len(self.blocks), os.cpu_count() or 1),
+                                             initializer=_init_worker)
+        futures = [self._pool.submit(_in_worker, worker, self.spec(block), *args) for block, *args in calls]
+        return [future.result() for future in futures]
+
+    def _fan_out(self, worker, *args):
+        return self._run(worker, [(block,) + args for block in self.blocks])
+
+    def get_dashboard_data(self):
+        """Totals over all blocks, plus the figures of each block under 'blocks'"""
+        results = self._fan_out(_dashboard_worker)
+        data = {key: sum(result[key] for result in results) for key in DASHBOARD_TOTALS}
+        data['blocks'] = dict(zip(self.blocks, results))
+        return data
+
+    def search_students(self, text, limit=None):
+        """Students whose name or email contains text, as (block,) + STUDENT_COLUMNS tuples"""
+        matches = []
+        for block_matches in self._fan_out(_search_worker, text.lower(), limit):
+            matches.extend(block_matches)
+        return matches[:limit] if limit else matches
+
+    def export_to_csv(self, table, filename=None):
+        """Export students or rooms of every block into one CSV with a leading block column"""
+        columns = STUDENT_COLUMNS if table == 'students' else ROOM_COLUMNS
+        filename = filename or f"{table}_export_all_blocks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        part_dir = tempfile.mkdtemp(prefix='hostel_export_')
+        try:
+            parts = [os.path.join(part_dir, f"{block}.csv") for block in self.blocks]
+            # Each block streams its part file in parallel; the parts are then concatenated
+            counts = self._run(_export_worker, [(block, table, part) for block, part in zip(self.blocks, parts)])
+            with open(filename, 'w', newline='') as output:
+                csv.writer(output).writerow(('block',) + columns)
+                for part in parts:
+                    with open(part, newline='') as file:
+                        shutil.copyfileobj(file, output)
+            return filename, sum(counts)
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
@@ -0,0 +1,172 @@
+"""
+Incremental snapshots of the CSV data directory.
+
+Files are split into content-defined chunks on row boundaries, so an edited
+or appended row only changes the chunks around it. Chunks are stored once,
+zlib-compressed and named by their SHA-256; a snapshot is a small JSON
+manifest listing each file's chunks.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+# Chunk boundaries fall after a row whose CRC matches the mask, within size limits
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+BOUNDARY_MASK = 0x3FF
+
+READ_ATTEMPTS = 5
+
+
+def _chunk_lines(file):
+    """Yield content-defined chunks of whole lines from a binary file"""
+    chunk = []
+    size = 0
+    for line in file:
+        chunk.append(line)
+        size += len(line)
+        if size >= MAX_CHUNK or (size >= MIN_CHUNK and zlib.crc32(line) & BOUNDARY_MASK == 0):
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class SnapshotStore:
+    def __init__(self, data_dir='data', snapshot_dir='snapshots'):
+        self.data_dir = data_dir
+        self.snapshot_dir = snapshot_dir
+        self.chunk_dir = os.path.join(snapshot_dir, 'chunks')
+        self.manifest_dir = os.path.join(snapshot_dir, 'manifests')
+        self._lock = threading.Lock()
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def _store_chunk(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, 6)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(compressed)
+        os.replace(tmp_path, path)
+        return digest, len(compressed)
+
+    def _snapshot_file(self, name, previous):
+        """Chunk one file, reusing the previous entry if the file is untouched"""
+        path = os.path.join(self.data_dir, name)
+        for _ in range(READ_ATTEMPTS):
+            before = _signature(path)
+            if previous and previous['signature'] == before:
+                return previous, 0
+            chunks, stored = [], 0
+            whole = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for data in _chunk_lines(file):
+                    whole.update(data)
+                    digest, written = self._store_chunk(data)
+                    chunks.append(digest)
+                    stored += written
+            # A writer replaced the file while we read it; read it again
+            if _signature(path) == before:
+                return {'signature': before, 'sha256': whole.hexdigest(), 'chunks': chunks}, stored
+        raise RuntimeError(f"{name} kept changing while it was being snapshotted")
+
+    def list_snapshots(self):
+        return sorted(name[:-len('.json')] for name in os.listdir(self.manifest_dir) if name.endswith('.json'))
+
+    def load_manifest(self, snapshot_id):
+        with open(os.path.join(self.manifest_dir, f"{snapshot_id}.json")) as file:
+            return json.load(file)
+
+    def create(self):
+        """Take a snapshot of every CSV file; returns the manifest"""
+        with self._lock:
+            snapshots = self.list_snapshots()
+            previous = self.load_manifest(snapshots[-1])['files'] if snapshots else {}
+            snapshot_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            files, stored = {}, 0
+            for name in sorted(os.listdir(self.data_dir)):
+                if name.endswith('.csv'):
+                    files[name], written = self._snapshot_file(name, previous.get(name))
+                    stored += written
+            manifest = {
+                'id': snapshot_id,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'bytes_stored': stored,
+                'files': files,
+            }
+            tmp_path = os.path.join(self.manifest_dir, f"{snapshot_id}.json.tmp")
+            with open(tmp_path, 'w') as file:
+                json.dump(manifest, file, indent=1)
+            os.replace(tmp_path, os.path.join(self.manifest_dir, f"{snapshot_id}.json"))
+            return manifest
+
+    def create_async(self, callback=None):
+        """Snapshot on a background thread; callback receives the manifest or the error"""
+        def run():
+            try:
+                result = self.create()
+            except Exception as e:
+                print(f"Snapshot failed: {e}")
+                result = e
+            if callback:
+                callback(result)
+        thread = threading.Thread(target=run, name='snapshot', daemon=True)
+        thread.start()
+        return thread
+
+    def restore(self, snapshot_id, target_dir=None):
+        """Rebuild the data files of a snapshot; each file is replaced atomically"""
+        target_dir = target_dir or self.data_dir
+        os.makedirs(target_dir, exist_ok=True)
+        manifest = self.load_manifest(snapshot_id)
+        for name, entry in manifest['files'].items():
+            path = os.path.join(target_dir, name)
+            tmp_path = f"{path}.restore.tmp"
+            whole = hashlib.sha256()
+            with open(tmp_path, 'wb') as file:
+                for digest in entry['chunks']:
+                    with open(self._chunk_path(digest), 'rb') as chunk:
+                        data = zlib.decompress(chunk.read())
+                    whole.update(data)
+                    file.write(data)
+            if whole.hexdigest() != entry['sha256']:
+                os.remove(tmp_path)
+                raise RuntimeError(f"Snapshot {snapshot_id} is corrupt: {name} does not match its checksum")
+            os.replace(tmp_path, path)
+        return manifest
+
+    def prune(self, keep):
+        """Drop all but the newest keep snapshots and any chunks no longer referenced"""
+        with self._lock:
+            snapshots = self.list_snapshots()
+            for snapshot_id in snapshots[:-keep] if keep else snapshots:
+                os.remove(os.path.join(self.manifest_dir, f"{snapshot_id}.json"))
+            referenced = set()
+            for snapshot_id in self.list_snapshots():
+                for entry in self.load_manifest(snapshot_id)['files'].values():
+                    referenced.update(entry['chunks'])
+            removed = 0
+            for prefix in os.listdir(self.chunk_dir):
+                for digest in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                    if digest not in referenced:
+                        os.remove(os.path.join(self.chunk_dir, prefix, digest))
+                        removed += 1
+            return removed
@@ -0,0 +1,118 @@
+"""
+Sorted, filtered paging over one table held as column arrays.
+
+The table's columns are kept as NumPy arrays. The first time a column is
+sorted on, its order (row positions by value, ties by id) is computed once
+with lexsort and kept, so every later sort on it and every page after that
+is an array slice. Filters are boolean masks over the rows and are applied
+to a kept order without sorting again. Text is ordered case-insensitively
+with empty values first, the same order MySQL gives for ORDER BY col, id.
+
+A written row is applied with upsert()/delete(): each kept order gets the
+row inserted at its binary-searched place instead of being sorted again.
+"""
+
+import numpy as np
+
+
+class SortedTable:
+    def __init__(self, columns, rows, numeric=()):
+        """rows: tuples in columns order, columns[0] being the id; numeric columns hold ints"""
+        self.columns = columns
+        values = list(zip(*rows)) or [()] * len(columns)
+        self._arrays = {}
+        for column, column_values in zip(columns, values):
+            if column in numeric:
+                self._arrays[column] = np.array(column_values, dtype=np.int64)
+            else:
+                self._arrays[column] = np.array([value or '' for value in column_values], dtype=str)
+        self._keys = {}  # column -> lower-cased text, made on first use
+        self._orders = {}
+
+    def __len__(self):
+        return len(self._arrays[self.columns[0]])
+
+    @staticmethod
+    def _lower(array):
+        return np.char.lower(array) if array.dtype.kind == 'U' else array
+
+    def _key(self, column):
+        if column not in self._keys:
+            self._keys[column] = self._lower(self._arrays[column])
+        return self._keys[column]
+
+    def order(self, column):
+        """Row positions sorted by column, then id"""
+        if column not in self._orders:
+            ids = self._arrays[self.columns[0]]
+            self._orders[column] = ids.argsort(kind='stable') if column == self.columns[0] \
+                else np.lexsort((ids, self._key(column)))
+        return self._orders[column]
+
+    def upsert(self, row):
+        """Add a row in columns order, replacing the row with the same id"""
+        self.delete(row[0])
+        position = len(self)
+        for column, value in zip(self.columns, row):
+            array = self._arrays[column]
+            value = np.array([int(value or 0)], dtype=np.int64) if array.dtype.kind == 'i' \
+                else np.array([value or ''], dtype=str)
+            # Concatenating widens a text column that is too narrow for the new value
+            self._arrays[column] = np.concatenate([array, value])
+            if column in self._keys:
+                self._keys[column] = np.concatenate([self._keys[column], self._lower(value)])
+        ids = self._arrays[self.columns[0]]
+        for column, order in self._orders.items():
+            keys = self._key(column)[order]
+            key = self._key(column)[position]
+            start, stop = np.searchsorted(keys, key, 'left'), np.searchsorted(keys, key, 'right')
+            at = start + np.searchsorted(ids[order[start:stop]], ids[position])
+            self._orders[column] = np.insert(order, at, position)
+
+    def delete(self, row_id):
+        """Remove the row with row_id; False if there is none"""
+        found = np.flatnonzero(self._arrays[self.columns[0]] == int(row_id))
+        if not len(found):
+            return False
+        position = found[0]
+        for arrays in (self._arrays, self._keys):
+            for column, array in arrays.items():
+                arrays[column] = np.delete(array, position)
+        for column, order in self._orders.items():
+            order = order[order != position]
+            self._orders[column] = order - (order > position)
+        return True
+
+    def select(self, equals=None, contains=None, contains_columns=()):
+        """Mask of rows whose columns equal the given values and, if contains is set,
+        with contains in any of contains_columns (case-insensitive); None keeps every row
+        """
+        mask = None
+        for column, value in (equals or {}).items():
+            if value is None:
+                continue
+            column_mask = self._arrays[column] == value
+            mask = column_mask if mask is None else mask & column_mask
+        if contains:
+            text = contains.lower()
+            found = np.zeros(len(self), dtype=bool)
+            for column in contains_columns:
+                found |= np.char.find(self._key(column), text) >= 0
+            mask = found if mask is None else mask & found
+        return mask
+
+    def page(self, order_by, descending=False, offset=0, limit=100, mask=None):
+        """(rows as tuples, number of matching rows) for one page in the given order"""
+        order = self.order(order_by)
+        if descending:
+            order = order[::-1]
+        if mask is not None:
+            order = order[mask[order]]
+        rows = [tuple(self._value(column, i) for column in self.columns) for i in order[offset:offset + limit]]
+        return rows, len(order)
+
+    def _value(self, column, i):
+        value = self._arrays[column][i]
+        if isinstance(value, np.integer):
+            return int(value)
+        return str(value) or None
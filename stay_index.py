@@ -0,0 +1,111 @@
+from bisect import bisect_right
+from datetime import date, datetime
+
+# Ordinal used for stays that have not been checked out yet
+OPEN_END = date.max.toordinal() + 1
+
+
+def to_ordinal(value):
+    """Convert a date, datetime or ISO string to a day ordinal (None if empty)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, float) and value != value:  # NaN from pandas
+        return None
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+class _Node:
+    __slots__ = ('center', 'left', 'right', 'by_start', 'by_end')
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+
+class IntervalTree:
+    """Static centered interval tree over half-open [start, end) intervals"""
+
+    def __init__(self, intervals):
+        self.size = len(intervals)
+        self.root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        # The median start always lands in this node, so every level shrinks
+        starts = sorted(start for start, _, _ in intervals)
+        center = starts[len(starts) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] <= center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        by_start = sorted(here, key=lambda i: i[0])
+        by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        return _Node(center, by_start, by_end, self._build(left), self._build(right))
+
+    def stab(self, point):
+        """Return the payloads of all intervals containing point"""
+        found = []
+        node = self.root
+        while node is not None:
+            if point < node.center:
+                for start, _, payload in node.by_start:
+                    if start > point:
+                        break
+                    found.append(payload)
+                node = node.left
+            else:
+                for _, end, payload in node.by_end:
+                    if end <= point:
+                        break
+                    found.append(payload)
+                node = node.right
+        return found
+
+
+class StayIndex:
+    """Point-in-time occupancy index built from stay history rows"""
+
+    def __init__(self, stays):
+        per_room = {}
+        starts, ends = [], []
+        for stay in stays:
+            start = to_ordinal(stay['check_in'])
+            if start is None:
+                continue
+            end = to_ordinal(stay['check_out'])
+            end = OPEN_END if end is None else end
+            if end <= start:
+                continue
+            room = str(stay['room_number'])
+            per_room.setdefault(room, []).append((start, end, stay['student_id']))
+            starts.append(start)
+            ends.append(end)
+
+        self.rooms = {room: IntervalTree(intervals) for room, intervals in per_room.items()}
+        self.starts = sorted(starts)
+        self.ends = sorted(ends)
+
+    def occupants(self, room_number, on_date):
+        """Student ids staying in room_number on on_date"""
+        tree = self.rooms.get(str(room_number))
+        if tree is None:
+            return []
+        return sorted(tree.stab(to_ordinal(on_date)))
+
+    def occupancy(self, on_date):
+        """Number of students staying anywhere in the hostel on on_date"""
+        point = to_ordinal(on_date)
+        # Stays started on or before the date minus stays already ended by it
+        return bisect_right(self.starts, point) - bisect_right(self.ends, point)
@@ -1,110 +1,556 @@
 import os
+import copy
 import csv
-import pandas as pd
-from datetime import datetime
+import functools
+import importlib.util
+from datetime import date, datetime
 import json
+import logging
+import threading
+import migrations
+import writes
+from config import DB_CONFIG, GATE_LOG_CONFIG, METRICS_CONFIG, MYSQL_PROBE_CONFIG
+from availability import RoomAvailabilityIndex
+from stay_index import StayIndex
+from writes import STUDENT_COLUMNS
+
+class _LazyModule:
+    """Stand-in that imports a heavy module on first attribute access"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# pandas is only needed by the CSV backend, so keep it off the startup path
+pd = _LazyModule('pandas')
+
+
+def module_available(name):
+    """Check whether a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def env_flag(name):
+    """True when the environment variable is set to 1/true/yes/on"""
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _room_key(room_number):
+    """Normalise a room number read from either backend (None if unassigned)"""
+    if room_number is None or (isinstance(room_number, float) and room_number != room_number):
+        return None
+    if isinstance(room_number, float) and room_number.is_integer():
+        room_number = int(room_number)
+    room_number = str(room_number).strip()
+    return room_number or None
+
+
+# Column order of the tuples yielded by iter_rooms (STUDENT_COLUMNS, for iter_students, is in writes.py)
+ROOM_COLUMNS = ('id', 'room_number', 'capacity', 'room_type', 'occupied')
+PREFERENCE_COLUMNS = ('student_id', 'sleep_schedule', 'course', 'year')
+STAY_COLUMNS = ('id', 'student_id', 'room_number', 'check_in', 'check_out')
+LEDGER_COLUMNS = ('id', 'period', 'student_id', 'room_number', 'room_type', 'start_date', 'end_date',
+                  'days', 'monthly_rate', 'amount', 'posted_on')
+
+# Columns that pandas would otherwise infer as numbers
+STUDENT_TEXT_DTYPES = {'phone': str, 'room_number': str, 'check_out_date': str}
+
+# Tables with a data version (see data_version)
+VERSIONED_TABLES = ('users', 'students', 'rooms', 'stays')
+
+# Columns the paged lists can be ordered by; each has an index in MySQL (migration 8)
+STUDENT_SORT_COLUMNS = ('id', 'name', 'email', 'phone', 'room_number', 'check_in_date', 'status')
+ROOM_SORT_COLUMNS = ROOM_COLUMNS
+
+OUTBOX_FILE = 'outbox.sqlite3'
+WAITLIST_FILE = 'waitlist.jsonl'
+AUDIT_FILE = 'audit.sqlite3'
+
+logger = logging.getLogger('hostel.storage')
+
+# Recent MySQL read results kept to show while the server is unreachable
+OFFLINE_READ_CACHE_SIZE = 64
+
+
+def _csv_tuples(frame, columns):
+    """Rows of a frame read from a CSV file as tuples in columns order, with None for empty values"""
+    return [tuple(None if pd.isna(value) or value == '' else value for value in row)
+            for row in frame[list(columns)].itertuples(index=False)]
+
+
+def _within_free_beds(assignments, free):
+    """The (student_id, room) assignments that fit, in order, given {room: free beds}"""
+    free = dict(free)
+    kept = []
+    for student_id, room in assignments:
+        if free.get(room, 0) > 0:
+            free[room] -= 1
+            kept.append((student_id, room))
+    return kept
+
+
+def _queued_when_offline(method):
+    """Send a MySQL write to the local outbox while the server is unreachable"""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        if self.backend_status == 'offline':
+            return self._queue_write(method.__name__, *args)
+        try:
+            return method(self, *args)
+        except Exception as e:
+            if self.use_mysql and self._connection_lost(e):
+                return self._queue_write(method.__name__, *args)
+            raise
+    return wrapper
+
+
+class StorageOffline(RuntimeError):
+    """MySQL is unreachable and there is no earlier result of the read to show"""
+
+
+def _read_offline(cache=True):
+    """Keep a MySQL read working through an outage
+
+    A read that loses the connection takes the backend offline (the probe
+    retries it in the background). Offline, a cached read returns its last
+    result for the same arguments; others raise StorageOffline.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self._settle_backend()
+            if not self.use_mysql:
+                return method(self, *args, **kwargs)
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            if self.backend_status != 'offline':
+                try:
+                    result = method(self, *args, **kwargs)
+                except Exception as e:
+                    # StorageOffline comes from a nested read (e.g. an iter_* stream) that lost the connection
+                    if not isinstance(e, StorageOffline) and not self._connection_lost(e):
+                        raise
+                    self._go_offline()
+                else:
+                    if cache:
+                        self._offline_reads.pop(key, None)
+                        # Copies, since callers may update the dicts they get
+                        self._offline_reads[key] = copy.copy(result)
+                        if len(self._offline_reads) > OFFLINE_READ_CACHE_SIZE:
+                            del self._offline_reads[next(iter(self._offline_reads))]
+                    return result
+            if key in self._offline_reads:
+                return copy.copy(self._offline_reads[key])
+            raise StorageOffline("Cannot reach the MySQL server; try again once it is back")
+        return wrapper
+    return decorator
+
+
+def _stream_offline(method):
+    """_read_offline for the iter_* generators: streams are not cached, so offline they raise StorageOffline"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._settle_backend()
+        if self.use_mysql and self.backend_status == 'offline':
+            raise StorageOffline("Cannot reach the MySQL server; try again once it is back")
+        try:
+            yield from method(self, *args, **kwargs)
+        except Exception as e:
+            if not (self.use_mysql and self._connection_lost(e)):
+                raise
+            self._go_offline()
+            raise StorageOffline("Lost the MySQL connection while reading; try again once it is back") from e
+    return wrapper
+
+
+def _changes_tables(*tables):
+    """Mark a write to tables: it waits for the startup backend probe, and advances the
+    tables' data versions once it succeeded
+
+    Writes can nest (a delete hands its freed bed to a waitlisted student's
+    add_student); the outermost one notes the changes of all of them.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            self._settle_backend()
+            if not self._write_depth:
+                self._sorted_current = set()
+                self._written_tables = set()
+            self._write_depth += 1
+            try:
+                result = method(self, *args)
+                if result:
+                    self._written_tables.update(tables)
+                return result
+            finally:
+                self._write_depth -= 1
+                if not self._write_depth and self._written_tables:
+                    self._note_changes(self._written_tables)
+        return wrapper
+    return decorator
+
+
+def _offers_freed_beds(method):
+    """After a successful write, give the beds it freed to waitlisted students"""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        self._freed_beds = []
+        result = method(self, *args)
+        freed, self._freed_beds = self._freed_beds, []
+        if result and freed:
+            self._fill_freed_beds(freed)
+        return result
+    return wrapper
+
 
 class StorageManager:
-    def __init__(self):
+    def __init__(self, data_dir="data", backend=None, database=None, background_probe=False, migrate=True):
+        """backend is None to auto-detect, or 'mysql' / 'csv' to force one
+
+        migrate=False skips the schema migrations and the outbox replay on
+        connect, for extra readers of a database that is already set up.
+
+        With background_probe, the MySQL connection is attempted once in a
+        background thread so construction does not block; call poll_backend()
+        from the caller's own thread to switch over once it is reachable. Until
+        the attempt is over, logins and writes wait for it (see _settle_backend),
+        so nothing is written to CSV and then left behind by the switch.
+        """
         self.use_mysql = False
         self.connection = None
-        self.data_dir = "data"
+        self.data_dir = data_dir
+        self.database = database or DB_CONFIG['database']
+        self._migrate = migrate
+        self.metrics = None
+        self.actor = 'system'  # Author of changes in the audit log; the app sets the logged-in user
+        self.backend_status = 'csv'
+        self._stay_index = None
+        self._stay_index_version = None
+        self._student_directory = None
+        self._sorted_tables = {}  # CSV: table -> (data version, SortedTable)
+        self._sorted_current = set()  # tables whose SortedTable the running write kept up to date
+        self._write_depth = 0  # nesting of the running _changes_tables writes
+        self._written_tables = set()  # tables they changed so far
+        self._availability = None
+        self._availability_version = None
+        self._freed_beds = []
+        self._versions = dict.fromkeys(VERSIONED_TABLES, 0)
+        self._version_sources = {}  # table -> last seen file signature or MySQL change counter
+        self._waitlist = None
+        self._waitlist_allocations = []
+        self._gate_log = None
+        self._audit_log = None
+        self._pending_connection = None
+        self._version_connection = None
+        self._stream_connections = []  # idle connections for streamed reads, see _iter_mysql_rows
+        self._stop_probe = threading.Event()
+        self._probe_thread = None
+        self._outbox = None
+        self._outbox_lock = threading.Lock()
+        self._offline_reads = {}  # (method, args) -> last MySQL result, see _read_offline
         
         # Create data directory if it doesn't exist
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
         
         # Try to connect to MySQL first
-        self._try_mysql_connection()
+        if backend is None and background_probe and module_available('mysql.connector'):
+            self.backend_status = 'probing'
+            self._start_probe()
+        elif backend != 'csv':
+            self._try_mysql_connection()
+            if backend == 'mysql' and not self.use_mysql:
+                raise RuntimeError("MySQL backend requested but not available")
         
         if not self.use_mysql:
-            print("MySQL not available. Using CSV files for data storage.")
+            if self.backend_status != 'probing':
+                print("MySQL not available. Using CSV files for data storage.")
             self._initialize_csv_files()
+        
+        if METRICS_CONFIG.get('enabled') or env_flag('HOSTEL_METRICS'):
+            import metrics
+            metrics.enable(self, METRICS_CONFIG)
     
     def _try_mysql_connection(self):
+        if not module_available('mysql.connector'):
+            print("MySQL connector not installed.")
+            return
         try:
-            import mysql.connector
-            from mysql.connector import Error
-            
-            # Try to connect to MySQL
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                user='root',
-                password='root'
-            )
-            
-            if self.connection.is_connected():
-                cursor = self.connection.cursor()
-                # Create database if it doesn't exist
-                cursor.execute("CREATE DATABASE IF NOT EXISTS hostel_management")
-                cursor.execute("USE hostel_management")
-                
-                # Create tables
-                self._create_mysql_tables(cursor)
-                self.connection.commit()
-                cursor.close()
-                
-                self.use_mysql = True
-                print("Connected to MySQL database successfully!")
-                
+            self.connection = self._open_mysql()
+            self.use_mysql = True
+            self.backend_status = 'mysql'
+            print("Connected to MySQL database successfully!")
         except Exception as e:
             print(f"MySQL connection failed: {e}")
             self.use_mysql = False
-            if self.connection:
-                self.connection.close()
+            self.connection = None
     
-    def _create_mysql_tables(self, cursor):
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role ENUM('admin', 'student') NOT NULL
-            )
-        """)
-        
-        # Students table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                phone VARCHAR(20),
-                room_number VARCHAR(10),
-                check_in_date DATE,
-                check_out_date DATE,
-                status ENUM('active', 'inactive') DEFAULT 'active'
-            )
-        """)
+    def _open_mysql(self):
+        """Connect, create the database on first use and apply migrations"""
+        import mysql.connector
         
-        # Rooms table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                room_number VARCHAR(10) UNIQUE NOT NULL,
-                capacity INT NOT NULL,
-                room_type VARCHAR(50),
-                occupied INT DEFAULT 0
-            )
-        """)
-        
-        # Insert default users
-        cursor.execute("""
-            INSERT IGNORE INTO users (username, password, role) 
-            VALUES ('admin', 'admin123', 'admin')
-        """)
-        cursor.execute("""
-            INSERT IGNORE INTO users (username, password, role) 
-            VALUES ('student1', 'student123', 'student')
-        """)
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            # Only create the database the first time
+            try:
+                cursor.execute(f"USE `{self.database}`")
+            except mysql.connector.Error:
+                cursor.execute(f"CREATE DATABASE `{self.database}`")
+                cursor.execute(f"USE `{self.database}`")
+            cursor.close()
+            
+            # Bring the schema up to date
+            if self._migrate:
+                migrations.migrate(connection)
+                self._replay_outbox(connection)
+            return connection
+        except Exception:
+            connection.close()
+            raise
+    
+    def _start_probe(self):
+        self._probe_thread = threading.Thread(target=self._probe_mysql, name='mysql-probe', daemon=True)
+        self._probe_thread.start()
+    
+    def _settle_backend(self):
+        """Wait for the startup probe to finish and switch to MySQL if it connected"""
+        if self.backend_status == 'probing':
+            self._probe_thread.join()
+            self.poll_backend()
+    
+    def _probe_mysql(self):
+        """Background thread: connect to MySQL
+
+        At startup there is one attempt; if it fails the session stays on CSV,
+        since switching later would leave the CSV writes behind. While offline
+        the attempts are retried with exponential backoff until MySQL answers.
+        """
+        delay = MYSQL_PROBE_CONFIG['initial_delay']
+        attempts = 0
+        while not self._stop_probe.is_set():
+            attempts += 1
+            try:
+                self._pending_connection = self._open_mysql()
+                return
+            except Exception as e:
+                if self.backend_status == 'probing':
+                    print(f"MySQL not available ({e}). Using CSV files for data storage.")
+                    self.backend_status = 'csv'
+                    return
+                retries = MYSQL_PROBE_CONFIG['retries']
+                if retries is not None and attempts > retries:
+                    print(f"MySQL not reachable after {attempts} attempts; writes stay in the outbox: {e}")
+                    return
+            self._stop_probe.wait(delay)
+            delay = min(delay * MYSQL_PROBE_CONFIG['backoff'], MYSQL_PROBE_CONFIG['max_delay'])
+    
+    def poll_backend(self):
+        """Switch to MySQL if the background probe found it; True when the backend changed"""
+        connection = self._pending_connection
+        if connection is None:
+            return False
+        self._pending_connection = None
+        if self.backend_status == 'offline':
+            try:
+                # Writes queued since the probe thread replayed the outbox
+                self._replay_outbox(connection)
+            except Exception as e:
+                print(f"Error replaying queued writes: {e}")
+                connection.close()
+                self._start_probe()
+                return False
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self._close_side_connections()
+        self.connection = connection
+        self.use_mysql = True
+        self.backend_status = 'mysql'
+        self._stay_index = None
+        self._availability = None
+        print("Connected to MySQL database successfully!")
+        return True
+    
+    def close(self):
+        self._stop_probe.set()
+        for connection in (self.connection, self._pending_connection):
+            if connection is not None:
+                connection.close()
+        self.connection = self._pending_connection = None
+        self._close_side_connections()
+        self.use_mysql = False
+        if self._outbox is not None:
+            self._outbox.close()
+            self._outbox = None
+        if self._gate_log is not None:
+            self._gate_log.close()
+            self._gate_log = None
+        if self._audit_log is not None:
+            self._audit_log.close()
+            self._audit_log = None
+    
+    # Data versions
+    def _version_source(self, tables):
+        """What changes when a table is written: the CSV file's signature or the MySQL change counter"""
+        if self.use_mysql:
+            if self.backend_status == 'offline':
+                return {table: self._version_sources.get(table) for table in tables}
+            try:
+                # Autocommit, so every poll sees the latest counters without ending
+                # a transaction on the main connection
+                if self._version_connection is None:
+                    self._version_connection = self._connect(database=self.database, autocommit=True)
+                cursor = self._version_connection.cursor()
+                placeholders = ', '.join(['%s'] * len(tables))
+                cursor.execute(f"""
+                    SELECT table_name, SUM(version) FROM table_versions
+                    WHERE table_name IN ({placeholders}) GROUP BY table_name
+                """, tables)
+                counters = {table: int(version) for table, version in cursor.fetchall()}
+                cursor.close()
+            except Exception as e:
+                print(f"Error reading table versions: {e}")
+                self._close_version_connection()
+                return {table: self._version_sources.get(table) for table in tables}
+            return {table: ('mysql', counters.get(table)) for table in tables}
+        sources = {}
+        for table in tables:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, f"{table}.csv"))
+                sources[table] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                sources[table] = None
+        return sources
+    
+    def data_versions(self, *tables):
+        """Current versions of tables, as a tuple in the order given"""
+        tables = tables or VERSIONED_TABLES
+        for table, source in self._version_source(tables).items():
+            if self._version_sources.get(table) != source:
+                self._version_sources[table] = source
+                self._versions[table] += 1
+        return tuple(self._versions[table] for table in tables)
+    
+    def data_version(self, table):
+        """A number that only grows, and grows whenever table is written by this or another process
+
+        Compare it with a saved value to tell whether a cached copy is stale.
+        """
+        return self.data_versions(table)[0]
+    
+    def _close_version_connection(self):
+        if self._version_connection is not None:
+            try:
+                self._version_connection.close()
+            except Exception:
+                pass
+            self._version_connection = None
+    
+    def _close_side_connections(self):
+        """Close the version polling and streaming connections (they reopen on demand)"""
+        self._close_version_connection()
+        while self._stream_connections:
+            try:
+                self._stream_connections.pop().close()
+            except Exception:
+                pass
+    
+    def drop_caches(self):
+        """Forget every cached copy of table data, so the next reads go to the store"""
+        self._stay_index = None
+        self._student_directory = None
+        self._sorted_tables = {}
+        self._availability = None
+    
+    def _note_changes(self, tables):
+        # CSV timestamps are too coarse to tell apart two quick writes of the same size
+        for table in tables:
+            self._versions[table] += 1
+        # Caches updated in place by the write stay valid at the new version
+        if self._availability is not None and 'rooms' in tables:
+            self._availability_version = self.data_version('rooms')
+        for table in self._sorted_current & set(tables):
+            self._sorted_tables[table] = (self.data_version(table), self._sorted_tables[table][1])
+        self._sorted_current = set()
+    
+    # Offline outbox
+    def _get_outbox(self):
+        with self._outbox_lock:
+            if self._outbox is None:
+                from outbox import Outbox
+                self._outbox = Outbox(os.path.join(self.data_dir, OUTBOX_FILE))
+            return self._outbox
+    
+    def _connection_lost(self, error):
+        """True if a MySQL error means the server went away rather than a bad write"""
+        import mysql.connector
+        return isinstance(error, (mysql.connector.OperationalError, mysql.connector.InterfaceError))
+    
+    def _queue_write(self, operation, *args):
+        """Keep a write in the local outbox until MySQL is back"""
+        try:
+            self._get_outbox().enqueue(operation, list(args))
+        except Exception as e:
+            print(f"Error queueing {operation}: {e}")
+            return False
+        self._audit(f"{operation} (queued)", after={'args': list(args)})
+        self._go_offline()
+        return True
+    
+    def _go_offline(self):
+        """Queue writes and serve cached reads until the probe reconnects"""
+        if self.backend_status != 'offline':
+            print("Lost the MySQL connection; queueing writes locally until it is back")
+            self.backend_status = 'offline'
+            self._stop_probe.clear()
+            self._start_probe()
+    
+    def _replay_outbox(self, connection):
+        """Apply writes queued while MySQL was unreachable"""
+        if self._outbox is None and not os.path.exists(os.path.join(self.data_dir, OUTBOX_FILE)):
+            return
+        from outbox import replay
+        changes, conflicts = replay(self._get_outbox(), connection)
+        if changes or conflicts:
+            print(f"Replayed {len(changes)} queued writes to MySQL; {conflicts} conflicts kept in the outbox")
+            for change in changes:
+                self._audit(change.operation, change.student_id, change.room_number,
+                            before=change.before, after=change.after)
+            self.drop_caches()
+            for table in VERSIONED_TABLES:
+                self._versions[table] += 1
+    
+    def pending_writes(self):
+        """Number of writes waiting in the outbox for MySQL"""
+        return self._outbox.pending_count() if self._outbox is not None else 0
+    
+    def _connect(self, **options):
+        import mysql.connector
+        settings = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+        settings.setdefault('connection_timeout', MYSQL_PROBE_CONFIG['connect_timeout'])
+        settings.update(options)
+        return mysql.connector.connect(**settings)
     
     def _initialize_csv_files(self):
         # Initialize CSV files with headers if they don't exist
         files_config = {
-            'users.csv': ['id', 'username', 'password', 'role'],
-            'students.csv': ['id', 'name', 'email', 'phone', 'room_number', 'check_in_date', 'check_out_date', 'status'],
-            'rooms.csv': ['id', 'room_number', 'capacity', 'room_type', 'occupied']
+            'users.csv': ['id', 'username', 'password', 'role', 'student_id'],
+            'students.csv': list(STUDENT_COLUMNS),
+            'rooms.csv': list(ROOM_COLUMNS),
+            'stays.csv': list(STAY_COLUMNS),
+            'preferences.csv': list(PREFERENCE_COLUMNS),
+            'ledger.csv': list(LEDGER_COLUMNS)
         }
         
         for filename, headers in files_config.items():
@@ -114,13 +560,51 @@ class StorageManager:
                     writer = csv.writer(file)
                     writer.writerow(headers)
         
-        # Add default users if users.csv is empty
+        if next(self._iter_csv_rows('stays.csv', ('id',)), None) is None:
+            self._backfill_csv_stays()
+        
         users_file = os.path.join(self.data_dir, 'users.csv')
-        if os.path.getsize(users_file) <= len(','.join(files_config['users.csv'])) + 1:
+        with open(users_file, newline='') as file:
+            users = [row for row in csv.reader(file) if row]
+        if 'student_id' not in users[0]:
+            self._add_csv_user_links(users)
+        
+        # Add default users if users.csv has no rows yet
+        if len(users) == 1:
             with open(users_file, 'a', newline='') as file:
                 writer = csv.writer(file)
-                writer.writerow([1, 'admin', 'admin123', 'admin'])
-                writer.writerow([2, 'student1', 'student123', 'student'])
+                writer.writerow([1, 'admin', 'admin123', 'admin', ''])
+                writer.writerow([2, 'student1', 'student123', 'student', ''])
+    
+    def _backfill_csv_stays(self):
+        """Give students already in a room a stay while stays.csv has none (older data directories)
+
+        Same rule as migration 9: inactive students only with a check-out date.
+        """
+        today = str(date.today())
+        stays = []
+        for student_id, room_number, check_in, check_out, status in self._iter_csv_rows(
+                'students.csv', ('id', 'room_number', 'check_in_date', 'check_out_date', 'status')):
+            room_number = _room_key(room_number)
+            if room_number and (status == 'active' or check_out):
+                stays.append([len(stays) + 1, student_id, room_number, check_in or today, check_out])
+        if stays:
+            with open(os.path.join(self.data_dir, 'stays.csv'), 'a', newline='') as file:
+                csv.writer(file).writerows(stays)
+    
+    def _add_csv_user_links(self, users):
+        """Add the student_id column to an older users.csv, linking logins by email"""
+        wanted = {row[1] for row in users[1:] if row[3] == 'student'}
+        links = {}
+        if wanted:
+            for student_id, email in self._iter_csv_rows('students.csv', ('id', 'email')):
+                if email in wanted:
+                    links[email] = student_id
+        users[0].append('student_id')
+        for row in users[1:]:
+            row.append(links.get(row[1], '') if row[3] == 'student' else '')
+        with open(os.path.join(self.data_dir, 'users.csv'), 'w', newline='') as file:
+            csv.writer(file).writerows(users)
     
     def _get_next_id(self, filename):
         filepath = os.path.join(self.data_dir, filename)
@@ -131,6 +615,7 @@ class StorageManager:
             return 1
     
     # Authentication
+    @_read_offline(cache=False)
     def authenticate_user(self, username, password):
         if self.use_mysql:
             cursor = self.connection.cursor(dictionary=True)
@@ -148,34 +633,35 @@ class StorageManager:
     
     # Students operations
     def get_students(self):
-        if self.use_mysql:
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM students")
-            results = cursor.fetchall()
-            cursor.close()
-            return results
-        else:
-            try:
-                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'))
-                return df.to_dict('records')
-            except:
-                return []
+        """Every student, as a StudentTable of StudentRecords (see records.py)"""
+        from records import StudentTable
+        
+        try:
+            return StudentTable(self.iter_students())
+        except StorageOffline:
+            raise
+        except Exception as e:
+            print(f"Error loading students: {e}")
+            return []
     
+    @_changes_tables('students', 'rooms', 'stays', 'users')
+    @_queued_when_offline
     def add_student(self, name, email, phone, room_number):
+        today = datetime.now().date()
         if self.use_mysql:
             cursor = self.connection.cursor()
             try:
-                cursor.execute("""
-                    INSERT INTO students (name, email, phone, room_number, check_in_date, status)
-                    VALUES (%s, %s, %s, %s, %s, 'active')
-                """, (name, email, phone, room_number, datetime.now().date()))
-                cursor.execute("UPDATE rooms SET occupied = occupied + 1 WHERE room_number = %s", (room_number,))
+                change = writes.add_student(cursor, '%s', today, name, email, phone, room_number)
                 self.connection.commit()
                 cursor.close()
+                self._applied(change)
                 return True
             except Exception as e:
+                if self._connection_lost(e):
+                    # _queued_when_offline puts the write in the outbox
+                    raise
                 print(f"Error adding student: {e}")
-                self.connection.rollback()
+                self._rollback()
                 cursor.close()
                 return False
         else:
@@ -183,98 +669,436 @@ class StorageManager:
                 new_id = self._get_next_id('students.csv')
                 with open(os.path.join(self.data_dir, 'students.csv'), 'a', newline='') as file:
                     writer = csv.writer(file)
-                    writer.writerow([new_id, name, email, phone, room_number, datetime.now().date(), '', 'active'])
+                    writer.writerow([new_id, name, email, phone, room_number, today, '', 'active'])
+                self._sorted_change('students', [(int(new_id), name, email, phone or None, room_number or None,
+                                                  str(today), None, 'active')])
                 
                 # Update room occupancy
                 self._update_room_occupancy(room_number, 1)
+                self._record_stay_change(new_id, None, None, room_number, 'active', today)
+                self._link_users(None, {email: new_id})
+                self._audit('add_student', int(new_id), room_number,
+                            after={'name': name, 'email': email, 'phone': phone, 'room_number': room_number})
                 return True
             except Exception as e:
                 print(f"Error adding student: {e}")
                 return False
     
+    @_changes_tables('students', 'rooms', 'stays', 'users')
+    def add_students_batch(self, students):
+        """Insert (name, email, phone, room_number) tuples in one write; returns the count added"""
+        students = list(students)
+        if not students:
+            return 0
+        today = datetime.now().date()
+        occupancy = {}
+        for _, _, _, room_number in students:
+            room = _room_key(room_number)
+            if room is not None:
+                occupancy[room] = occupancy.get(room, 0) + 1
+        
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                cursor.executemany("""
+                    INSERT INTO students (name, email, phone, room_number, check_in_date, status)
+                    VALUES (%s, %s, %s, %s, %s, 'active')
+                """, [(name, email, phone, room_number, today) for name, email, phone, room_number in students])
+                cursor.executemany("UPDATE rooms SET occupied = occupied + %s WHERE room_number = %s",
+                                   [(count, room) for room, count in occupancy.items()])
+                # Email is unique, so a join on the housed students' emails finds their new ids
+                emails = [(email,) for _, email, _, room_number in students if _room_key(room_number)]
+                if emails:
+                    cursor.execute("CREATE TEMPORARY TABLE batch_emails (email VARCHAR(255) PRIMARY KEY)")
+                    try:
+                        cursor.executemany("INSERT INTO batch_emails (email) VALUES (%s)", emails)
+                        cursor.execute("""
+                            INSERT INTO stays (student_id, room_number, check_in)
+                            SELECT s.id, s.room_number, %s FROM students s JOIN batch_emails b ON b.email = s.email
+                        """, (today,))
+                    finally:
+                        cursor.execute("DROP TEMPORARY TABLE batch_emails")
+                self._link_users(cursor, None)
+                self.connection.commit()
+                cursor.close()
+                self._stay_index = None
+                for room, count in occupancy.items():
+                    self._track_occupancy(room, count)
+                self._audit_batch_add(None, students)
+                return len(students)
+            except Exception as e:
+                print(f"Error adding students: {e}")
+                self._rollback()
+                cursor.close()
+                return 0
+        else:
+            try:
+                first_id = int(self._get_next_id('students.csv'))
+                first_stay_id = int(self._get_next_id('stays.csv'))
+                stays = []
+                with open(os.path.join(self.data_dir, 'students.csv'), 'a', newline='') as file:
+                    writer = csv.writer(file)
+                    for offset, (name, email, phone, room_number) in enumerate(students):
+                        writer.writerow([first_id + offset, name, email, phone, room_number, today, '', 'active'])
+                        room = _room_key(room_number)
+                        if room is not None:
+                            stays.append([first_stay_id + len(stays), first_id + offset, room, today, ''])
+                with open(os.path.join(self.data_dir, 'stays.csv'), 'a', newline='') as file:
+                    csv.writer(file).writerows(stays)
+                self._stay_index = None
+                self._link_users(None, {email: first_id + offset for offset, (_, email, _, _) in enumerate(students)})
+                
+                self._add_csv_occupancy(occupancy)
+                self._audit_batch_add(first_id, students)
+                return len(students)
+            except Exception as e:
+                print(f"Error adding students: {e}")
+                return 0
+    
+    @_changes_tables('students', 'rooms', 'stays')
+    @_queued_when_offline
+    @_offers_freed_beds
     def update_student(self, student_id, name, email, phone, room_number, status):
+        today = datetime.now().date()
         if self.use_mysql:
             cursor = self.connection.cursor()
             try:
-                cursor.execute("""
-                    UPDATE students SET name = %s, email = %s, phone = %s, room_number = %s, status = %s
-                    WHERE id = %s
-                """, (name, email, phone, room_number, status, student_id))
+                change = writes.update_student(cursor, '%s', today, student_id, name, email, phone, room_number, status)
                 self.connection.commit()
                 cursor.close()
+                self._applied(change)
                 return True
             except Exception as e:
+                if self._connection_lost(e):
+                    raise
                 print(f"Error updating student: {e}")
+                self._rollback()
                 cursor.close()
                 return False
         else:
             try:
-                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'))
+                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'), dtype=STUDENT_TEXT_DTYPES)
+                previous = df[df['id'] == student_id]
+                before = previous.iloc[0].to_dict() if not previous.empty else None
                 df.loc[df['id'] == student_id, ['name', 'email', 'phone', 'room_number', 'status']] = [name, email, phone, room_number, status]
+                if not previous.empty:
+                    old_room, old_status = previous.iloc[0]['room_number'], previous.iloc[0]['status']
+                    if old_status == 'active' and status != 'active':
+                        df.loc[df['id'] == student_id, 'check_out_date'] = str(today)
+                    elif old_status != 'active' and status == 'active':
+                        df.loc[df['id'] == student_id, 'check_out_date'] = ''
                 df.to_csv(os.path.join(self.data_dir, 'students.csv'), index=False)
+                self._sorted_change('students', _csv_tuples(df[df['id'] == student_id], STUDENT_COLUMNS))
+                if not previous.empty:
+                    self._record_stay_change(student_id, old_room, old_status, room_number, status, today)
+                    self._adjust_occupancy(old_room, old_status, room_number, status)
+                    self._audit_update(student_id, before, name, email, phone, room_number, status)
                 return True
             except Exception as e:
                 print(f"Error updating student: {e}")
                 return False
     
+    @_changes_tables('students', 'rooms', 'stays', 'users')
+    @_queued_when_offline
+    @_offers_freed_beds
     def delete_student(self, student_id):
+        today = datetime.now().date()
         if self.use_mysql:
             cursor = self.connection.cursor()
             try:
-                cursor.execute("SELECT room_number FROM students WHERE id = %s", (student_id,))
-                room = cursor.fetchone()
-                if room:
-                    cursor.execute("UPDATE rooms SET occupied = occupied - 1 WHERE room_number = %s", (room[0],))
-                cursor.execute("DELETE FROM students WHERE id = %s", (student_id,))
+                change = writes.delete_student(cursor, '%s', today, student_id)
                 self.connection.commit()
                 cursor.close()
+                self._applied(change)
                 return True
             except Exception as e:
+                if self._connection_lost(e):
+                    raise
                 print(f"Error deleting student: {e}")
+                self._rollback()
                 cursor.close()
                 return False
         else:
             try:
-                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'))
+                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'), dtype=STUDENT_TEXT_DTYPES)
                 student = df[df['id'] == student_id]
                 if not student.empty:
-                    room_number = student.iloc[0]['room_number']
-                    self._update_room_occupancy(room_number, -1)
+                    self._adjust_occupancy(student.iloc[0]['room_number'], student.iloc[0]['status'], None, None)
                 df = df[df['id'] != student_id]
                 df.to_csv(os.path.join(self.data_dir, 'students.csv'), index=False)
+                self._sorted_change('students', deleted=[student_id])
+                # CSV ids are reused, so a stale link could point at a future student
+                self._rewrite_user_links(lambda user: '' if user['student_id'] == str(student_id) else user['student_id'])
+                self._delete_csv_preferences(student_id)
+                self._close_stay(student_id, today)
+                if not student.empty:
+                    self._audit('delete_student', student_id, student.iloc[0]['room_number'],
+                                before=student.iloc[0].to_dict())
                 return True
             except Exception as e:
                 print(f"Error deleting student: {e}")
                 return False
     
-    # Rooms operations
-    def get_rooms(self):
+    # Audit trail
+    def _get_audit_log(self):
+        if self._audit_log is None:
+            from audit import AuditLog
+            self._audit_log = AuditLog(os.path.join(self.data_dir, AUDIT_FILE))
+        return self._audit_log
+    
+    def _audit(self, operation, student_id=None, room_number=None, before=None, after=None):
+        """Queue an audit entry; the audit log writes it in the background"""
+        try:
+            self._get_audit_log().record(self.actor, operation, None if student_id is None else int(student_id),
+                                         _room_key(room_number), before, after)
+        except Exception as e:
+            print(f"Error auditing {operation}: {e}")
+    
+    def _audit_update(self, student_id, before, name, email, phone, room_number, status):
+        after = dict(before, name=name, email=email, phone=phone, room_number=room_number, status=status)
+        self._audit('update_student', student_id, room_number, before=before, after=after)
+    
+    def _audit_batch_add(self, first_id, students):
+        """One entry per added student; MySQL batches do not return ids, so those are logged by email"""
+        for offset, (name, email, phone, room_number) in enumerate(students):
+            self._audit('add_student', None if first_id is None else first_id + offset, room_number,
+                        after={'name': name, 'email': email, 'phone': phone, 'room_number': room_number})
+    
+    def _audit_assignments(self, assignments):
+        for student_id, room_number in assignments:
+            self._audit('assign_room', student_id, room_number,
+                        before={'room_number': None}, after={'room_number': room_number})
+    
+    def _applied(self, change):
+        """Bring the caches and audit trail up to date after a committed writes.Change"""
+        old_bed, new_bed = change.beds
+        if old_bed != new_bed:
+            for room_number, moved in ((old_bed, -1), (new_bed, 1)):
+                if room_number is not None:
+                    self._track_occupancy(room_number, moved)
+            self._stay_index = None
+        if change.operation == 'add_room' and self._availability is not None:
+            self._availability.add_room(change.room_number, change.after['capacity'], change.after['room_type'])
+        self._audit(change.operation, change.student_id, change.room_number, before=change.before, after=change.after)
+    
+    def get_audit_entries(self, student_id=None, actor=None, start=None, end=None, limit=None):
+        """Audit entries, newest first, filtered by student, actor and time range [start, end)"""
+        if self._audit_log is None and not os.path.exists(os.path.join(self.data_dir, AUDIT_FILE)):
+            return []
+        return self._get_audit_log().query(student_id, actor, start, end, limit)
+    
+    # Student logins
+    def _link_users(self, cursor, ids_by_email):
+        """Link unlinked student logins whose username is a new student's email"""
+        if self.use_mysql:
+            # users is small and students.email is unique, so this is cheap
+            cursor.execute("""
+                UPDATE users u JOIN students s ON s.email = u.username
+                SET u.student_id = s.id
+                WHERE u.role = 'student' AND u.student_id IS NULL
+            """)
+        else:
+            def new_link(user):
+                if user['role'] == 'student' and not user['student_id']:
+                    return str(ids_by_email.get(user['username'], ''))
+                return user['student_id']
+            self._rewrite_user_links(new_link)
+    
+    def _rewrite_user_links(self, new_link):
+        """Set student_id to new_link(user) for each row of users.csv; writes only on change"""
+        filepath = os.path.join(self.data_dir, 'users.csv')
+        with open(filepath, newline='') as file:
+            users = [row for row in csv.reader(file) if row]
+        header = users[0]
+        position = header.index('student_id')
+        changed = False
+        for row in users[1:]:
+            link = new_link(dict(zip(header, row)))
+            if link != row[position]:
+                row[position] = link
+                changed = True
+        if changed:
+            with open(filepath, 'w', newline='') as file:
+                csv.writer(file).writerows(users)
+    
+    @_read_offline()
+    def get_student_for_user(self, username):
+        """The student record of a login, with its room and active roommates
+
+        Returns {'student': StudentRecord, 'room': RoomRecord or None, 'roommates':
+        [StudentRecord]} or None when the login has no student. Every step is an
+        indexed lookup.
+        """
+        from records import RoomRecord, StudentRecord
+        
+        if self.use_mysql:
+            cursor = self.connection.cursor(dictionary=True)
+            try:
+                cursor.execute("""
+                    SELECT s.* FROM users u JOIN students s ON s.id = u.student_id
+                    WHERE u.username = %s
+                """, (username,))
+                student = cursor.fetchone()
+                if student is None:
+                    # Logins not linked yet are named after the student's email
+                    cursor.execute("SELECT * FROM students WHERE email = %s", (username,))
+                    student = cursor.fetchone()
+                if student is None:
+                    return None
+                room, roommates = None, []
+                if student['room_number']:
+                    cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (student['room_number'],))
+                    room = cursor.fetchone()
+                    if student['status'] == 'active':
+                        cursor.execute("""
+                            SELECT * FROM students
+                            WHERE room_number = %s AND status = 'active' AND id <> %s
+                            ORDER BY name
+                        """, (student['room_number'], student['id']))
+                        roommates = [StudentRecord.from_row(roommate) for roommate in cursor.fetchall()]
+                return {'student': StudentRecord.from_row(student),
+                        'room': RoomRecord.from_row(room) if room else None, 'roommates': roommates}
+            finally:
+                cursor.close()
+        else:
+            try:
+                directory = self._get_student_directory()
+            except Exception as e:
+                print(f"Error loading students: {e}")
+                return None
+            students = directory['students']
+            student_id = directory['users'].get(username) or directory['emails'].get(username)
+            if student_id not in students:
+                return None
+            student = StudentRecord.from_row(students[student_id])
+            room_number = student.room_number
+            roommates = []
+            if room_number and student.status == 'active':
+                roommates = sorted((StudentRecord.from_row(students[other])
+                                    for other in directory['occupants'].get(room_number, ()) if other != student_id),
+                                   key=lambda roommate: roommate.name)
+            room = directory['rooms'].get(room_number)
+            return {'student': student, 'room': RoomRecord.from_row(room) if room else None, 'roommates': roommates}
+    
+    def _get_student_directory(self):
+        """CSV: students, logins and rooms in dicts, rebuilt when one of the files changes"""
+        signature = self.data_versions('users', 'students', 'rooms')
+        cached = self._student_directory
+        if self.metrics:
+            self.metrics.cache_event('student_directory', hit=cached is not None and cached[0] == signature)
+        if cached is None or cached[0] != signature:
+            students, emails, occupants = {}, {}, {}
+            # Rows stay tuples in STUDENT_COLUMNS / ROOM_COLUMNS order to keep this compact
+            for row in self.iter_students():
+                student_id, email, room_number, status = row[0], row[2], _room_key(row[4]), row[7]
+                students[student_id] = row
+                emails[email] = student_id
+                if room_number and status == 'active':
+                    occupants.setdefault(room_number, []).append(student_id)
+            users = {username: int(student_id) for username, student_id
+                     in self._iter_csv_rows('users.csv', ('username', 'student_id')) if student_id}
+            rooms = {row[1]: row for row in self.iter_rooms()}
+            cached = self._student_directory = (signature, {
+                'students': students, 'emails': emails, 'occupants': occupants, 'users': users, 'rooms': rooms,
+            })
+        return cached[1]
+    
+    # Stay history (CSV; MySQL writes keep it in writes.py)
+    def _record_stay_change(self, student_id, old_room, old_status, new_room, new_status, today):
+        """Close and open stays so the history follows a room or status change"""
+        old_room, new_room = _room_key(old_room), _room_key(new_room)
+        was_staying = old_status == 'active' and old_room is not None
+        now_staying = new_status == 'active' and new_room is not None
+        if was_staying and (not now_staying or old_room != new_room):
+            self._close_stay(student_id, today)
+        if now_staying and (not was_staying or old_room != new_room):
+            self._open_stay(student_id, new_room, today)
+    
+    def _open_stay(self, student_id, room_number, today):
+        new_id = self._get_next_id('stays.csv')
+        with open(os.path.join(self.data_dir, 'stays.csv'), 'a', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow([new_id, student_id, room_number, today, ''])
+        self._stay_index = None
+    
+    def _close_stay(self, student_id, today):
+        filepath = os.path.join(self.data_dir, 'stays.csv')
+        df = pd.read_csv(filepath, dtype={'room_number': str, 'check_out': str})
+        open_stays = (df['student_id'] == student_id) & df['check_out'].isna()
+        if open_stays.any():
+            df.loc[open_stays, 'check_out'] = str(today)
+            df.to_csv(filepath, index=False)
+        self._stay_index = None
+    
+    @_read_offline()
+    def get_stays(self, student_id=None):
         if self.use_mysql:
             cursor = self.connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM rooms")
+            if student_id is None:
+                cursor.execute("SELECT * FROM stays ORDER BY check_in")
+            else:
+                cursor.execute("SELECT * FROM stays WHERE student_id = %s ORDER BY check_in", (student_id,))
             results = cursor.fetchall()
             cursor.close()
             return results
         else:
             try:
-                df = pd.read_csv(os.path.join(self.data_dir, 'rooms.csv'))
+                df = pd.read_csv(os.path.join(self.data_dir, 'stays.csv'), dtype={'room_number': str})
+                if student_id is not None:
+                    df = df[df['student_id'] == student_id]
+                df = df.astype(object).where(df.notna(), None)
                 return df.to_dict('records')
             except:
                 return []
     
+    def _get_stay_index(self):
+        version = self.data_version('stays')
+        if self._stay_index_version != version:
+            self._stay_index = None
+        if self.metrics:
+            self.metrics.cache_event('stay_index', hit=self._stay_index is not None)
+        if self._stay_index is None:
+            self._stay_index = StayIndex(self.get_stays())
+            self._stay_index_version = version
+        return self._stay_index
+    
+    def get_room_occupants_on(self, room_number, on_date):
+        """Ids of the students who were in room_number on on_date"""
+        return self._get_stay_index().occupants(room_number, on_date)
+    
+    def get_occupancy_on(self, on_date):
+        """Number of students staying in the hostel on on_date"""
+        return self._get_stay_index().occupancy(on_date)
+    
+    # Rooms operations
+    def get_rooms(self):
+        """Every room, as a RoomTable of RoomRecords (see records.py)"""
+        from records import RoomTable
+        
+        try:
+            return RoomTable(self.iter_rooms())
+        except StorageOffline:
+            raise
+        except Exception as e:
+            print(f"Error loading rooms: {e}")
+            return []
+    
+    @_changes_tables('rooms')
+    @_queued_when_offline
     def add_room(self, room_number, capacity, room_type):
         if self.use_mysql:
             cursor = self.connection.cursor()
             try:
-                cursor.execute("""
-                    INSERT INTO rooms (room_number, capacity, room_type)
-                    VALUES (%s, %s, %s)
-                """, (room_number, capacity, room_type))
+                change = writes.add_room(cursor, '%s', datetime.now().date(), room_number, capacity, room_type)
                 self.connection.commit()
                 cursor.close()
+                self._applied(change)
                 return True
             except Exception as e:
+                if self._connection_lost(e):
+                    raise
                 print(f"Error adding room: {e}")
+                self.connection.rollback()
                 cursor.close()
                 return False
         else:
@@ -283,21 +1107,448 @@ class StorageManager:
                 with open(os.path.join(self.data_dir, 'rooms.csv'), 'a', newline='') as file:
                     writer = csv.writer(file)
                     writer.writerow([new_id, room_number, capacity, room_type, 0])
+                self._sorted_change('rooms', [(int(new_id), room_number, int(capacity), room_type or None, 0)])
+                if self._availability is not None:
+                    self._availability.add_room(room_number, capacity, room_type)
+                self._audit('add_room', room_number=room_number, after={'capacity': capacity, 'room_type': room_type})
                 return True
             except Exception as e:
                 print(f"Error adding room: {e}")
                 return False
     
+    @_read_offline()
+    def get_active_counts_by_room(self, exclude_id=None):
+        """Active students per room as {room_number: count}, from one grouped query"""
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            sql = "SELECT room_number, COUNT(*) FROM students WHERE status = 'active' AND room_number <> ''"
+            params = ()
+            if exclude_id is not None:
+                sql += " AND id <> %s"
+                params = (exclude_id,)
+            cursor.execute(sql + " GROUP BY room_number", params)
+            counts = {str(room): count for room, count in cursor.fetchall()}
+            cursor.close()
+            return counts
+        else:
+            try:
+                df = pd.read_csv(os.path.join(self.data_dir, 'students.csv'),
+                                 usecols=['id', 'room_number', 'status'], dtype={'room_number': str})
+                active = df[(df['status'] == 'active') & df['room_number'].notna()]
+                if exclude_id is not None:
+                    active = active[active['id'] != exclude_id]
+                return active.groupby('room_number').size().astype(int).to_dict()
+            except Exception as e:
+                print(f"Error counting room occupancy: {e}")
+                return {}
+    
+    @_read_offline()
+    def get_room_capacities(self):
+        """Capacity per room as {room_number: capacity}"""
+        return {room_number: capacity for _, room_number, capacity, _, _ in self.iter_rooms()}
+    
+    def _adjust_occupancy(self, old_room, old_status, new_room, new_status):
+        """CSV: move a student's bed in rooms.occupied when their room or status changes"""
+        old_bed = _room_key(old_room) if old_status == 'active' else None
+        new_bed = _room_key(new_room) if new_status == 'active' else None
+        if old_bed == new_bed:
+            return
+        for room_number, change in ((old_bed, -1), (new_bed, 1)):
+            if room_number is not None:
+                self._update_room_occupancy(room_number, change)
+    
+    def _rollback(self):
+        """Undo the MySQL transaction and drop the availability changes it made"""
+        self.connection.rollback()
+        self._availability = None
+        self._freed_beds = []
+    
+    def _track_occupancy(self, room_number, change):
+        room_number = _room_key(room_number)
+        if change < 0:
+            self._freed_beds.append(room_number)
+        if self._availability is not None:
+            self._availability.change(room_number, change)
+    
+    def _get_availability(self):
+        version = self.data_version('rooms')
+        if self._availability_version != version:
+            # Rooms were changed by another process
+            self._availability = None
+        if self.metrics:
+            self.metrics.cache_event('availability', hit=self._availability is not None)
+        if self._availability is None:
+            self._availability = RoomAvailabilityIndex(self.iter_rooms())
+            self._availability_version = version
+        return self._availability
+    
+    @_read_offline()
+    def find_free_rooms(self, room_type=None, beds=1, limit=10):
+        """Best-fit rooms with at least beds free: [(room_number, room_type, free_beds)]"""
+        return self._get_availability().find(room_type, beds, limit)
+    
+    @_read_offline()
+    def get_room_types(self):
+        return self._get_availability().room_types()
+    
+    @_read_offline()
+    def get_room_type(self, room_number):
+        availability = self._get_availability()
+        room_number = _room_key(room_number)
+        return availability.room_type(room_number) if room_number in availability else None
+    
+    @_read_offline()
+    def get_free_bed_summary(self):
+        """Rooms per free-bed count for each room type"""
+        return self._get_availability().summary()
+    
+    # Roommate preferences and batch assignment
+    def get_preferences(self):
+        """Saved preferences as {student_id: (sleep_schedule, course, year)}"""
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute("SELECT student_id, sleep_schedule, course, year FROM student_preferences")
+                return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+        return {int(row[0]): tuple(value or None for value in row[1:])
+                for row in self._iter_csv_rows('preferences.csv', PREFERENCE_COLUMNS)}
+    
+    def save_preferences(self, rows):
+        """Insert or replace (student_id, sleep_schedule, course, year) rows; returns the count saved"""
+        rows = [(int(student_id), sleep_schedule or None, course or None, int(year) if year not in (None, '') else None)
+                for student_id, sleep_schedule, course, year in rows]
+        if not rows:
+            return 0
+        self._settle_backend()
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                cursor.executemany("""
+                    INSERT INTO student_preferences (student_id, sleep_schedule, course, year)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE sleep_schedule = VALUES(sleep_schedule),
+                        course = VALUES(course), year = VALUES(year)
+                """, rows)
+                self.connection.commit()
+                return len(rows)
+            except Exception as e:
+                print(f"Error saving preferences: {e}")
+                self._rollback()
+                return 0
+            finally:
+                cursor.close()
+        try:
+            saved = self.get_preferences()
+            saved.update((row[0], row[1:]) for row in rows)
+            self._write_csv_preferences(saved)
+            return len(rows)
+        except Exception as e:
+            print(f"Error saving preferences: {e}")
+            return 0
+    
+    def _write_csv_preferences(self, saved):
+        with open(os.path.join(self.data_dir, 'preferences.csv'), 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(PREFERENCE_COLUMNS)
+            writer.writerows((student_id,) + values for student_id, values in saved.items())
+    
+    def _delete_csv_preferences(self, student_id):
+        saved = self.get_preferences()
+        if saved.pop(int(student_id), None) is not None:
+            self._write_csv_preferences(saved)
+    
+    @_changes_tables('students', 'rooms', 'stays')
+    def assign_rooms(self, assignments):
+        """Give rooms to active students without one, as (student_id, room_number) pairs, in one write
+
+        Students that have a room by now or are inactive are skipped, and so are
+        assignments beyond the free beds their room has at write time (taken in
+        the order given). Returns the number of students assigned, or None on error.
+        """
+        wanted = {int(student_id): _room_key(room_number) for student_id, room_number in assignments}
+        if not wanted:
+            return 0
+        today = datetime.now().date()
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                placeholders = ', '.join(['%s'] * len(wanted))
+                cursor.execute(f"""
+                    SELECT id FROM students
+                    WHERE id IN ({placeholders}) AND status = 'active' AND (room_number IS NULL OR room_number = '')
+                    FOR UPDATE
+                """, list(wanted))
+                eligible = {student_id for (student_id,) in cursor.fetchall()}
+                # Lock the rooms too, so no other write takes their beds before the commit
+                rooms = sorted({room for room in wanted.values() if room})
+                free = {}
+                if rooms:
+                    placeholders = ', '.join(['%s'] * len(rooms))
+                    cursor.execute(f"""
+                        SELECT room_number, capacity - occupied FROM rooms WHERE room_number IN ({placeholders})
+                        FOR UPDATE
+                    """, rooms)
+                    free = {str(room): int(beds) for room, beds in cursor.fetchall()}
+                assigned = _within_free_beds(
+                    [(student_id, room) for student_id, room in wanted.items() if student_id in eligible], free)
+                occupancy = {}
+                for _, room in assigned:
+                    occupancy[room] = occupancy.get(room, 0) + 1
+                cursor.executemany("UPDATE students SET room_number = %s WHERE id = %s",
+                                   [(room, student_id) for student_id, room in assigned])
+                cursor.executemany("INSERT INTO stays (student_id, room_number, check_in) VALUES (%s, %s, %s)",
+                                   [(student_id, room, today) for student_id, room in assigned])
+                cursor.executemany("UPDATE rooms SET occupied = occupied + %s WHERE room_number = %s",
+                                   [(count, room) for room, count in occupancy.items()])
+                self.connection.commit()
+                self._stay_index = None
+                for room, count in occupancy.items():
+                    self._track_occupancy(room, count)
+                self._audit_assignments(assigned)
+                return len(assigned)
+            except Exception as e:
+                print(f"Error assigning rooms: {e}")
+                self._rollback()
+                return None
+            finally:
+                cursor.close()
+        try:
+            filepath = os.path.join(self.data_dir, 'students.csv')
+            df = pd.read_csv(filepath, dtype=STUDENT_TEXT_DTYPES)
+            eligible = set(df.loc[df['id'].isin(list(wanted)) & (df['status'] == 'active')
+                                  & df['room_number'].fillna('').str.strip().eq(''), 'id'])
+            free = {room_number: capacity - occupied for _, room_number, capacity, _, occupied in self.iter_rooms()}
+            kept = dict(_within_free_beds(
+                [(student_id, room) for student_id, room in wanted.items() if student_id in eligible], free))
+            chosen = df['id'].isin(list(kept))
+            ids = df.loc[chosen, 'id']
+            rooms = ids.map(kept)
+            df.loc[chosen, 'room_number'] = rooms
+            df.to_csv(filepath, index=False)
+            first_stay_id = int(self._get_next_id('stays.csv'))
+            with open(os.path.join(self.data_dir, 'stays.csv'), 'a', newline='') as file:
+                csv.writer(file).writerows([first_stay_id + offset, student_id, room, today, '']
+                                           for offset, (student_id, room) in enumerate(zip(ids, rooms)))
+            self._stay_index = None
+            self._add_csv_occupancy(rooms.value_counts().to_dict())
+            self._audit_assignments(zip(ids, rooms))
+            return len(rooms)
+        except Exception as e:
+            print(f"Error assigning rooms: {e}")
+            return None
+    
+    # Waitlist
+    def get_waitlist(self):
+        if self._waitlist is None:
+            from waitlist import Waitlist
+            self._waitlist = Waitlist(os.path.join(self.data_dir, WAITLIST_FILE), email_taken=self._student_email_taken)
+        return self._waitlist
+    
+    def _student_email_taken(self, email):
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute("SELECT 1 FROM students WHERE email = %s LIMIT 1", (email,))
+                return cursor.fetchone() is not None
+            finally:
+                cursor.close()
+        return email in self._get_student_directory()['emails']
+    
+    def _fill_freed_beds(self, rooms):
+        """Add the next eligible waitlisted student to each room with a free bed"""
+        if self._waitlist is None and not os.path.exists(os.path.join(self.data_dir, WAITLIST_FILE)):
+            return
+        waitlist = self.get_waitlist()
+        availability = self._get_availability()
+        for room_number in rooms:
+            while room_number in availability and availability.free_beds(room_number) > 0:
+                if self.backend_status == 'offline':
+                    # Queued adds do not take the bed yet; leave the waitlist alone
+                    return
+                room_type = availability.room_type(room_number)
+                entry = waitlist.peek(room_type)
+                if entry is None:
+                    break
+                # Leaves the waitlist once the student is added. An entry that cannot be
+                # added is dropped, so it does not hold up everyone behind it
+                if self._student_email_taken(entry['email']):
+                    reason = "email already belongs to a student"
+                elif not self.add_student(entry['name'], entry['email'], entry['phone'], room_number):
+                    reason = f"could not be added to room {room_number}"
+                else:
+                    waitlist.allocate(room_number, room_type)
+                    self._waitlist_allocations.append((entry, room_number))
+                    continue
+                logger.warning("Dropped waitlisted student %s: %s", entry['email'], reason)
+                waitlist.cancel(entry['id'], reason)
+                self._audit('waitlist_drop', room_number=room_number, before=entry, after={'reason': reason})
+    
+    def take_waitlist_allocations(self):
+        """Allocations made since the last call, as (waitlist entry, room_number)"""
+        allocations, self._waitlist_allocations = self._waitlist_allocations, []
+        return allocations
+    
+    def _add_csv_occupancy(self, occupancy):
+        """Apply {room_number: change} to rooms.csv in one rewrite"""
+        if occupancy:
+            filepath = os.path.join(self.data_dir, 'rooms.csv')
+            df = pd.read_csv(filepath, dtype={'room_number': str})
+            df['occupied'] += df['room_number'].map(occupancy).fillna(0).astype(int)
+            df.to_csv(filepath, index=False)
+            for room, count in occupancy.items():
+                self._track_occupancy(room, count)
+    
     def _update_room_occupancy(self, room_number, change):
         if not self.use_mysql:
             try:
-                df = pd.read_csv(os.path.join(self.data_dir, 'rooms.csv'))
-                df.loc[df['room_number'] == room_number, 'occupied'] += change
+                df = pd.read_csv(os.path.join(self.data_dir, 'rooms.csv'), dtype={'room_number': str})
+                room = df['room_number'] == _room_key(room_number)
+                df.loc[room, 'occupied'] += change
                 df.to_csv(os.path.join(self.data_dir, 'rooms.csv'), index=False)
+                self._sorted_change('rooms', _csv_tuples(df[room], ROOM_COLUMNS))
+                self._track_occupancy(room_number, change)
             except Exception as e:
                 print(f"Error updating room occupancy: {e}")
     
+    def reconcile_occupancy(self, repair=False):
+        """Recompute rooms.occupied from the active students in one grouped pass
+
+        Returns [(room_number, recorded, actual)] for each room whose counter is
+        wrong, or None on error. With repair the counters are fixed in one write.
+        """
+        if self.use_mysql:
+            active = """
+                SELECT room_number, COUNT(*) AS active FROM students
+                WHERE status = 'active' GROUP BY room_number
+            """
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(f"""
+                    SELECT r.room_number, r.occupied, COALESCE(a.active, 0)
+                    FROM rooms r LEFT JOIN ({active}) a ON a.room_number = r.room_number
+                    WHERE NOT (r.occupied <=> COALESCE(a.active, 0))
+                    ORDER BY r.room_number
+                """)
+                discrepancies = [(str(room), recorded, int(actual)) for room, recorded, actual in cursor.fetchall()]
+                if repair and discrepancies:
+                    # Recount inside the UPDATE so writes since the SELECT are not undone
+                    cursor.execute(f"""
+                        UPDATE rooms r LEFT JOIN ({active}) a ON a.room_number = r.room_number
+                        SET r.occupied = COALESCE(a.active, 0)
+                        WHERE NOT (r.occupied <=> COALESCE(a.active, 0))
+                    """)
+                    self.connection.commit()
+                    self._availability = None
+                    self._note_changes(('rooms',))
+                return discrepancies
+            except Exception as e:
+                print(f"Error reconciling room occupancy: {e}")
+                self.connection.rollback()
+                return None
+            finally:
+                cursor.close()
+        else:
+            try:
+                filepath = os.path.join(self.data_dir, 'rooms.csv')
+                rooms = pd.read_csv(filepath, dtype={'room_number': str})
+                recorded = pd.to_numeric(rooms['occupied'], errors='coerce')
+                actual = rooms['room_number'].map(self.get_active_counts_by_room()).fillna(0).astype(int)
+                wrong = recorded != actual
+                discrepancies = [
+                    (room, None if pd.isna(count) else int(count), int(expected))
+                    for room, count, expected in zip(rooms.loc[wrong, 'room_number'], recorded[wrong], actual[wrong])
+                ]
+                if repair and discrepancies:
+                    rooms['occupied'] = actual
+                    rooms.to_csv(filepath, index=False)
+                    self._availability = None
+                    self._note_changes(('rooms',))
+                return discrepancies
+            except Exception as e:
+                print(f"Error reconciling room occupancy: {e}")
+                return None
+    
+    # Gate swipes
+    def get_gate_log(self):
+        if self._gate_log is None:
+            from gate_log import GateLog
+            self._gate_log = GateLog(os.path.join(self.data_dir, GATE_LOG_CONFIG['dir']))
+        return self._gate_log
+    
+    def get_gate_summary(self):
+        """Today's gate roll-up for the dashboard (zeros until a swipe was ever logged)"""
+        if self._gate_log is None and not os.path.isdir(os.path.join(self.data_dir, GATE_LOG_CONFIG['dir'])):
+            return {'gate_entries_today': 0, 'gate_exits_today': 0, 'gate_out_now': 0}
+        return self.get_gate_log().summary()
+    
+    # Billing ledger
+    def post_ledger(self, period, lines, replace=False):
+        """Post a month's charges as LEDGER_COLUMNS[2:10] tuples in one write
+
+        A month already in the ledger raises ValueError unless replace is set,
+        in which case its old lines are removed in the same write. Returns the
+        number of lines posted, or None on error.
+        """
+        today = datetime.now().date()
+        rows = [(period,) + tuple(line) + (today,) for line in lines]
+        self._settle_backend()
+        if self.use_mysql:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute("SELECT COUNT(*) FROM ledger WHERE period = %s", (period,))
+                if cursor.fetchone()[0]:
+                    if not replace:
+                        raise ValueError(f"{period} is already billed")
+                    cursor.execute("DELETE FROM ledger WHERE period = %s", (period,))
+                cursor.executemany(f"""
+                    INSERT INTO ledger ({', '.join(LEDGER_COLUMNS[1:])})
+                    VALUES ({', '.join(['%s'] * (len(LEDGER_COLUMNS) - 1))})
+                """, [(row[0], int(row[1]), row[2], row[3], row[4], row[5], int(row[6]),
+                       float(row[7]), float(row[8]), row[9]) for row in rows])
+                self.connection.commit()
+                return len(rows)
+            except ValueError:
+                self.connection.rollback()
+                raise
+            except Exception as e:
+                print(f"Error posting ledger: {e}")
+                self.connection.rollback()
+                return None
+            finally:
+                cursor.close()
+        filepath = os.path.join(self.data_dir, 'ledger.csv')
+        billed = any(row[0] == period for row in self._iter_csv_rows('ledger.csv', ('period',)))
+        if billed and not replace:
+            raise ValueError(f"{period} is already billed")
+        try:
+            if billed:
+                df = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+                df[df['period'] != period].to_csv(filepath, index=False)
+            first_id = int(self._get_next_id('ledger.csv'))
+            with open(filepath, 'a', newline='') as file:
+                csv.writer(file).writerows((first_id + offset,) + row for offset, row in enumerate(rows))
+            return len(rows)
+        except Exception as e:
+            print(f"Error posting ledger: {e}")
+            return None
+    
+    @_stream_offline
+    def iter_ledger(self, period=None, batch_size=1000):
+        """Yield ledger lines as LEDGER_COLUMNS tuples, by student, optionally for one month"""
+        if self.use_mysql:
+            yield from self._iter_mysql_rows('ledger', LEDGER_COLUMNS, batch_size,
+                                             'period = %s' if period else None, (period,) if period else (),
+                                             order_by='period, student_id, start_date')
+        else:
+            for row in self._iter_csv_rows('ledger.csv', LEDGER_COLUMNS):
+                if period is None or row[1] == period:
+                    yield (int(row[0]), row[1], int(row[2]), row[3], row[4] or None, row[5], row[6],
+                           int(row[7]), float(row[8]), float(row[9]), row[10])
+    
     # Dashboard data
+    @_read_offline()
     def get_dashboard_data(self):
         if self.use_mysql:
             cursor = self.connection.cursor(dictionary=True)
@@ -328,34 +1579,218 @@ class StorageManager:
             except:
                 return {'total_students': 0, 'total_rooms': 0, 'occupied_rooms': 0, 'available_beds': 0}
     
+    # Sorted, paged lists
+    @_read_offline()
+    def get_students_page(self, order_by='id', descending=False, offset=0, limit=100,
+                          status=None, room_number=None, search=None):
+        """One page of students as StudentRecords, with the number of matching students
+
+        Filters: status, room_number and search (text in the name or email).
+        Rows are ordered by order_by (one of STUDENT_SORT_COLUMNS), then id.
+        """
+        from records import StudentRecord
+        
+        if order_by not in STUDENT_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort students by {order_by!r}")
+        room_number = _room_key(room_number)
+        if self.use_mysql:
+            clauses, params = [], []
+            for column, value in (('status', status), ('room_number', room_number)):
+                if value is not None:
+                    clauses.append(f"{column} = %s")
+                    params.append(value)
+            if search:
+                pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                clauses.append("(name LIKE %s OR email LIKE %s)")
+                params.extend([pattern, pattern])
+            rows, total = self._mysql_page('students', STUDENT_COLUMNS, order_by, descending, offset, limit,
+                                           clauses, params)
+        else:
+            table = self._get_sorted_table('students')
+            mask = table.select({'status': status, 'room_number': room_number}, search, ('name', 'email'))
+            rows, total = table.page(order_by, descending, offset, limit, mask)
+        return [StudentRecord.from_row(row) for row in rows], total
+    
+    @_read_offline()
+    def get_rooms_page(self, order_by='id', descending=False, offset=0, limit=100, room_type=None):
+        """One page of rooms as RoomRecords, with the number of matching rooms"""
+        from records import RoomRecord
+        
+        if order_by not in ROOM_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort rooms by {order_by!r}")
+        if self.use_mysql:
+            clauses, params = (["room_type = %s"], [room_type]) if room_type else ([], [])
+            rows, total = self._mysql_page('rooms', ROOM_COLUMNS, order_by, descending, offset, limit, clauses, params)
+        else:
+            table = self._get_sorted_table('rooms')
+            rows, total = table.page(order_by, descending, offset, limit, table.select({'room_type': room_type}))
+        return [RoomRecord.from_row(row) for row in rows], total
+    
+    def _mysql_page(self, table, columns, order_by, descending, offset, limit, clauses, params):
+        where = " WHERE " + " AND ".join(clauses) if clauses else ''
+        direction = 'DESC' if descending else 'ASC'
+        # Ties are broken by id so pages never overlap; the sort column's index gives this order
+        order = f"id {direction}" if order_by == 'id' else f"{order_by} {direction}, id {direction}"
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {table}{where}", params)
+            total = cursor.fetchone()[0]
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY {order} LIMIT %s OFFSET %s",
+                           params + [limit, offset])
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows, total
+        except Exception as e:
+            if self._connection_lost(e):
+                raise
+            print(f"Error reading {table}: {e}")
+            return [], 0
+    
+    def _get_sorted_table(self, table):
+        """CSV: the table as a SortedTable, rebuilt when its data version changes"""
+        from sort_index import SortedTable
+        
+        version = self.data_version(table)
+        cached = self._sorted_tables.get(table)
+        if self.metrics:
+            self.metrics.cache_event(f'sorted_{table}', hit=cached is not None and cached[0] == version)
+        if cached is None or cached[0] != version:
+            if table == 'students':
+                sorted_table = SortedTable(STUDENT_COLUMNS, self.iter_students(), numeric=('id',))
+            else:
+                sorted_table = SortedTable(ROOM_COLUMNS, self.iter_rooms(), numeric=('id', 'capacity', 'occupied'))
+            cached = self._sorted_tables[table] = (version, sorted_table)
+        return cached[1]
+    
+    def _sorted_change(self, table, rows=(), deleted=()):
+        """CSV: apply a write to the cached SortedTable of table, if it was current
+
+        rows are tuples as iter_students/iter_rooms yield them. The table is
+        then kept at the write's data version (see _note_changes) rather than
+        rebuilt; a write to the table that does not call this still rebuilds it.
+        """
+        cached = self._sorted_tables.get(table)
+        if cached is None:
+            return
+        if table not in self._sorted_current and cached[0] != self._versions[table]:
+            # Stale already: leave it to be rebuilt
+            del self._sorted_tables[table]
+            return
+        for row_id in deleted:
+            cached[1].delete(row_id)
+        for row in rows:
+            cached[1].upsert(row)
+        self._sorted_current.add(table)
+    
+    # Streamed reads
+    @_stream_offline
+    def iter_students(self, batch_size=1000):
+        """Yield students as tuples in STUDENT_COLUMNS order without loading the table"""
+        if self.use_mysql:
+            yield from self._iter_mysql_rows('students', STUDENT_COLUMNS, batch_size)
+        else:
+            for row in self._iter_csv_rows('students.csv', STUDENT_COLUMNS):
+                yield (int(row[0]),) + tuple(value if value != '' else None for value in row[1:])
+    
+    @_stream_offline
+    def iter_stays(self, start=None, end=None, batch_size=1000):
+        """Yield stays as STAY_COLUMNS tuples, only those overlapping [start, end) if given"""
+        if self.use_mysql:
+            yield from self._iter_mysql_rows('stays', STAY_COLUMNS, batch_size,
+                                             "check_in < %s AND (check_out IS NULL OR check_out > %s)",
+                                             (end or date.max, start or date.min))
+        else:
+            start, end = str(start or ''), str(end or '9999-12-31')
+            for stay_id, student_id, room_number, check_in, check_out in self._iter_csv_rows('stays.csv', STAY_COLUMNS):
+                # ISO dates compare correctly as strings
+                if check_in < end and (not check_out or check_out > start):
+                    yield (int(stay_id), int(student_id), room_number, check_in, check_out or None)
+    
+    @_stream_offline
+    def iter_rooms(self, batch_size=1000):
+        """Yield rooms as tuples in ROOM_COLUMNS order without loading the table"""
+        if self.use_mysql:
+            yield from self._iter_mysql_rows('rooms', ROOM_COLUMNS, batch_size)
+        else:
+            for row in self._iter_csv_rows('rooms.csv', ROOM_COLUMNS):
+                yield (int(row[0]), row[1], int(row[2]), row[3] or None, int(row[4] or 0))
+    
+    def _iter_mysql_rows(self, table, columns, batch_size, where=None, params=(), order_by='id'):
+        # An unbuffered cursor streams rows from the server as they are fetched.
+        # It gets its own connection so other queries are not blocked meanwhile;
+        # the connection is kept for the next streamed read instead of reconnecting.
+        connection = self._stream_connection()
+        cursor = connection.cursor(buffered=False)
+        finished = False
+        try:
+            where = f" WHERE {where}" if where else ''
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY {order_by}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            finished = True
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                finished = False
+            # A stream abandoned part way still has rows in flight, so its connection goes
+            if finished:
+                self._stream_connections.append(connection)
+            else:
+                connection.close()
+    
+    def _stream_connection(self):
+        """An idle streaming connection, or a new one (autocommit, so every read sees the latest rows)"""
+        while self._stream_connections:
+            connection = self._stream_connections.pop()
+            if connection.is_connected():
+                return connection
+            connection.close()
+        return self._connect(database=self.database, autocommit=True)
+    
+    def _iter_csv_rows(self, filename, columns):
+        with open(os.path.join(self.data_dir, filename), newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return
+            positions = [header.index(column) for column in columns]
+            for row in reader:
+                if row:
+                    yield [row[i] for i in positions]
+    
     # Export functions
-    def export_students_to_csv(self):
-        students = self.get_students()
-        df = pd.DataFrame(students)
-        filename = f"students_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        df.to_csv(filename, index=False)
+    def export_students_to_csv(self, filename=None):
+        filename = filename or f"students_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(STUDENT_COLUMNS)
+            writer.writerows(self.iter_students())
         return filename
     
-    def export_rooms_to_csv(self):
-        rooms = self.get_rooms()
-        df = pd.DataFrame(rooms)
-        filename = f"rooms_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        df.to_csv(filename, index=False)
+    def export_rooms_to_csv(self, filename=None):
+        filename = filename or f"rooms_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(ROOM_COLUMNS)
+            writer.writerows(self.iter_rooms())
         return filename
     
-    def export_students_to_pdf(self):
+    def export_students_to_pdf(self, filename=None):
         try:
             from reportlab.lib.pagesizes import letter
             from reportlab.pdfgen import canvas
             
-            students = self.get_students()
-            filename = f"students_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = filename or f"students_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             c = canvas.Canvas(filename, pagesize=letter)
             width, height = letter
             c.drawString(100, height - 50, "Students Report")
             y = height - 100
-            for student in students:
-                c.drawString(50, y, f"ID: {student['id']}, Name: {student['name']}, Email: {student['email']}, Room: {student.get('room_number', 'N/A')}")
+            for student_id, name, email, _, room_number, *_ in self.iter_students():
+                c.drawString(50, y, f"ID: {student_id}, Name: {name}, Email: {email}, Room: {room_number or 'N/A'}")
                 y -= 20
                 if y < 50:
                     c.showPage()
@@ -366,19 +1801,18 @@ class StorageManager:
             print("ReportLab not available. Cannot export to PDF.")
             return None
     
-    def export_rooms_to_pdf(self):
+    def export_rooms_to_pdf(self, filename=None):
         try:
             from reportlab.lib.pagesizes import letter
             from reportlab.pdfgen import canvas
             
-            rooms = self.get_rooms()
-            filename = f"rooms_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = filename or f"rooms_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             c = canvas.Canvas(filename, pagesize=letter)
             width, height = letter
             c.drawString(100, height - 50, "Rooms Report")
             y = height - 100
-            for room in rooms:
-                c.drawString(50, y, f"Room: {room['room_number']}, Capacity: {room['capacity']}, Type: {room.get('room_type', 'N/A')}, Occupied: {room.get('occupied', 0)}")
+            for _, room_number, capacity, room_type, occupied in self.iter_rooms():
+                c.drawString(50, y, f"Room: {room_number}, Capacity: {capacity}, Type: {room_type or 'N/A'}, Occupied: {occupied or 0}")
                 y -= 20
                 if y < 50:
                     c.showPage()
@@ -387,4 +1821,4 @@ class StorageManager:
             return filename
         except ImportError:
             print("ReportLab not available. Cannot export to PDF.")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def csv_storage(tmp_path):
+    """A StorageManager on the CSV backend in an empty data directory"""
+    from storage import StorageManager
+
+    storage = StorageManager(data_dir=str(tmp_path / 'data'), backend='csv')
+    yield storage
+    storage.close()
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+
+from matching import encode, group_students, match, pair_scores
+
+
+def _beds_used(groups):
+    used = {}
+    for room_number, student_ids, _ in groups:
+        used[room_number] = used.get(room_number, 0) + len(student_ids)
+    return used
+
+
+def test_pair_scores():
+    scores = pair_scores(*encode([('early', 'cs', 1), ('early', 'cs', 1), ('late', 'law', 4), (None, None, None)]))
+    assert np.isneginf(np.diag(scores)).all()
+    assert scores[0, 1] == 1.0
+    assert scores[0, 2] == 0.0
+    assert scores[0, 3] == 0.5
+    assert (scores == scores.T).all()
+
+
+def test_group_students_pairs_the_best_match_first():
+    scores = pair_scores(*encode([('early', 'cs', 1), ('late', 'law', 4), ('early', 'cs', 1), ('late', 'law', 4)]))
+    assert sorted(map(sorted, group_students(scores, [2, 2]))) == [[0, 2], [1, 3]]
+
+
+def test_similar_students_share_rooms():
+    students = [(1, 'early', 'cs', 1), (2, 'late', 'law', 4), (3, 'early', 'cs', 1), (4, 'late', 'law', 4)]
+    groups, unplaced = match(students, [('101', 2), ('102', 2)])
+    assert unplaced == []
+    assert sorted(sorted(student_ids) for _, student_ids, _ in groups) == [[1, 3], [2, 4]]
+
+
+def test_more_students_than_beds():
+    students = [(i, 'normal', 'cs', 1) for i in range(5)]
+    groups, unplaced = match(students, [('101', 2), ('102', 1)])
+    assert sum(len(student_ids) for _, student_ids, _ in groups) == 3
+    assert len(unplaced) == 2
+
+
+def test_rooms_a_chunk_leaves_empty_go_to_the_next():
+    # The normal chunk part-fills A. The late chunk takes A's spare bed and B,
+    # fills B and leaves A's bed for the early student
+    students = [(0, 'normal', 'cs', 1), (1, 'late', 'cs', 1), (2, 'early', 'cs', 1), (3, 'late', 'cs', 1)]
+    groups, unplaced = match(students, [('A', 2), ('B', 2)])
+    assert unplaced == []
+    assert _beds_used(groups) == {'A': 2, 'B': 2}
+
+
+def test_no_bed_is_lost_or_double_booked():
+    rng = random.Random(7)
+    for _ in range(50):
+        students = [(i, rng.choice(('early', 'normal', 'late', None)), rng.choice(('cs', 'law', None)),
+                     rng.choice((1, 2, 3, None))) for i in range(rng.randint(1, 40))]
+        rooms = [(f'R{i}', rng.randint(1, 4)) for i in range(rng.randint(1, 15))]
+        groups, unplaced = match(students, rooms, max_block=rng.randint(1, 10))
+        capacity = dict(rooms)
+        used = _beds_used(groups)
+        assert all(used[room_number] <= capacity[room_number] for room_number in used)
+        placed = [student_id for _, student_ids, _ in groups for student_id in student_ids]
+        assert sorted(placed + unplaced) == [student[0] for student in students]
+        # Students are only left over when every bed is taken
+        assert not unplaced or sum(used.values()) == sum(capacity.values())
@@ -0,0 +1,164 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from outbox import Outbox, replay
+
+SCHEMA = """
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT,
+                        role TEXT, student_id INTEGER UNIQUE);
+    CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, email TEXT UNIQUE, phone TEXT,
+                           room_number TEXT, check_in_date TEXT, check_out_date TEXT, status TEXT);
+    CREATE TABLE rooms (id INTEGER PRIMARY KEY AUTOINCREMENT, room_number TEXT UNIQUE, capacity INTEGER,
+                        room_type TEXT, occupied INTEGER DEFAULT 0);
+    CREATE TABLE stays (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER, room_number TEXT,
+                        check_in TEXT, check_out TEXT);
+    INSERT INTO users (username, password, role)
+    VALUES ('a@x', 'pw', 'student'), ('b@x', 'pw', 'student'), ('admin', 'pw', 'admin');
+"""
+
+# The same writes, in order, as StorageManager calls and as outbox rows
+WRITES = [
+    ('add_room', ['101', 2, 'double']),
+    ('add_room', ['102', 1, 'single']),
+    ('add_student', ['A', 'a@x', '1', '101']),
+    ('add_student', ['B', 'b@x', '2', '101']),
+    ('add_student', ['C', 'c@x', '3', '']),
+    ('update_student', [1, 'A', 'a@x', '1', '102', 'active']),
+    ('update_student', [2, 'B', 'b@x', '2', '101', 'inactive']),
+    ('update_student', [3, 'C', 'c@x', '3', '101', 'active']),
+    ('delete_student', [1]),
+]
+
+
+def _database():
+    db = sqlite3.connect(':memory:')
+    db.executescript(SCHEMA)
+    return db
+
+
+def _tables(db):
+    return {table: db.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            for table in ('users', 'students', 'rooms', 'stays')}
+
+
+class _MySQLCursor:
+    """sqlite3 cursor taking MySQL-style SQL, as StorageManager writes it"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        params = [str(value) if isinstance(value, date) else value for value in params]
+        self._cursor.execute(sql.replace('%s', '?').replace(' FOR UPDATE', ''), params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _MySQLConnection:
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self, **options):
+        return _MySQLCursor(self._db.cursor())
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.sqlite3'))
+    yield outbox
+    outbox.close()
+
+
+def _live(csv_storage, db):
+    """csv_storage switched to its MySQL code path over db"""
+    csv_storage.connection = _MySQLConnection(db)
+    csv_storage.use_mysql = True
+    csv_storage.backend_status = 'mysql'
+    return csv_storage
+
+
+def test_replay_applies_writes_in_order(outbox):
+    db = _database()
+    for operation, args in WRITES:
+        outbox.enqueue(operation, args)
+    changes, conflicts = replay(outbox, db, placeholder='?', batch_size=4)
+    assert [change.operation for change in changes] == [operation for operation, _ in WRITES]
+    assert conflicts == 0
+    assert outbox.pending_count() == 0
+    tables = _tables(db)
+    assert [row[1] for row in tables['students']] == ['B', 'C']
+    assert [(row[1], row[4]) for row in tables['rooms']] == [('101', 1), ('102', 0)]
+    # Logins are linked when their student is added; A's was unlinked again when A was deleted
+    assert [row[4] for row in tables['users']] == [None, 2, None]
+    assert [(row[1], row[2], row[4] is None) for row in tables['stays']] == [
+        (1, '101', False), (2, '101', False), (1, '102', False), (3, '101', True)]
+
+
+def test_conflicts_are_kept(outbox):
+    db = _database()
+    outbox.enqueue('add_room', ['101', 2, 'double'])
+    outbox.enqueue('add_student', ['A', 'a@x', '', '101'])
+    outbox.enqueue('add_student', ['A twin', 'a@x', '', '101'])
+    outbox.enqueue('add_room', ['101', 1, 'single'])
+    outbox.enqueue('delete_student', [7])
+    changes, conflicts = replay(outbox, db, placeholder='?')
+    assert (len(changes), conflicts) == (2, 3)
+    assert [operation for _, operation, _, _, _ in outbox.conflicts()] == ['add_student', 'add_room', 'delete_student']
+    assert db.execute("SELECT occupied FROM rooms").fetchone() == (1,)
+
+
+def test_failed_batch_stays_pending(outbox):
+    db = _database()
+    db.execute("DROP TABLE stays")
+    outbox.enqueue('add_room', ['101', 2, 'double'])
+    outbox.enqueue('add_student', ['A', 'a@x', '', '101'])
+    with pytest.raises(sqlite3.OperationalError):
+        replay(outbox, db, placeholder='?')
+    assert outbox.pending_count() == 2
+    assert db.execute("SELECT COUNT(*) FROM rooms").fetchone() == (0,)
+
+
+def test_replay_matches_live_writes(csv_storage, tmp_path):
+    live_db = _database()
+    storage = _live(csv_storage, live_db)
+    for operation, args in WRITES:
+        assert getattr(storage, operation)(*args)
+
+    from storage import StorageManager
+    replayed_db = _database()
+    replaying = StorageManager(data_dir=str(tmp_path / 'replayed'), backend='csv')
+    try:
+        for operation, args in WRITES:
+            replaying._get_outbox().enqueue(operation, args)
+        replaying._replay_outbox(_MySQLConnection(replayed_db))
+        assert _tables(replayed_db) == _tables(live_db)
+
+        def audited(manager):
+            return [(entry['operation'], entry['student_id'], entry['room_number'])
+                    for entry in reversed(manager.get_audit_entries())]
+        assert audited(replaying) == audited(storage)
+        assert replaying.pending_writes() == 0
+    finally:
+        replaying.close()
+
+
+def test_live_write_conflict_is_refused(csv_storage):
+    db = _database()
+    storage = _live(csv_storage, db)
+    assert storage.add_room('101', 2, 'double')
+    assert storage.add_student('A', 'a@x', '', '101')
+    assert not storage.add_student('A twin', 'a@x', '', '101')
+    assert not storage.delete_student(7)
+    assert db.execute("SELECT occupied FROM rooms").fetchone() == (1,)
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import sort_index
+from sort_index import SortedTable
+
+COLUMNS = ('id', 'name', 'room_number', 'score')
+NUMERIC = ('id', 'score')
+
+
+def _row(rng, row_id):
+    return (row_id, rng.choice(['ann', 'Bob', 'carl', 'Dee', '', 'bob']), rng.choice(['101', '102', None]),
+            rng.randint(0, 5))
+
+
+def _pages(table):
+    return {(column, descending): table.page(column, descending, 0, 1000)
+            for column in COLUMNS for descending in (False, True)}
+
+
+def test_upserts_and_deletes_match_a_rebuild():
+    rng = random.Random(3)
+    rows = {row_id: _row(rng, row_id) for row_id in range(1, 30)}
+    table = SortedTable(COLUMNS, rows.values(), numeric=NUMERIC)
+    _pages(table)  # every order kept before the writes
+    for _ in range(200):
+        row_id = rng.randint(1, 40)
+        if rng.random() < 0.3:
+            assert table.delete(row_id) == (row_id in rows)
+            rows.pop(row_id, None)
+        else:
+            rows[row_id] = _row(rng, row_id)
+            table.upsert(rows[row_id])
+    assert _pages(table) == _pages(SortedTable(COLUMNS, sorted(rows.values()), numeric=NUMERIC))
+
+
+def test_upsert_widens_a_text_column():
+    table = SortedTable(COLUMNS, [(1, 'al', '101', 0)], numeric=NUMERIC)
+    table.order('name')
+    table.upsert((2, 'a much longer name', '102', 1))
+    assert [row[1] for row in table.page('name')[0]] == ['a much longer name', 'al']
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Count the SortedTables built from scratch"""
+    built = []
+    init = SortedTable.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(args[0])
+        init(self, *args, **kwargs)
+    monkeypatch.setattr(sort_index.SortedTable, '__init__', counting_init)
+    return built
+
+
+def _students_page(storage):
+    return storage.get_students_page(order_by='name', limit=1000)
+
+
+def test_storage_writes_update_the_list_in_place(csv_storage, rebuilds):
+    csv_storage.add_room('101', 2, 'double')
+    for name in ('Cy', 'Al', 'Bo'):
+        csv_storage.add_student(name, f'{name.lower()}@x', '', '101' if name != 'Bo' else '')
+    _students_page(csv_storage)
+    del rebuilds[:]
+    csv_storage.update_student(2, 'Zed', 'al@x', '', '101', 'active')
+    csv_storage.add_student('Ab', 'ab@x', '', '')
+    csv_storage.delete_student(3)
+    rows, total = _students_page(csv_storage)
+    assert rebuilds == []
+    csv_storage.drop_caches()
+    assert (rows, total) == _students_page(csv_storage)
+    assert [student.name for student in rows] == ['Ab', 'Cy', 'Zed']
+
+
+def test_nested_waitlist_add_keeps_the_list_current(csv_storage, rebuilds):
+    # Deleting A frees a bed, and add_student runs for W inside delete_student
+    csv_storage.add_room('101', 1, 'single')
+    csv_storage.add_student('A', 'a@x', '', '101')
+    csv_storage.add_student('B', 'b@x', '', '')
+    csv_storage.get_waitlist().add('W', 'w@x', room_type='single')
+    _students_page(csv_storage)
+    del rebuilds[:]
+    assert csv_storage.delete_student(1)
+    rows, total = _students_page(csv_storage)
+    assert rebuilds == []
+    assert [student.name for student in rows] == ['B', 'W']
+    csv_storage.drop_caches()
+    assert (rows, total) == _students_page(csv_storage)
@@ -0,0 +1,100 @@
+import pytest
+
+from waitlist import Waitlist
+
+
+def test_seniority_then_request_time(tmp_path):
+    waitlist = Waitlist(str(tmp_path / 'waitlist.jsonl'))
+    waitlist.add('Late', 'late@x', requested_at='2026-01-03T00:00:00')
+    waitlist.add('Early', 'early@x', requested_at='2026-01-01T00:00:00')
+    waitlist.add('Senior', 'senior@x', seniority=2, requested_at='2026-01-05T00:00:00')
+    assert [entry['email'] for entry in waitlist.entries()] == ['senior@x', 'early@x', 'late@x']
+    assert waitlist.allocate('101', None)['email'] == 'senior@x'
+    assert waitlist.allocate('101', None)['email'] == 'early@x'
+
+
+def test_room_type_and_any_room(tmp_path):
+    waitlist = Waitlist(str(tmp_path / 'waitlist.jsonl'))
+    waitlist.add('Single', 'single@x', room_type='single', requested_at='2026-01-01T00:00:00')
+    waitlist.add('Any', 'any@x', requested_at='2026-01-02T00:00:00')
+    # A double bed skips the student who only takes a single
+    assert waitlist.peek('double')['email'] == 'any@x'
+    assert waitlist.allocate('201', 'single')['email'] == 'single@x'
+    assert waitlist.allocate('202', 'single')['email'] == 'any@x'
+    assert waitlist.allocate('203', 'single') is None
+
+
+def test_peek_leaves_the_entry(tmp_path):
+    waitlist = Waitlist(str(tmp_path / 'waitlist.jsonl'))
+    entry = waitlist.add('A', 'a@x')
+    assert waitlist.peek(None) == entry
+    assert len(waitlist) == 1
+
+
+def test_journal_replays_cancels_and_allocations(tmp_path):
+    path = str(tmp_path / 'waitlist.jsonl')
+    waitlist = Waitlist(path)
+    first = waitlist.add('A', 'a@x', requested_at='2026-01-01T00:00:00')
+    waitlist.add('B', 'b@x', requested_at='2026-01-02T00:00:00')
+    waitlist.add('C', 'c@x', requested_at='2026-01-03T00:00:00')
+    waitlist.cancel(first['id'], 'gave up')
+    waitlist.allocate('101', None)
+    reloaded = Waitlist(path)
+    assert [entry['email'] for entry in reloaded.entries()] == ['c@x']
+    assert reloaded.add('D', 'd@x')['id'] == 4
+
+
+def test_add_rejects_duplicates_and_existing_students(tmp_path):
+    waitlist = Waitlist(str(tmp_path / 'waitlist.jsonl'), email_taken=lambda email: email == 'student@x')
+    waitlist.add('A', 'a@x')
+    with pytest.raises(ValueError):
+        waitlist.add('A again', 'a@x')
+    with pytest.raises(ValueError):
+        waitlist.add('Student', 'student@x')
+
+
+def test_storage_rejects_emails_of_students(csv_storage):
+    csv_storage.add_room('101', 1, 'single')
+    csv_storage.add_student('A', 'a@x', '', '101')
+    with pytest.raises(ValueError):
+        csv_storage.get_waitlist().add('A', 'a@x')
+
+
+def test_freed_bed_goes_to_the_head(csv_storage):
+    csv_storage.add_room('101', 1, 'single')
+    csv_storage.add_student('A', 'a@x', '', '101')
+    csv_storage.get_waitlist().add('W', 'w@x', room_type='single')
+    assert csv_storage.delete_student(1)
+    [(entry, room_number)] = csv_storage.take_waitlist_allocations()
+    assert (entry['email'], room_number) == ('w@x', '101')
+    assert csv_storage.get_student_for_user('w@x')['student'].room_number == '101'
+    assert len(csv_storage.get_waitlist()) == 0
+
+
+def test_head_taken_by_a_student_is_dropped(csv_storage):
+    csv_storage.add_room('101', 1, 'single')
+    csv_storage.add_room('102', 1, 'single')
+    waitlist = csv_storage.get_waitlist()
+    waitlist.add('Stuck', 'stuck@x', seniority=1)
+    waitlist.add('Next', 'next@x')
+    # Added directly after queueing, so the head's email now belongs to a student
+    csv_storage.add_student('Stuck', 'stuck@x', '', '101')
+    csv_storage.add_student('Other', 'other@x', '', '102')
+    assert csv_storage.delete_student(2)
+    assert [(entry['email'], room) for entry, room in csv_storage.take_waitlist_allocations()] == [('next@x', '102')]
+    assert len(waitlist) == 0
+    drops = [entry for entry in csv_storage.get_audit_entries() if entry['operation'] == 'waitlist_drop']
+    assert len(drops) == 1
+
+
+def test_head_that_cannot_be_added_does_not_block(csv_storage):
+    csv_storage.add_room('101', 1, 'single')
+    csv_storage.add_student('A', 'a@x', '', '101')
+    waitlist = csv_storage.get_waitlist()
+    waitlist.add('Broken', 'broken@x', seniority=1)
+    waitlist.add('Next', 'next@x')
+    add_student = csv_storage.add_student
+    csv_storage.add_student = lambda name, email, phone, room: email != 'broken@x' and add_student(name, email, phone, room)
+    assert csv_storage.delete_student(1)
+    assert [entry['email'] for entry, _ in csv_storage.take_waitlist_allocations()] == ['next@x']
+    assert len(waitlist) == 0
@@ -0,0 +1,128 @@
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+ui_logger = logging.getLogger('hostel.ui')
+
+
+class UIProfiler:
+    """Detects Tk mainloop stalls and times screen builds and callbacks"""
+
+    def __init__(self, root, stall_ms=100, heartbeat_ms=50, log_path=None, history=200):
+        self.root = root
+        self.stall_seconds = stall_ms / 1000
+        self.heartbeat_ms = heartbeat_ms
+        self.events = deque(maxlen=history)
+        self.totals = {}
+        self.overlay = None
+        self._overlay_text = None
+        self._last_beat = time.perf_counter()
+        self._captured_stack = None
+        self._running = False
+        self._main_thread_id = threading.get_ident()
+
+        if log_path and not ui_logger.handlers:
+            directory = os.path.dirname(log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            ui_logger.addHandler(handler)
+            ui_logger.setLevel(logging.INFO)
+
+    # Heartbeat and stall detection
+    def start(self):
+        self._running = True
+        self._last_beat = time.perf_counter()
+        self.root.after(self.heartbeat_ms, self._beat)
+        threading.Thread(target=self._watchdog, name='ui-profiler-watchdog', daemon=True).start()
+
+    def stop(self):
+        self._running = False
+
+    def _beat(self):
+        if not self._running:
+            return
+        now = time.perf_counter()
+        # Time beyond the scheduled interval is time the mainloop was blocked
+        blocked = now - self._last_beat - self.heartbeat_ms / 1000
+        if blocked >= self.stall_seconds:
+            stack = self._captured_stack or 'stack not captured'
+            self._record('stall', 'mainloop', blocked)
+            ui_logger.warning("mainloop stalled for %.1f ms; blocking stack:\n%s", blocked * 1000, stack)
+        self._captured_stack = None
+        self._last_beat = now
+        self.root.after(self.heartbeat_ms, self._beat)
+
+    def _watchdog(self):
+        """Grab the main thread's stack while it is still blocked"""
+        interval = self.heartbeat_ms / 1000
+        while self._running:
+            time.sleep(interval)
+            overdue = time.perf_counter() - self._last_beat - interval
+            if overdue >= self.stall_seconds and self._captured_stack is None:
+                frame = sys._current_frames().get(self._main_thread_id)
+                if frame is not None:
+                    self._captured_stack = ''.join(traceback.format_stack(frame))
+
+    # Screen build and callback timing
+    def _record(self, kind, name, seconds):
+        self.events.append((time.time(), kind, name, seconds))
+        count, total, worst = self.totals.get((kind, name), (0, 0.0, 0.0))
+        self.totals[(kind, name)] = (count + 1, total + seconds, max(worst, seconds))
+
+    def timed(self, kind, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._record(kind, name, elapsed)
+                ui_logger.info("%s %s took %.1f ms", kind, name, elapsed * 1000)
+        return wrapper
+
+    def instrument(self, app, skip=()):
+        """Wrap the app's screen builders and callbacks, except those named in skip; call before building any screen"""
+        for name in dir(type(app)):
+            if name.startswith('_') or name in ('setup_styles', 'darken_color') or name in skip:
+                continue
+            method = getattr(app, name)
+            if not callable(method):
+                continue
+            kind = 'screen' if name.startswith(('show_', 'build_')) else 'callback'
+            setattr(app, name, self.timed(kind, name, method))
+
+    # Debug overlay
+    def report(self):
+        lines = [f"{'kind':<9}{'name':<28}{'calls':>6}{'avg ms':>10}{'max ms':>10}"]
+        for (kind, name), (count, total, worst) in sorted(self.totals.items(), key=lambda i: -i[1][2]):
+            lines.append(f"{kind:<9}{name:<28}{count:>6}{total / count * 1000:>10.1f}{worst * 1000:>10.1f}")
+        return '\n'.join(lines)
+
+    def toggle_overlay(self, event=None):
+        import tkinter as tk
+
+        if self.overlay is not None and self.overlay.winfo_exists():
+            self.overlay.destroy()
+            self.overlay = None
+            return
+        self.overlay = tk.Toplevel(self.root)
+        self.overlay.title("UI Profiler")
+        self.overlay.attributes('-topmost', True)
+        self._overlay_text = tk.Text(self.overlay, font=('Courier', 9), width=64, height=24)
+        self._overlay_text.pack(fill='both', expand=True)
+        self._refresh_overlay()
+
+    def _refresh_overlay(self):
+        if self.overlay is None or not self.overlay.winfo_exists():
+            return
+        self._overlay_text.delete('1.0', 'end')
+        self._overlay_text.insert('end', self.report())
+        self.overlay.after(1000, self._refresh_overlay)
@@ -0,0 +1,128 @@
+import os
+
+# Used for rooms that are not in the rooms table
+MAX_STUDENTS_PER_ROOM = 2
+
+FIELDS = ('name', 'email', 'phone', 'room_number')
+
+ERROR_COLUMNS = ['row', 'field', 'value', 'error']
+
+
+def validate_student(name, email, phone, room_number):
+    """Check one student's fields; returns an error message or None"""
+    if not all([name, email]):
+        return "Name and Email are required"
+    if '@' not in email:
+        return "Email must contain @ symbol"
+    if phone and (not phone.isdigit() or len(phone) != 10):
+        return "Phone number must be exactly 10 digits"
+    if room_number and (not room_number.isdigit() or len(room_number) > 3):
+        return "Room number must be maximum 3 digits"
+    return None
+
+
+def room_full_error(storage, room_number, exclude_id=None):
+    """Error message if room_number has no free bed for one more active student"""
+    from storage import StorageOffline
+
+    if not room_number:
+        return None
+    try:
+        counts = storage.get_active_counts_by_room(exclude_id=exclude_id)
+        limit = storage.get_room_capacities().get(room_number, MAX_STUDENTS_PER_ROOM)
+    except StorageOffline:
+        # Nothing to check against until MySQL is back; the write is queued as entered
+        return None
+    if counts.get(room_number, 0) >= limit:
+        return f"Room {room_number} is full (maximum {limit} students per room)"
+    return None
+
+
+def _errors(frame, mask, field, message):
+    import pandas as pd
+
+    failed = frame.loc[mask, ['row', field]]
+    return pd.DataFrame({'row': failed['row'], 'field': field, 'value': failed[field], 'error': message})
+
+
+def validate_frame(frame, occupied, capacities, first_row=2, emails=None):
+    """Validate a chunk of imported students with vectorized rules
+
+    occupied maps room -> active students already placed (including earlier
+    chunks) and is updated in place. emails, if given, is the set of emails
+    already taken (lower-cased: existing students and earlier chunks); it is
+    also updated in place. Returns (valid_rows, errors).
+    """
+    import pandas as pd
+
+    frame = frame.reindex(columns=FIELDS).fillna('').astype(str)
+    frame = frame.apply(lambda column: column.str.strip())
+    # Spreadsheet row numbers: the header is row 1
+    frame.insert(0, 'row', range(first_row, first_row + len(frame)))
+
+    missing = (frame['name'] == '') | (frame['email'] == '')
+    bad_email = ~missing & ~frame['email'].str.contains('@', regex=False)
+    bad_phone = ~missing & ~bad_email & (frame['phone'] != '') & ~frame['phone'].str.fullmatch(r'\d{10}')
+    bad_room = (~missing & ~bad_email & ~bad_phone & (frame['room_number'] != '')
+                & ~frame['room_number'].str.fullmatch(r'\d{1,3}'))
+    valid = ~(missing | bad_email | bad_phone | bad_room)
+
+    # Emails are unique (case-insensitively, as in MySQL); the first row with one wins
+    email_keys = frame['email'].str.lower()
+    taken = valid & email_keys.isin(emails if emails is not None else ())
+    unique = valid & ~taken
+    repeated = unique & email_keys.where(unique).duplicated()
+    valid &= ~(taken | repeated)
+    if emails is not None:
+        emails.update(email_keys[valid])
+
+    # Capacity: one grouped join of this chunk's requests against rooms
+    requests = frame.loc[valid & (frame['room_number'] != ''), ['row', 'room_number']]
+    position = requests.groupby('room_number').cumcount()
+    already = requests['room_number'].map(occupied).fillna(0)
+    limit = requests['room_number'].map(capacities).fillna(MAX_STUDENTS_PER_ROOM)
+    full = (already + position) >= limit
+    room_full = pd.Series(False, index=frame.index)
+    room_full[full[full].index] = True
+    valid &= ~room_full
+
+    placed = requests.loc[~full, 'room_number'].value_counts()
+    for room, count in placed.items():
+        occupied[room] = occupied.get(room, 0) + int(count)
+
+    full_rooms = frame.loc[room_full, 'room_number']
+    errors = pd.concat([
+        _errors(frame, missing, 'name', "Name and Email are required"),
+        _errors(frame, bad_email, 'email', "Email must contain @ symbol"),
+        _errors(frame, bad_phone, 'phone', "Phone number must be exactly 10 digits"),
+        _errors(frame, bad_room, 'room_number', "Room number must be maximum 3 digits"),
+        _errors(frame, taken, 'email', "A student with this email already exists"),
+        _errors(frame, repeated, 'email', "Email appears on an earlier row of the file"),
+        pd.DataFrame({'row': frame.loc[room_full, 'row'], 'field': 'room_number', 'value': full_rooms,
+                      'error': "Room " + full_rooms + " is full"}),
+    ], ignore_index=True).sort_values('row', kind='stable')
+    return frame.loc[valid, list(FIELDS)], errors[ERROR_COLUMNS]
+
+
+def read_chunks(path, chunksize=50000):
+    """Read a CSV or Excel intake file as string DataFrames of chunksize rows"""
+    import pandas as pd
+
+    if os.path.splitext(path)[1].lower() in ('.xls', '.xlsx'):
+        # Excel cannot be streamed; slice the sheet instead
+        sheet = pd.read_excel(path, dtype=str)
+        for start in range(0, len(sheet), chunksize):
+            yield sheet.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(path, dtype=str, chunksize=chunksize, keep_default_na=False)
+
+
+def validate_file(path, storage, chunksize=50000):
+    """Yield (valid_rows, errors) per chunk of an intake file"""
+    occupied = storage.get_active_counts_by_room()
+    capacities = storage.get_room_capacities()
+    emails = {row[2].lower() for row in storage.iter_students() if row[2]}
+    first_row = 2
+    for chunk in read_chunks(path, chunksize):
+        yield validate_frame(chunk, occupied, capacities, first_row, emails)
+        first_row += len(chunk)
@@ -0,0 +1,149 @@
+"""
+Priority waitlist for beds, persisted as an append-only JSONL journal.
+
+Waiting students sit in one heap per preferred room type plus a heap for
+students who take any room. Priority is seniority (higher first), then
+request time. Adding, cancelling and allocating an entry each cost
+O(log n) plus one appended journal line; cancelled entries are dropped
+lazily when they reach the top of a heap. The journal is replayed on start
+and compacted once most of its lines are obsolete.
+"""
+
+import heapq
+import json
+import os
+from datetime import datetime
+
+COMPACT_MIN_LINES = 1000
+
+
+class Waitlist:
+    def __init__(self, path, email_taken=None):
+        """email_taken: optional callable, true for an email that already belongs to a student"""
+        self.path = path
+        self.email_taken = email_taken
+        self._entries = {}  # entry id -> entry
+        self._emails = {}  # email -> entry id
+        self._heaps = {}  # preferred room_type (None for any) -> [(priority, entry id)]
+        self._next_id = 1
+        self._obsolete = 0  # journal lines that compaction would drop
+        if os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def _priority(entry):
+        return (-entry['seniority'], entry['requested_at'], entry['id'])
+
+    def _push(self, entry):
+        self._entries[entry['id']] = entry
+        self._emails[entry['email']] = entry['id']
+        heapq.heappush(self._heaps.setdefault(entry['room_type'], []), (self._priority(entry), entry['id']))
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        del self._emails[entry['email']]
+        return entry
+
+    # Journal
+    def _load(self):
+        with open(self.path) as file:
+            for line in file:
+                record = json.loads(line)
+                if record['op'] == 'add':
+                    entry = record['entry']
+                    self._entries[entry['id']] = entry
+                    self._emails[entry['email']] = entry['id']
+                    self._next_id = max(self._next_id, entry['id'] + 1)
+                elif record['id'] in self._entries:
+                    self._drop(record['id'])
+                    self._obsolete += 2
+        # One heapify per heap instead of a push per entry
+        for entry in self._entries.values():
+            self._heaps.setdefault(entry['room_type'], []).append((self._priority(entry), entry['id']))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def _append(self, record):
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+        if self._obsolete >= COMPACT_MIN_LINES and self._obsolete > len(self._entries):
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as file:
+            for entry in self._entries.values():
+                file.write(json.dumps({'op': 'add', 'entry': entry}) + '\n')
+        os.replace(tmp_path, self.path)
+        self._obsolete = 0
+
+    # Queue operations
+    def add(self, name, email, phone='', room_type=None, seniority=0, requested_at=None):
+        """Put a student on the waitlist; room_type None accepts any room"""
+        if email in self._emails:
+            raise ValueError(f"{email} is already on the waitlist")
+        if self.email_taken is not None and self.email_taken(email):
+            raise ValueError(f"{email} already belongs to a student")
+        entry = {
+            'id': self._next_id,
+            'name': name,
+            'email': email,
+            'phone': phone or '',
+            'room_type': room_type or None,
+            'seniority': int(seniority),
+            'requested_at': requested_at or datetime.now().isoformat(timespec='seconds'),
+        }
+        self._next_id += 1
+        self._push(entry)
+        self._append({'op': 'add', 'entry': entry})
+        return entry
+
+    def cancel(self, entry_id, reason=None):
+        if entry_id not in self._entries:
+            return False
+        self._drop(entry_id)
+        self._obsolete += 2
+        record = {'op': 'cancel', 'id': entry_id}
+        if reason:
+            record['reason'] = reason
+        self._append(record)
+        return True
+
+    def _top(self, room_type):
+        heap = self._heaps.get(room_type)
+        # Skip entries cancelled or allocated since they were pushed
+        while heap and heap[0][1] not in self._entries:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _next(self, room_type):
+        """(entry id, heap) of the next student eligible for a room of room_type, or None"""
+        candidates = [(top, kind) for kind in {room_type, None} for top in [self._top(kind)] if top]
+        if not candidates:
+            return None
+        (_, entry_id), kind = min(candidates)
+        return entry_id, kind
+
+    def peek(self, room_type):
+        """The student allocate() would return for a room of room_type, left on the waitlist"""
+        found = self._next(room_type)
+        return self._entries[found[0]] if found else None
+
+    def allocate(self, room_number, room_type):
+        """Remove and return the next student eligible for a bed in room_number, or None"""
+        found = self._next(room_type)
+        if found is None:
+            return None
+        entry_id, kind = found
+        heapq.heappop(self._heaps[kind])
+        entry = self._drop(entry_id)
+        self._obsolete += 2
+        self._append({'op': 'allocate', 'id': entry_id, 'room_number': room_number})
+        return entry
+
+    def entries(self):
+        """Waiting students in allocation order (across all room types)"""
+        return sorted(self._entries.values(), key=self._priority)
+
+    def __len__(self):
+        return len(self._entries)
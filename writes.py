@@ -0,0 +1,128 @@
+"""
+SQL for the student and room writes, shared by StorageManager's MySQL
+backend and the outbox replay so the two apply a write the same way.
+
+Each write runs its statements on a DB-API cursor, with the driver's
+placeholder style as p ('%s' for MySQL, '?' for sqlite3), and leaves the
+commit to the caller. A write that cannot apply to the current data raises
+Conflict. It returns a Change describing what it did, which the caller uses
+for its audit entry and caches.
+"""
+
+from collections import namedtuple
+
+# Column order of the tuples yielded by StorageManager.iter_students
+STUDENT_COLUMNS = ('id', 'name', 'email', 'phone', 'room_number', 'check_in_date', 'check_out_date', 'status')
+
+# beds is (old_bed, new_bed): the rooms the student held a bed in before and after (None for no bed)
+Change = namedtuple('Change', 'operation student_id room_number before after beds')
+
+
+class Conflict(Exception):
+    """A write that cannot be applied to the current data"""
+
+
+def _bed(room_number, status):
+    """The room a student holds a bed in, or None"""
+    if room_number is None or status != 'active':
+        return None
+    return str(room_number).strip() or None
+
+
+def _move_bed(cursor, p, student_id, old_bed, new_bed, today):
+    """Shift occupancy and stay history from old_bed to new_bed"""
+    if old_bed == new_bed:
+        return
+    if old_bed:
+        cursor.execute(f"UPDATE rooms SET occupied = occupied - 1 WHERE room_number = {p}", (old_bed,))
+        cursor.execute(f"UPDATE stays SET check_out = {p} WHERE student_id = {p} AND check_out IS NULL",
+                       (today, student_id))
+    if new_bed:
+        cursor.execute(f"UPDATE rooms SET occupied = occupied + 1 WHERE room_number = {p}", (new_bed,))
+        cursor.execute(f"INSERT INTO stays (student_id, room_number, check_in) VALUES ({p}, {p}, {p})",
+                       (student_id, new_bed, today))
+
+
+def _email_taken(cursor, p, email, student_id=None):
+    sql = f"SELECT id FROM students WHERE email = {p}"
+    params = (email,)
+    if student_id is not None:
+        sql += f" AND id <> {p}"
+        params = (email, student_id)
+    cursor.execute(sql, params)
+    return cursor.fetchone() is not None
+
+
+def _student(cursor, p, student_id):
+    """The student's row as a dict, locked for the rest of the transaction on MySQL"""
+    # sqlite3 ('?' placeholders) has no row locks; its writes are serialised anyway
+    lock = ' FOR UPDATE' if p == '%s' else ''
+    cursor.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students WHERE id = {p}{lock}", (student_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise Conflict(f"student {student_id} no longer exists")
+    return dict(zip(STUDENT_COLUMNS, row))
+
+
+def add_student(cursor, p, today, name, email, phone, room_number):
+    if _email_taken(cursor, p, email):
+        raise Conflict(f"email {email} already belongs to another student")
+    cursor.execute(f"""
+        INSERT INTO students (name, email, phone, room_number, check_in_date, status)
+        VALUES ({p}, {p}, {p}, {p}, {p}, 'active')
+    """, (name, email, phone, room_number, today))
+    student_id = cursor.lastrowid
+    new_bed = _bed(room_number, 'active')
+    _move_bed(cursor, p, student_id, None, new_bed, today)
+    # Logins are named after the student's email until they are linked
+    cursor.execute(f"""
+        UPDATE users SET student_id = {p}
+        WHERE username = {p} AND role = 'student' AND student_id IS NULL
+    """, (student_id, email))
+    return Change('add_student', student_id, room_number, None,
+                  {'name': name, 'email': email, 'phone': phone, 'room_number': room_number}, (None, new_bed))
+
+
+def update_student(cursor, p, today, student_id, name, email, phone, room_number, status):
+    if _email_taken(cursor, p, email, student_id):
+        raise Conflict(f"email {email} already belongs to another student")
+    before = _student(cursor, p, student_id)
+    cursor.execute(f"""
+        UPDATE students SET name = {p}, email = {p}, phone = {p}, room_number = {p}, status = {p}
+        WHERE id = {p}
+    """, (name, email, phone, room_number, status, student_id))
+    # Keep check_out_date in step with the status
+    if before['status'] == 'active' and status != 'active':
+        cursor.execute(f"UPDATE students SET check_out_date = {p} WHERE id = {p}", (today, student_id))
+    elif before['status'] != 'active' and status == 'active':
+        cursor.execute(f"UPDATE students SET check_out_date = NULL WHERE id = {p}", (student_id,))
+    beds = (_bed(before['room_number'], before['status']), _bed(room_number, status))
+    _move_bed(cursor, p, student_id, *beds, today)
+    after = dict(before, name=name, email=email, phone=phone, room_number=room_number, status=status)
+    return Change('update_student', student_id, room_number, before, after, beds)
+
+
+def delete_student(cursor, p, today, student_id):
+    before = _student(cursor, p, student_id)
+    old_bed = _bed(before['room_number'], before['status'])
+    _move_bed(cursor, p, student_id, old_bed, None, today)
+    cursor.execute(f"DELETE FROM students WHERE id = {p}", (student_id,))
+    cursor.execute(f"UPDATE users SET student_id = NULL WHERE student_id = {p}", (student_id,))
+    return Change('delete_student', student_id, before['room_number'], before, None, (old_bed, None))
+
+
+def add_room(cursor, p, today, room_number, capacity, room_type):
+    cursor.execute(f"SELECT id FROM rooms WHERE room_number = {p}", (room_number,))
+    if cursor.fetchone() is not None:
+        raise Conflict(f"room {room_number} already exists")
+    cursor.execute(f"INSERT INTO rooms (room_number, capacity, room_type) VALUES ({p}, {p}, {p})",
+                   (room_number, capacity, room_type))
+    return Change('add_room', None, room_number, None, {'capacity': capacity, 'room_type': room_type}, (None, None))
+
+
+WRITES = {
+    'add_student': add_student,
+    'update_student': update_student,
+    'delete_student': delete_student,
+    'add_room': add_room,
+}